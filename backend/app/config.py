@@ -22,17 +22,84 @@ class Settings(BaseSettings):
     # File Storage
     UPLOAD_DIR: str = os.path.join(os.path.dirname(os.path.dirname(__file__)), "uploads")
     RESULTS_DIR: str = os.path.join(os.path.dirname(os.path.dirname(__file__)), "results")
+    STORAGE_INDEX_PATH: str = os.path.join(RESULTS_DIR, ".storage_index.db")
+    STORAGE_TTL_HOURS: float = 24.0  # Default lifetime of uploads and results
+    STORAGE_QUOTA_BYTES: int = 50 * 1024 ** 3  # LRU eviction above this (0 disables)
+    STORAGE_MIN_RESIDENCY_SECONDS: int = 900  # Recently used files are never evicted
+
+    # Content-addressed result cache (inputs + parameters -> stored result)
+    RESULT_CACHE_ENABLED: bool = True
+    RESULT_CACHE_PENDING_SECONDS: int = 4 * 3600  # Lifetime of an in-flight claim
+    RESULT_CACHE_WAIT_SECONDS: float = 30.0  # Image requests wait this long for a duplicate
+
+    # Upload limits (enforced while the bytes arrive)
+    UPLOAD_CHUNK_BYTES: int = 1024 * 1024
+    MAX_IMAGE_UPLOAD_BYTES: int = 20 * 1024 ** 2
+    MAX_VIDEO_UPLOAD_BYTES: int = 2 * 1024 ** 3
+    MAX_REQUEST_BYTES: int = 2 * 1024 ** 3 + 64 * 1024 ** 2  # Whole request body (0 disables)
+
+    # Resumable video jobs
+    CHECKPOINT_DIR: str = os.path.join(os.path.dirname(os.path.dirname(__file__)), "checkpoints")
+    CHECKPOINT_SEGMENT_FRAMES: int = 300  # Frames per checkpointed segment
+    CHECKPOINT_TTL_HOURS: float = 48.0  # Abandoned checkpoints are deleted after this
+    CHECKPOINT_LOCK_STALE_SECONDS: int = 600  # Another host's job lock without heartbeat is taken over
+    CHECKPOINT_LOCK_MAX_RETRIES: int = 240  # Minutes a duplicate delivery waits for the running copy
+
+    # Memory-mapped frame store: decode each segment into a file-backed
+    # ring of frame slots that the OS can page out instead of holding it in RAM
+    FRAME_STORE_ENABLED: bool = False
+    FRAME_STORE_DIR: Optional[str] = None  # Defaults to the system temp directory
+    FRAME_STORE_EVICTION: str = "oldest"  # "oldest" or "released"
 
     # AI Model Settings
     MODEL_DIR: str = os.path.join(os.path.dirname(os.path.dirname(__file__)), "models")
     FACE_DETECTOR: str = "buffalo_l"  # Changed from retinaface_r50_v1 to buffalo_l
     FACE_SWAPPER: str = "buffalo_l"
 
+    # Tiled detection for large stills: a coarse pass at COARSE_SIDE finds
+    # candidates (score >= CANDIDATE_THRESHOLD); faces smaller than
+    # RELIABLE_SIZE px or below the detector threshold there are detected
+    # again in full-resolution tiles. Video frames always use one pass.
+    TILED_DETECTION_ENABLED: bool = True
+    TILED_DETECTION_MIN_SIDE: int = 2048  # Longer image side that switches to tiled detection
+    TILED_DETECTION_COARSE_SIDE: int = 1280
+    TILED_DETECTION_TILE_SIZE: int = 1024
+    TILED_DETECTION_TILE_OVERLAP: float = 0.25
+    TILED_DETECTION_CANDIDATE_THRESHOLD: float = 0.2
+    TILED_DETECTION_RELIABLE_SIZE: int = 48
+
+    # Adaptive detection resolution (video and live frames)
+    ADAPTIVE_DETECTION_ENABLED: bool = True  # Needs a detector model with a dynamic input shape
+    DETECTION_MIN_FACE_SIZE: int = 48  # Smallest face (pixels) looked for until faces are seen
+    DETECTION_MIN_INPUT: int = 160
+    DETECTION_MAX_INPUT: int = 640
+    DETECTION_FACE_MARGIN: float = 0.5  # Fraction of the smallest seen face still looked for
+    DETECTION_REFRESH_INTERVAL: int = 30  # Detections between checks for smaller faces
+
+    # Model lifecycle
+    API_PRELOAD_MODELS: bool = True  # Set False for auth-only API processes
+    # Celery workers: "child" loads per worker process, "parent" loads once
+    # before fork (shared copy-on-write), "none" loads on first task
+    CELERY_MODEL_PRELOAD: str = "child"
+
+    # Job execution: "celery" (Redis broker + workers) or "local" (process
+    # pool inside a single API process; no Redis or Celery needed)
+    JOB_EXECUTOR: str = "celery"
+    LOCAL_EXECUTOR_WORKERS: int = 1
+
     # Redis and Celery Settings
     REDIS_HOST: str = os.environ.get("REDIS_HOST", "localhost")
     REDIS_PORT: int = int(os.environ.get("REDIS_PORT", 6379))
     CELERY_BROKER_URL: str = f"redis://{REDIS_HOST}:{REDIS_PORT}/0"
     CELERY_RESULT_BACKEND: str = f"redis://{REDIS_HOST}:{REDIS_PORT}/0"
+    # Unacknowledged jobs are redelivered after this; keep it above the longest job
+    CELERY_VISIBILITY_TIMEOUT: int = 4 * 3600
+
+    # Task progress store (Redis key + pub/sub channel per task)
+    PROGRESS_REDIS_DB: int = 1
+    PROGRESS_TTL_SECONDS: int = 24 * 3600
+    PROGRESS_MIN_DELTA: float = 1.0  # Percent change that forces a write
+    PROGRESS_MIN_INTERVAL: float = 1.0  # Seconds between throttled writes
 
     # PostgreSQL Settings (optional)
     POSTGRES_SERVER: Optional[str] = "localhost"
@@ -46,7 +113,81 @@ class Settings(BaseSettings):
 
     # Performance Settings
     USE_GPU: bool = False  # Changed from True to False
-    BATCH_SIZE: int = 4  # For video processing
+    BATCH_SIZE: int = 4  # Frames between video progress updates
+    # Worker processes that swap the frames of one video job in parallel
+    # (0 or 1 disables, -1 uses every core). Frames are passed through
+    # shared memory slots, PARALLEL_FRAME_SLOTS_PER_WORKER per worker.
+    # Needs a job process that may start children: the local executor, or a
+    # Celery worker started with --pool=solo or --pool=threads. Under the
+    # default prefork pool (as in docker-compose.yml and start_services.sh)
+    # frames are still swapped serially.
+    PARALLEL_FRAME_WORKERS: int = 0
+    PARALLEL_FRAME_SLOTS_PER_WORKER: int = 2
+    PARALLEL_FRAME_START_METHOD: str = "spawn"  # Each worker loads its own engine
+    # Frames in flight for the frame workers, tuned per resolution class from
+    # measured throughput, starting from PARALLEL_FRAME_SLOTS_PER_WORKER per
+    # worker (see BatchSizeController). Capped so the frames in flight, at
+    # BATCH_FRAME_MEMORY_FACTOR frame sizes each, fit in BATCH_MEMORY_FRACTION
+    # of the available memory.
+    BATCH_AUTOTUNE_ENABLED: bool = True
+    BATCH_SIZE_MAX: int = 64
+    BATCH_TUNING_WINDOW: int = 60  # Frames measured per batch size
+    BATCH_TUNING_MIN_GAIN: float = 0.05  # Throughput gain that justifies a larger batch
+    BATCH_MEMORY_FRACTION: float = 0.5
+    BATCH_FRAME_MEMORY_FACTOR: float = 6.0
+    BUFFER_POOL_MAX_PER_SHAPE: int = 4  # Idle frame buffers kept per shape/dtype
+
+    # Target selection (target_policy=identity): minimum cosine similarity
+    # between a face and a registered identity, and identities per job
+    IDENTITY_MATCH_THRESHOLD: float = 0.35
+    MAX_TARGET_IDENTITIES: int = 8
+
+    # Static-scene reuse in video jobs: duplicate frames reuse the previous
+    # output, and frames whose 64x64 grayscale thumbnail differs from the
+    # last detected frame by at most FACE_THRESHOLD (mean, 0-255) inside
+    # each face and BLOCK_THRESHOLD in every 4x4 block reuse its detection
+    FRAME_REUSE_ENABLED: bool = True
+    FRAME_REUSE_FACE_THRESHOLD: float = 3.0
+    FRAME_REUSE_BLOCK_THRESHOLD: float = 12.0
+    FRAME_REUSE_MAX_RUN: int = 30  # Detect again after this many reused frames
+
+    # Fast mode (fast_mode=true on video jobs): swap every Nth frame in full
+    # and move the swapped faces along the tracked motion in between
+    FAST_MODE_KEYFRAME_INTERVAL: int = 4
+
+    # Video job routing (cost = frames x megapixels x faces per frame)
+    ROUTING_FACE_SAMPLES: int = 5  # Frames sampled for face density at upload
+    ROUTING_SHORT_MAX_COST: float = 600.0  # ~20s of 720p with one face
+    ROUTING_LONG_MAX_COST: float = 30000.0  # Above this jobs go to the bulk queue
+
+    # Video admission and runtime estimates
+    THROUGHPUT_PROFILE_PATH: str = os.path.join(MODEL_DIR, "throughput_profile.json")
+    BATCH_PROFILE_PATH: str = os.path.join(MODEL_DIR, "batch_profile.json")  # Settled batch sizes
+    CALIBRATE_ON_WORKER_START: bool = True  # Benchmark hosts without a profile
+    MAX_VIDEO_DURATION: float = 600.0  # Seconds
+    MAX_VIDEO_PIXELS: int = 3840 * 2160  # Per frame
+    MAX_JOB_ESTIMATED_SECONDS: float = 2 * 3600.0
+
+    # Preview renders (preview=true on /swap/video)
+    PREVIEW_SECONDS: float = 5.0  # "head" mode: length from the start
+    PREVIEW_SAMPLE_FRAMES: int = 24  # "sample" mode: evenly spaced frames
+    PREVIEW_FPS: float = 12.0
+    PREVIEW_MAX_HEIGHT: int = 360
+    PREVIEW_TTL_SECONDS: int = 3600  # How long a preview can be confirmed
+    PREVIEW_KEYFRAME_INTERVAL: int = 1  # "head" previews in fast mode above 1
+
+    # Progressive HLS output (output_format="hls" on /swap/video)
+    HLS_SEGMENT_SECONDS: float = 2.0
+    HLS_RENDITION_HEIGHTS: List[int] = [720, 480, 360]  # Rungs above the source are skipped
+    HLS_BITS_PER_PIXEL: float = 0.1  # Target bitrate = width x height x fps x this
+
+    # Live Face Swap Settings
+    LIVE_FACE_HINTS_ENABLED: bool = True  # Accept client-side face locations
+    LIVE_HINT_VERIFY_INTERVAL: int = 30  # Run server detection every N hinted frames
+    LIVE_HINT_MIN_IOU: float = 0.3  # Minimum overlap between hint and detection
+    LIVE_HINT_MIN_FACE_SIZE: int = 24  # Smallest hinted face edge in pixels
+    LIVE_HINT_MAX_FACES: int = 4
+    LIVE_METRICS_WINDOW: int = 500  # Frames kept for latency percentiles
 
     # Rate Limiting
     RATE_LIMIT_PER_MINUTE: int = 60
@@ -69,3 +210,4 @@ settings = Settings()
 os.makedirs(settings.UPLOAD_DIR, exist_ok=True)
 os.makedirs(settings.RESULTS_DIR, exist_ok=True)
 os.makedirs(settings.MODEL_DIR, exist_ok=True)
+os.makedirs(settings.CHECKPOINT_DIR, exist_ok=True)
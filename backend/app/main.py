@@ -11,6 +11,10 @@ from slowapi.util import get_remote_address
 from slowapi.errors import RateLimitExceeded
 from mangum import Mangum
 from .models.users.database import user_db_service
+from .models.lifecycle import preload_models
+from .utils.uploads import RequestSizeLimitMiddleware
+from .utils.job_executor import job_executor
+from starlette.concurrency import run_in_threadpool
 
 # Setup rate limiting
 limiter = Limiter(key_func=get_remote_address)
@@ -38,17 +42,21 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Include routers
+# Cut off oversized request bodies while they are received
+app.add_middleware(RequestSizeLimitMiddleware)
+
+# Include routers (live first so its fixed /status/... paths aren't
+# shadowed by /status/{task_id})
 app.include_router(
-    swap.router,
+    live.router,
     prefix=settings.API_V1_STR,
-    tags=["Face Swap"]
+    tags=["Real-Time Face Swap"]
 )
 
 app.include_router(
-    live.router,
+    swap.router,
     prefix=settings.API_V1_STR,
-    tags=["Real-Time Face Swap"]
+    tags=["Face Swap"]
 )
 
 # Include authentication routers
@@ -72,11 +80,33 @@ async def startup_db_client():
     """Initialize MongoDB connection on startup."""
     await user_db_service.initialize()
 
+@app.on_event("startup")
+async def startup_models():
+    """Load the face models once per API process."""
+    if not settings.API_PRELOAD_MODELS:
+        return
+    # Local job processes are forked from this one, so load fork-safe sessions
+    before_fork = settings.JOB_EXECUTOR == "local"
+    try:
+        await run_in_threadpool(preload_models, before_fork)
+    except Exception as e:
+        print(f"Warning: Failed to preload models: {str(e)}")
+
+@app.on_event("startup")
+async def startup_job_executor():
+    """Start the local job pool (a no-op with Celery)."""
+    job_executor.start()
+
 @app.on_event("shutdown")
 async def shutdown_db_client():
     """Close MongoDB connection on shutdown."""
     await user_db_service.close_connection()
 
+@app.on_event("shutdown")
+async def shutdown_job_executor():
+    """Stop the local job pool."""
+    job_executor.shutdown()
+
 @app.get("/")
 async def root():
     return {"message": "DeepFaceSwap AI API is running", "docs": "/api/docs"}
@@ -85,17 +115,6 @@ async def root():
 async def health_check():
     return {"status": "healthy"}
 
-# Import this at the end to avoid circular imports
-from .models.face_detection import face_detector
-from .models.face_swap import face_swap_engine
-
-# Preload models
-try:
-    face_detector.initialize()
-    face_swap_engine.initialize()
-except Exception as e:
-    print(f"Warning: Failed to preload models: {str(e)}")
-
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(
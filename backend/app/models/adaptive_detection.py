@@ -0,0 +1,122 @@
+import math
+import threading
+from collections import OrderedDict
+import cv2
+import numpy as np
+from ..config import settings
+
+# Face size (pixels at the detector input) the detector reliably finds
+DETECTABLE_FACE_SIZE = 20
+
+def detection_input_size(frame_shape, min_face, min_input=None, max_input=None):
+    """Smallest detector input that still resolves faces of `min_face` pixels
+
+    The frame is scaled so a `min_face` face is DETECTABLE_FACE_SIZE pixels,
+    keeping its aspect ratio, rounded up to the detector stride (32) and
+    clamped so the longer side is between `min_input` and `max_input` (and
+    never above the frame itself).
+
+    Returns:
+        (width, height) for the detector
+    """
+    min_input = min_input or settings.DETECTION_MIN_INPUT
+    max_input = max_input or settings.DETECTION_MAX_INPUT
+    height, width = frame_shape[:2]
+    longest = max(height, width)
+    target = longest * DETECTABLE_FACE_SIZE / max(float(min_face), 1.0)
+    target = min(max(target, min_input), max_input, math.ceil(longest / 32) * 32)
+    scale = target / longest
+    return (max(math.ceil(width * scale / 32), 1) * 32, max(math.ceil(height * scale / 32), 1) * 32)
+
+class FaceSizeTracker:
+    """Expected minimum face size of one stream (a video job or live session)
+
+    Starts at DETECTION_MIN_FACE_SIZE and then follows the smallest face of
+    the latest detection that found any (times DETECTION_FACE_MARGIN), so
+    close-up streams detect at a small input. Every
+    DETECTION_REFRESH_INTERVAL detections it drops to at most the default,
+    so smaller faces entering the scene are still found.
+    """
+
+    def __init__(self, default=None, margin=None, refresh_interval=None):
+        self.default = default or settings.DETECTION_MIN_FACE_SIZE
+        self.margin = margin if margin is not None else settings.DETECTION_FACE_MARGIN
+        self.refresh_interval = refresh_interval or settings.DETECTION_REFRESH_INTERVAL
+        self._observed = None
+        self._since_refresh = 0
+
+    def min_face(self):
+        """Minimum face size for the next detection"""
+        if self._observed is None:
+            return self.default
+        expected = self._observed * self.margin
+        if self._since_refresh >= self.refresh_interval:
+            self._since_refresh = 0
+            return min(expected, self.default)
+        self._since_refresh += 1
+        return expected
+
+    def observe(self, faces):
+        """Record the faces found by the latest detection"""
+        if faces is not None and len(faces):
+            boxes = np.array([face.bbox for face in faces], dtype=np.float32)
+            self._observed = float(np.minimum(boxes[:, 2] - boxes[:, 0], boxes[:, 3] - boxes[:, 1]).min())
+
+class AdaptiveDetector:
+    """Run the detector model at a per-input size
+
+    The letterbox geometry and buffers for each (frame shape, input size)
+    pair are computed once and reused, so a stream of same-sized frames
+    only pays for one resize into a preallocated input. The detector's
+    anchor centers are cached per input size by the model itself. Requires
+    a detector model with a dynamic input shape.
+    """
+
+    MAX_CACHED_SHAPES = 8
+
+    def __init__(self, det_model):
+        self.det_model = det_model
+        self._local = threading.local()  # Buffers are per thread
+
+    def _input(self, frame_shape, input_size):
+        cache = getattr(self._local, "inputs", None)
+        if cache is None:
+            cache = self._local.inputs = OrderedDict()
+        key = (frame_shape[:2], input_size)
+        entry = cache.get(key)
+        if entry is None:
+            height, width = frame_shape[:2]
+            scale = min(input_size[0] / width, input_size[1] / height)
+            resized_size = (max(int(width * scale), 1), max(int(height * scale), 1))
+            entry = cache[key] = (
+                scale,
+                resized_size,
+                np.empty((resized_size[1], resized_size[0], 3), dtype=np.uint8),
+                np.zeros((input_size[1], input_size[0], 3), dtype=np.uint8)
+            )
+            while len(cache) > self.MAX_CACHED_SHAPES:
+                cache.popitem(last=False)
+        cache.move_to_end(key)
+        return entry
+
+    def detect(self, img, min_face):
+        """Detect faces of at least about `min_face` pixels
+
+        Returns:
+            (detections (N, 5) of box and score, keypoints (N, 5, 2) or
+            None), like the detector model's detect()
+        """
+        input_size = detection_input_size(img.shape, min_face)
+        scale, resized_size, resized, det_img = self._input(img.shape, input_size)
+        cv2.resize(img, resized_size, dst=resized)
+        det_img[:resized_size[1], :resized_size[0]] = resized
+
+        scores_list, bboxes_list, kpss_list = self.det_model.forward(det_img, self.det_model.det_thresh)
+        scores = np.vstack(scores_list).ravel()
+        order = scores.argsort()[::-1]
+        pre_det = np.hstack((np.vstack(bboxes_list) / scale, scores[:, None])).astype(np.float32, copy=False)[order]
+        keep = self.det_model.nms(pre_det)
+        kpss = None
+        if getattr(self.det_model, "use_kps", True) and kpss_list:
+            kpss = (np.vstack(kpss_list) / scale)[order][keep]
+        return pre_det[keep], kpss
@@ -1,25 +1,56 @@
+import os
+import glob
 import cv2
 import numpy as np
 import insightface
 from insightface.app import FaceAnalysis
+from insightface.app.common import Face
+from insightface.model_zoo import model_zoo
+from insightface.utils import face_align
 from insightface.data import get_image as ins_get_image
 from ..config import settings
+from .face_results import FaceDetections
+from .tiled_detection import TiledDetector
+from .adaptive_detection import AdaptiveDetector
 
 class FaceDetector:
     """Face detection and alignment using InsightFace models"""
 
     def __init__(self):
+        # Loaded on first use or by app.models.lifecycle.preload_models
         self.app = None
-        self.initialize()
+        # Recognition model, loaded only when embeddings are needed
+        self.recognizer = None
+        self._recognizer_attempted = False
+        self._session_options = None
+        # Per-input-size detection, when the detector model allows it
+        self._adaptive = None
+
+    @property
+    def is_initialized(self):
+        return self.app is not None
+
+    def ensure_initialized(self):
+        """Load the detection model once, on first use"""
+        if self.app is None:
+            self.initialize()
+
+    def initialize(self, session_options=None):
+        """Initialize face detection model
 
-    def initialize(self):
-        """Initialize face detection model"""
+        Args:
+            session_options: Optional onnxruntime.SessionOptions for the models
+        """
+        self._session_options = session_options
+        self._adaptive = None
+        extra_args = {'sess_options': session_options} if session_options is not None else {}
         try:
             # Configure model with appropriate settings for face detection
             self.app = FaceAnalysis(
                 name=settings.FACE_DETECTOR,
                 allowed_modules=['detection', 'landmark_2d_106'],
-                providers=['CUDAExecutionProvider', 'CPUExecutionProvider'] if settings.USE_GPU else ['CPUExecutionProvider']
+                providers=['CUDAExecutionProvider', 'CPUExecutionProvider'] if settings.USE_GPU else ['CPUExecutionProvider'],
+                **extra_args
             )
             self.app.prepare(ctx_id=0, det_size=(640, 640))
             print("✓ Face detection model loaded successfully")
@@ -27,44 +58,133 @@ class FaceDetector:
             print(f"Error initializing face detection model: {str(e)}")
             # Fall back to CPU if GPU fails
             try:
-                self.app = FaceAnalysis(name=settings.FACE_DETECTOR)
+                self.app = FaceAnalysis(name=settings.FACE_DETECTOR, **extra_args)
                 self.app.prepare(ctx_id=-1, det_size=(640, 640))
                 print("✓ Face detection model loaded on CPU as fallback")
             except Exception as e2:
                 print(f"Critical error initializing face detection: {str(e2)}")
                 raise
 
-    def get_faces(self, img):
+    def get_faces(self, img, tiled=None, min_face=None):
         """Detect faces in an image
 
         Args:
             img: CV2 image in BGR format
+            tiled: Use tiled detection (see TiledDetector). By default it is
+                used for images whose longer side exceeds
+                TILED_DETECTION_MIN_SIDE; video paths pass False to keep
+                single-pass detection.
+            min_face: Smallest face size (pixels) to look for in a
+                single-pass detection; the detector input is sized to it
+                (see AdaptiveDetector) instead of the fixed det_size
 
         Returns:
-            List of face objects with landmarks
+            FaceDetections (iterates as face views with bbox, kps,
+            det_score, landmarks and, if computed, the embedding)
         """
-        if self.app is None:
-            self.initialize()
-
-        faces = self.app.get(img)
-        return faces
-
-    def get_largest_face(self, img):
+        self.ensure_initialized()
+
+        if tiled is None:
+            tiled = settings.TILED_DETECTION_ENABLED and max(img.shape[:2]) > settings.TILED_DETECTION_MIN_SIDE
+        if tiled:
+            bboxes, kpss = TiledDetector(self.app.det_model, self.app.det_size).detect(img)
+        elif min_face and self.adaptive_detector is not None:
+            bboxes, kpss = self.adaptive_detector.detect(img, min_face)
+        else:
+            return FaceDetections.from_faces(self.app.get(img))
+
+        faces = []
+        for bbox, kps in zip(bboxes, kpss):
+            face = Face(bbox=bbox[:4], kps=kps, det_score=bbox[4])
+            # Landmarks as in FaceAnalysis.get
+            for taskname, model in self.app.models.items():
+                if taskname != 'detection':
+                    model.get(img, face)
+            faces.append(face)
+        return FaceDetections.from_faces(faces)
+
+    @property
+    def adaptive_detector(self):
+        """AdaptiveDetector for the loaded model, or None if disabled or the
+        model's input shape is fixed"""
+        if self._adaptive is None and settings.ADAPTIVE_DETECTION_ENABLED and self.app is not None:
+            det_model = self.app.det_model
+            session = getattr(det_model, "session", None)
+            shape = session.get_inputs()[0].shape if session is not None else None
+            if shape is not None and not isinstance(shape[2], int):
+                self._adaptive = AdaptiveDetector(det_model)
+            else:
+                self._adaptive = False
+        return self._adaptive or None
+
+    def get_largest_face(self, img, with_embedding=False):
         """Get the largest face in an image
 
         Args:
             img: CV2 image in BGR format
+            with_embedding: Also compute the face's identity embedding
+                (needed for a source face)
 
         Returns:
             Largest face object or None if no face detected
         """
-        faces = self.get_faces(img)
-        if not faces:
-            return None
+        largest = self.get_faces(img).largest()
+        if largest is None or not with_embedding or largest.embedding is not None:
+            return largest
+        detections = self.compute_embeddings(img, FaceDetections(largest.as_records()))
+        return detections[0] if detections.has_embeddings else largest
 
-        # Find face with largest bounding box area
-        largest_face = max(faces, key=lambda face: (face.bbox[2] - face.bbox[0]) * (face.bbox[3] - face.bbox[1]))
-        return largest_face
+    def ensure_recognizer(self):
+        """Load the recognition model of the detector's model pack once
+
+        Returns:
+            The model, or None if the pack has none
+        """
+        self.ensure_initialized()
+        if self.recognizer is None and not self._recognizer_attempted:
+            self._recognizer_attempted = True
+            self.recognizer = self.app.models.get('recognition')
+            if self.recognizer is None:
+                extra_args = {'sess_options': self._session_options} if self._session_options is not None else {}
+                for onnx_file in sorted(glob.glob(os.path.join(self.app.model_dir, '*.onnx'))):
+                    try:
+                        model = model_zoo.get_model(
+                            onnx_file,
+                            providers=['CUDAExecutionProvider', 'CPUExecutionProvider'] if settings.USE_GPU else ['CPUExecutionProvider'],
+                            **extra_args
+                        )
+                    except Exception as e:
+                        print(f"Error loading {onnx_file}: {str(e)}")
+                        continue
+                    if model is not None and model.taskname == 'recognition':
+                        model.prepare(ctx_id=0)
+                        self.recognizer = model
+                        break
+            if self.recognizer is None:
+                print("No face recognition model found; identity matching is disabled")
+        return self.recognizer
+
+    def compute_embeddings(self, img, detections):
+        """Identity embeddings for detected faces, in one batched inference
+
+        Args:
+            img: CV2 image the faces were detected in
+            detections: FaceDetections
+
+        Returns:
+            FaceDetections with embeddings (unchanged if they already have
+            them, there are no faces or no recognition model)
+        """
+        if detections.has_embeddings or not len(detections):
+            return detections
+        recognizer = self.ensure_recognizer()
+        if recognizer is None:
+            return detections
+        crops = [
+            face_align.norm_crop(img, landmark=face.kps, image_size=recognizer.input_size[0])
+            for face in detections
+        ]
+        return detections.with_embeddings(recognizer.get_feat(crops))
 
     def get_face_embedding(self, face):
         """Get face embedding for identification/comparison
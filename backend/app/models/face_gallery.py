@@ -0,0 +1,188 @@
+import json
+from collections import OrderedDict
+import numpy as np
+from ..config import settings
+from .face_detection import face_detector
+from .face_results import FaceDetections
+
+# Which detected faces get swapped
+TARGET_POLICIES = ("all", "largest", "top_k", "min_size", "identity")
+
+class FaceGallery:
+    """Registered target identities, matched by cosine similarity
+
+    Each identity has a reference embedding and, optionally, its own
+    source face, so one job can map several people to different faces.
+    The normalized embeddings are kept as one (N, D) matrix, so matching
+    all faces of a frame is a single matrix product.
+    """
+
+    def __init__(self):
+        self.names = []
+        self.sources = []
+        self._embeddings = []
+        self._matrix = None
+
+    def __len__(self):
+        return len(self.names)
+
+    def add(self, embedding, source_face=None, name=None):
+        """Register an identity
+
+        Args:
+            embedding: Reference embedding of the person to replace
+            source_face: Face to swap in for this person (None for the
+                job's main source face)
+            name: Label for the identity
+        """
+        embedding = np.asarray(embedding, dtype=np.float32).ravel()
+        self._embeddings.append(embedding / max(float(np.linalg.norm(embedding)), 1e-12))
+        self.sources.append(source_face)
+        self.names.append(name if name is not None else f"identity_{len(self.names)}")
+        self._matrix = None
+
+    @property
+    def matrix(self):
+        if self._matrix is None:
+            self._matrix = np.stack(self._embeddings) if self._embeddings else np.zeros((0, 0), np.float32)
+        return self._matrix
+
+    def match(self, normed_embeddings, threshold=None):
+        """Best identity for each face
+
+        Args:
+            normed_embeddings: (N, D) L2-normalized face embeddings
+            threshold: Minimum cosine similarity (default IDENTITY_MATCH_THRESHOLD)
+
+        Returns:
+            (identity index per face, -1 for no match; similarity per face)
+        """
+        if threshold is None:
+            threshold = settings.IDENTITY_MATCH_THRESHOLD
+        if not len(self) or not len(normed_embeddings):
+            return np.full(len(normed_embeddings), -1), np.zeros(len(normed_embeddings), np.float32)
+
+        similarities = normed_embeddings @ self.matrix.T
+        best = np.argmax(similarities, axis=1)
+        best_similarity = similarities[np.arange(len(best)), best]
+        best[best_similarity < threshold] = -1
+        return best, best_similarity
+
+class TargetSelector:
+    """Target face selection policy for a swap job
+
+    Policies:
+        all: every detected face
+        largest: only the largest face
+        top_k: the `top_k` largest faces
+        min_size: faces at least `min_size` pixels on their shorter side
+        identity: faces matching a gallery identity (each identity at most
+            once per frame), swapped with that identity's source face
+
+    `min_size` also applies as a pre-filter to the other policies, so tiny
+    background faces never reach recognition or the swapper.
+    """
+
+    def __init__(self, policy="all", top_k=1, min_size=0.0, gallery=None, threshold=None):
+        if policy not in TARGET_POLICIES:
+            raise ValueError(f"Unknown target policy {policy!r}, expected one of {TARGET_POLICIES}")
+        if policy == "identity" and not gallery:
+            raise ValueError("The identity policy needs at least one registered identity")
+        self.policy = policy
+        self.top_k = max(1, int(top_k))
+        self.min_size = float(min_size or 0)
+        self.gallery = gallery
+        self.threshold = threshold
+
+    def assign(self, img, detections, source_face):
+        """Pick the faces to swap and the source face for each
+
+        Args:
+            img: Image the faces were detected in (for embeddings)
+            detections: FaceDetections (or a list of faces, which is
+                converted)
+            source_face: The job's main source face
+
+        Returns:
+            List of (source face, target face) pairs
+        """
+        if not isinstance(detections, FaceDetections):
+            detections = FaceDetections.from_faces(detections)
+        if self.min_size:
+            detections = detections.min_size(self.min_size)
+        if not len(detections):
+            return []
+
+        if self.policy == "largest":
+            detections = detections.top_k(1, by="area")
+        elif self.policy == "top_k":
+            detections = detections.top_k(self.top_k, by="area")
+        elif self.policy == "identity":
+            return self._assign_identities(img, detections, source_face)
+        return [(source_face, face) for face in detections]
+
+    def _assign_identities(self, img, detections, source_face):
+        detections = face_detector.compute_embeddings(img, detections)
+        if not detections.has_embeddings:
+            return []
+        matches, similarity = self.gallery.match(detections.normed_embeddings(), self.threshold)
+
+        pairs = []
+        for identity in np.unique(matches[matches >= 0]):
+            # The most similar face takes the identity
+            candidates = np.flatnonzero(matches == identity)
+            face = detections[int(candidates[np.argmax(similarity[candidates])])]
+            pairs.append((self.gallery.sources[identity] or source_face, face))
+        return pairs
+
+    @classmethod
+    def from_options(cls, options):
+        """Build a selector from the JSON options sent with a job
+
+        Args:
+            options: Dict with "policy" and optionally "top_k",
+                "min_size", "threshold" and "identities", a list of
+                {"target_path": reference image of the person to replace,
+                "source_path": image of the face to use, or None}
+
+        Returns:
+            TargetSelector, or None for the default (swap every face)
+        """
+        if not options or (options.get("policy", "all") == "all" and not options.get("min_size")):
+            return None
+
+        gallery = None
+        if options.get("identities"):
+            from .face_swap import face_swap_engine
+            gallery = FaceGallery()
+            for identity in options["identities"]:
+                reference = face_swap_engine.get_source_face(identity["target_path"])
+                if reference.embedding is None:
+                    raise ValueError("Face recognition is unavailable; identity matching can't be used")
+                source_path = identity.get("source_path")
+                source = face_swap_engine.get_source_face(source_path) if source_path else None
+                gallery.add(reference.embedding, source, name=identity.get("name"))
+
+        return cls(
+            policy=options.get("policy", "all"),
+            top_k=options.get("top_k", 1),
+            min_size=options.get("min_size", 0.0),
+            gallery=gallery,
+            threshold=options.get("threshold")
+        )
+
+# Selectors of recent jobs by their options, so per-frame callers (and
+# frame workers) build each gallery once
+_selectors = OrderedDict()
+
+def selector_for(options):
+    """Cached TargetSelector.from_options"""
+    if not options:
+        return None
+    key = json.dumps(options, sort_keys=True)
+    if key not in _selectors:
+        _selectors[key] = TargetSelector.from_options(options)
+        while len(_selectors) > 8:
+            _selectors.popitem(last=False)
+    _selectors.move_to_end(key)
+    return _selectors[key]
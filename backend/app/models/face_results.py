@@ -0,0 +1,237 @@
+import numpy as np
+from insightface.app.common import Face
+
+def face_dtype(embedding_dim=0):
+    """Structured dtype of one detected face
+
+    Args:
+        embedding_dim: Length of the identity embedding (0 to leave the
+            field out, e.g. for detection-only results)
+    """
+    fields = [
+        ("bbox", np.float32, (4,)),
+        ("det_score", np.float32),
+        ("kps", np.float32, (5, 2)),
+        ("landmark_2d_106", np.float32, (106, 2)),
+        ("has_landmarks", np.bool_),
+    ]
+    if embedding_dim:
+        fields.append(("embedding", np.float32, (embedding_dim,)))
+    return np.dtype(fields)
+
+class DetectedFace:
+    """View of one face in a FaceDetections array
+
+    Exposes the attributes the swapper and callers read from InsightFace
+    `Face` objects (bbox, kps, det_score, landmark_2d_106, embedding,
+    normed_embedding) without copying them out of the array.
+    """
+
+    __slots__ = ("_records", "_index")
+
+    def __init__(self, records, index):
+        self._records = records
+        self._index = index
+
+    @property
+    def bbox(self):
+        return self._records["bbox"][self._index]
+
+    @property
+    def kps(self):
+        return self._records["kps"][self._index]
+
+    @property
+    def det_score(self):
+        return float(self._records["det_score"][self._index])
+
+    @property
+    def landmark_2d_106(self):
+        if not self._records["has_landmarks"][self._index]:
+            return None
+        return self._records["landmark_2d_106"][self._index]
+
+    @property
+    def embedding(self):
+        if "embedding" not in self._records.dtype.names:
+            return None
+        return self._records["embedding"][self._index]
+
+    @property
+    def normed_embedding(self):
+        embedding = self.embedding
+        return None if embedding is None else embedding / np.linalg.norm(embedding)
+
+    @property
+    def area(self):
+        x1, y1, x2, y2 = self.bbox
+        return float((x2 - x1) * (y2 - y1))
+
+    def get(self, key, default=None):
+        """Dict-style access, as on InsightFace Face objects"""
+        value = getattr(self, key, None) if key in _FACE_ATTRIBUTES else None
+        return default if value is None else value
+
+    def __getitem__(self, key):
+        value = self.get(key)
+        if value is None:
+            raise KeyError(key)
+        return value
+
+    def as_records(self):
+        """This face as a one-record array (a view, for FaceDetections or saving)"""
+        return self._records[self._index:self._index + 1]
+
+    def to_face(self):
+        """Standalone InsightFace Face with copies of this face's fields"""
+        fields = {key: self.get(key) for key in ("bbox", "kps", "det_score", "landmark_2d_106", "embedding")}
+        return Face(**{key: np.copy(value) if isinstance(value, np.ndarray) else value
+                       for key, value in fields.items() if value is not None})
+
+    def __repr__(self):
+        return f"DetectedFace(bbox={self.bbox.tolist()}, det_score={self.det_score:.3f})"
+
+_FACE_ATTRIBUTES = ("bbox", "kps", "det_score", "landmark_2d_106", "embedding", "normed_embedding")
+
+class FaceDetections:
+    """Detected faces of one image as a structured numpy array
+
+    One record per face holds the bbox, score, 5-point and 106-point
+    landmarks and (optionally) the embedding. Iterating yields
+    DetectedFace views, selections (largest, top_k, min_size) are
+    vectorized over the array, and to_bytes()/from_bytes() serialize the
+    whole result as a single buffer.
+    """
+
+    __slots__ = ("records",)
+
+    def __init__(self, records):
+        self.records = records
+
+    @classmethod
+    def empty(cls, embedding_dim=0):
+        return cls(np.zeros(0, dtype=face_dtype(embedding_dim)))
+
+    @classmethod
+    def from_faces(cls, faces):
+        """Pack InsightFace Face objects (or any objects with the same attributes)"""
+        faces = list(faces)
+        embedding_dim = 0
+        for face in faces:
+            embedding = getattr(face, "embedding", None)
+            if embedding is not None:
+                embedding_dim = len(embedding)
+                break
+
+        records = np.zeros(len(faces), dtype=face_dtype(embedding_dim))
+        for i, face in enumerate(faces):
+            records["bbox"][i] = face.bbox
+            det_score = getattr(face, "det_score", None)
+            records["det_score"][i] = 1.0 if det_score is None else det_score
+            if getattr(face, "kps", None) is not None:
+                records["kps"][i] = face.kps
+            landmarks = getattr(face, "landmark_2d_106", None)
+            if landmarks is not None:
+                records["landmark_2d_106"][i] = landmarks
+                records["has_landmarks"][i] = True
+            embedding = getattr(face, "embedding", None)
+            if embedding_dim and embedding is not None:
+                records["embedding"][i] = embedding
+        return cls(records)
+
+    @classmethod
+    def from_arrays(cls, bboxes, kps, det_scores=None):
+        """Build from stacked bboxes (N, 4) and keypoints (N, 5, 2)"""
+        records = np.zeros(len(bboxes), dtype=face_dtype())
+        records["bbox"] = bboxes
+        records["kps"] = kps
+        records["det_score"] = 1.0 if det_scores is None else det_scores
+        return cls(records)
+
+    def __len__(self):
+        return len(self.records)
+
+    def __bool__(self):
+        return len(self.records) > 0
+
+    def __iter__(self):
+        return (DetectedFace(self.records, i) for i in range(len(self.records)))
+
+    def __getitem__(self, key):
+        """An int gives a DetectedFace; a slice, index array or mask gives FaceDetections"""
+        if isinstance(key, (int, np.integer)):
+            index = int(key)
+            if index < 0:
+                index += len(self.records)
+            if not 0 <= index < len(self.records):
+                raise IndexError("face index out of range")
+            return DetectedFace(self.records, index)
+        return FaceDetections(self.records[key])
+
+    @property
+    def bboxes(self):
+        return self.records["bbox"]
+
+    @property
+    def scores(self):
+        return self.records["det_score"]
+
+    def areas(self):
+        """Bounding box areas of all faces"""
+        boxes = self.records["bbox"]
+        return (boxes[:, 2] - boxes[:, 0]) * (boxes[:, 3] - boxes[:, 1])
+
+    def largest(self):
+        """The face with the largest bounding box, or None"""
+        if not len(self.records):
+            return None
+        return self[int(np.argmax(self.areas()))]
+
+    def top_k(self, k, by="score"):
+        """The k best faces by "score" or "area", best first"""
+        values = self.scores if by == "score" else self.areas()
+        order = np.argsort(-values, kind="stable")[:k]
+        return self[order]
+
+    def min_size(self, pixels):
+        """Faces whose bbox is at least `pixels` on its shorter side"""
+        boxes = self.records["bbox"]
+        sides = np.minimum(boxes[:, 2] - boxes[:, 0], boxes[:, 3] - boxes[:, 1])
+        return self[sides >= pixels]
+
+    @property
+    def has_embeddings(self):
+        return "embedding" in self.records.dtype.names
+
+    def with_embeddings(self, embeddings):
+        """Copy of these detections with an (N, D) array of embeddings added"""
+        embeddings = np.asarray(embeddings, dtype=np.float32).reshape(len(self.records), -1)
+        records = np.zeros(len(self.records), dtype=face_dtype(embeddings.shape[1]))
+        for name in self.records.dtype.names:
+            if name != "embedding":
+                records[name] = self.records[name]
+        records["embedding"] = embeddings
+        return FaceDetections(records)
+
+    def normed_embeddings(self):
+        """L2-normalized embeddings as an (N, D) array"""
+        embeddings = self.records["embedding"]
+        norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+        return embeddings / np.maximum(norms, 1e-12)
+
+    def to_faces(self):
+        """Standalone InsightFace Face objects"""
+        return [face.to_face() for face in self]
+
+    def to_bytes(self):
+        """Serialize as the embedding length (uint32) followed by the raw records"""
+        embedding_dim = self.records.dtype["embedding"].shape[0] if "embedding" in self.records.dtype.names else 0
+        return np.uint32(embedding_dim).tobytes() + np.ascontiguousarray(self.records).tobytes()
+
+    @classmethod
+    def from_bytes(cls, data):
+        embedding_dim = int(np.frombuffer(data[:4], dtype=np.uint32)[0])
+        return cls(np.frombuffer(data[4:], dtype=face_dtype(embedding_dim)).copy())
+
+    def __repr__(self):
+        return f"FaceDetections({len(self)} faces)"
@@ -2,26 +2,43 @@ import os
 import cv2
 import numpy as np
 import insightface
+import onnxruntime
 from insightface.app import FaceAnalysis
 # Using inswapper from model_zoo instead
 from insightface.model_zoo import inswapper
 import uuid
+from collections import OrderedDict
+from insightface.app.common import Face
 from ..config import settings
 from .face_detection import face_detector
+from .face_results import DetectedFace, FaceDetections
 
 class FaceSwapEngine:
     """Engine for face swapping using InsightFace models"""
 
+    FACE_CACHE_SIZE = 64
+
     def __init__(self):
+        # Loaded on first use or by app.models.lifecycle.preload_models
         self.swapper = None
         self.model_initialized = False
-        self.initialize()
+        self.init_attempted = False
+
+        # Cache for source faces to avoid reprocessing (LRU by image path)
+        self.face_cache = OrderedDict()
 
-        # Cache for source faces to avoid reprocessing
-        self.face_cache = {}
+    def ensure_initialized(self):
+        """Load the swapping model once, on first use"""
+        if not self.init_attempted:
+            self.initialize()
 
-    def initialize(self):
-        """Initialize face swapping model"""
+    def initialize(self, session_options=None):
+        """Initialize face swapping model
+
+        Args:
+            session_options: Optional onnxruntime.SessionOptions for the model
+        """
+        self.init_attempted = True
         model_path = os.path.join(settings.MODEL_DIR, 'inswapper_128.onnx')
         if not os.path.exists(model_path):
             print(f"Face swapping model not found at {model_path}")
@@ -31,7 +48,14 @@ class FaceSwapEngine:
 
         try:
             # Initialize InsightFace swapper model
-            self.swapper = inswapper.INSwapper(model_file=model_path)
+            session = None
+            if session_options is not None:
+                session = onnxruntime.InferenceSession(
+                    model_path,
+                    sess_options=session_options,
+                    providers=['CUDAExecutionProvider', 'CPUExecutionProvider'] if settings.USE_GPU else ['CPUExecutionProvider']
+                )
+            self.swapper = inswapper.INSwapper(model_file=model_path, session=session)
             self.model_initialized = True
             print("✓ Face swapping model loaded successfully")
         except Exception as e:
@@ -41,50 +65,99 @@ class FaceSwapEngine:
     def get_source_face(self, source_img):
         """Get source face for swapping
 
+        Faces of image paths are cached in memory and in a `.face.npz` file
+        next to the image, so later jobs for the same upload (e.g. a full
+        render after a preview, possibly on another worker) skip detection.
+
         Args:
-            source_img: CV2 image containing source face
+            source_img: CV2 image or path of the image containing source face
 
         Returns:
             Source face object for swapping
         """
         # Check if image is a string/path and load if needed
-        if isinstance(source_img, str):
-            if source_img in self.face_cache:
-                return self.face_cache[source_img]
-            source_img = cv2.imread(source_img)
+        source_path = source_img if isinstance(source_img, str) else None
+        if source_path is not None:
+            if source_path in self.face_cache:
+                self.face_cache.move_to_end(source_path)
+                return self.face_cache[source_path]
+            source_face = self._load_face_file(source_path)
+            if source_face is not None:
+                self._cache_face(source_path, source_face)
+                return source_face
+            source_img = cv2.imread(source_path)
 
         # Get the largest face from the image
-        source_face = face_detector.get_largest_face(source_img)
+        source_face = face_detector.get_largest_face(source_img, with_embedding=True)
 
         if source_face is None:
             raise ValueError("No face detected in source image")
 
         # Cache using image path if provided
-        if isinstance(source_img, str):
-            self.face_cache[source_img] = source_face
+        if source_path is not None:
+            self._cache_face(source_path, source_face)
+            self._save_face_file(source_path, source_face)
 
         return source_face
 
-    def swap_face(self, source_img, target_img, enhance_result=True):
+    def _cache_face(self, source_path, source_face):
+        self.face_cache[source_path] = source_face
+        while len(self.face_cache) > self.FACE_CACHE_SIZE:
+            self.face_cache.popitem(last=False)
+
+    @staticmethod
+    def face_file_path(source_path):
+        """Path of the cached face file for a source image"""
+        return source_path + ".face.npz"
+
+    def _save_face_file(self, source_path, source_face):
+        try:
+            temp_path = self.face_file_path(source_path) + ".tmp"
+            with open(temp_path, "wb") as f:
+                if isinstance(source_face, DetectedFace):
+                    # The face's record, as is
+                    np.savez(f, records=source_face.as_records())
+                else:
+                    np.savez(f, **{key: np.asarray(value) for key, value in source_face.items() if value is not None})
+            os.replace(temp_path, self.face_file_path(source_path))
+        except Exception as e:
+            print(f"Error caching source face for {source_path}: {str(e)}")
+
+    def _load_face_file(self, source_path):
+        face_path = self.face_file_path(source_path)
+        if not os.path.exists(face_path):
+            return None
+        try:
+            with np.load(face_path) as data:
+                if "records" in data.files:
+                    return FaceDetections(data["records"])[0]
+                return Face(**{
+                    key: data[key].item() if data[key].ndim == 0 else data[key]
+                    for key in data.files
+                })
+        except Exception as e:
+            print(f"Error reading cached source face {face_path}: {str(e)}")
+            return None
+
+    def swap_face(self, source_img, target_img, enhance_result=True, selector=None):
         """Swap face from source image to target image
 
         Args:
             source_img: Source image (with face to use)
             target_img: Target image (to place face onto)
             enhance_result: Apply enhancements to result
+            selector: TargetSelector choosing which faces to swap (and
+                with which source face); all faces if omitted
 
         Returns:
             Image with swapped face
         """
         # Check if swapping is available
+        self.ensure_initialized()
         if not self.model_initialized:
             print("Face swapping model not initialized - returning original image")
             return target_img
 
-        # Ensure the swapper is initialized
-        if self.swapper is None:
-            self.initialize()
-
         # Get source face
         source_face = self.get_source_face(source_img)
 
@@ -98,11 +171,11 @@ class FaceSwapEngine:
         # Create a copy of the target image for modification
         result_img = target_img.copy()
 
-        # Apply face swap to all detected faces
-        for target_face in target_faces:
+        # Apply face swap to the selected faces
+        for pair_source, target_face in self._swap_pairs(target_img, target_faces, source_face, selector):
             try:
                 # Perform the face swap
-                result_img = self.swapper.swap_face(result_img, source_face, target_face)
+                self.paste_face(result_img, pair_source, target_face)
             except Exception as e:
                 print(f"Error swapping face: {str(e)}")
                 continue
@@ -113,41 +186,125 @@ class FaceSwapEngine:
 
         return result_img
 
-    def swap_face_video_frame(self, source_face, frame):
+    def detect_faces(self, frame, min_face=None):
+        """Locate the faces of a frame, for reuse as `target_faces`
+
+        Args:
+            frame: Video frame
+            min_face: Smallest face size to look for (see FaceSizeTracker)
+        """
+        return face_detector.get_faces(frame, tiled=False, min_face=min_face)
+
+    def swap_face_video_frame(self, source_face, frame, target_faces=None, out=None, selector=None):
         """Swap face in a video frame
 
         Args:
             source_face: Preprocessed source face
             frame: Video frame to process
+            target_faces: Already located target faces (skips detection)
+            out: Preallocated array to write the result into (e.g. from
+                the frame buffer pool); may be `frame` itself to swap in
+                place. A new array is allocated if omitted.
+            selector: TargetSelector choosing which faces to swap (and
+                with which source face); all faces if omitted
 
         Returns:
-            Processed frame with swapped face
+            Processed frame with swapped face (`frame` itself if no face
+            was found, else `out` or the new array)
         """
         # Check if swapping is available
+        self.ensure_initialized()
         if not self.model_initialized:
             return frame
 
-        # Ensure the swapper is initialized
-        if self.swapper is None:
-            self.initialize()
-
-        # Detect target faces
-        target_faces = face_detector.get_faces(frame)
+        # Detect target faces unless the caller already located them
+        if target_faces is None:
+            target_faces = face_detector.get_faces(frame, tiled=False)
 
-        if not target_faces:
+        # Faces that aren't selected cost no swap work
+        pairs = self._swap_pairs(frame, target_faces, source_face, selector)
+        if not pairs:
             return frame
 
         # Apply face swap
-        result_frame = frame.copy()
-        for target_face in target_faces:
+        if out is None:
+            result_frame = frame.copy()
+        else:
+            result_frame = out
+            if out is not frame:
+                np.copyto(out, frame)
+        for pair_source, target_face in pairs:
             try:
-                result_frame = self.swapper.swap_face(result_frame, source_face, target_face)
+                self.paste_face(result_frame, pair_source, target_face)
             except Exception as e:
                 print(f"Error swapping face in video frame: {str(e)}")
                 continue
 
         return result_frame
 
+    @staticmethod
+    def _swap_pairs(img, target_faces, source_face, selector):
+        """(source face, target face) pairs to swap"""
+        if not target_faces:
+            return []
+        if selector is None:
+            return [(source_face, target_face) for target_face in target_faces]
+        return selector.assign(img, target_faces, source_face)
+
+    def paste_face(self, img, source_face, target_face):
+        """Swap one face into an image in place
+
+        Same blend as the swapper's own paste-back, but the warps and the
+        mask are computed only over the face's bounding box instead of
+        as full-frame float arrays, and the result is written into `img`.
+
+        Args:
+            img: Image to modify (BGR uint8)
+            source_face: Preprocessed source face
+            target_face: Face in `img` to replace
+        """
+        bgr_fake, M = self.swapper.get(img, target_face, source_face, paste_back=False)
+        size = bgr_fake.shape[0]
+        IM = cv2.invertAffineTransform(M)
+
+        # Bounding box of the warped crop, padded for the mask blur
+        corners = np.array([[0, 0], [size, 0], [0, size], [size, size]], dtype=np.float32)
+        points = corners @ IM[:, :2].T + IM[:, 2]
+        pad = max(int(np.sqrt(np.ptp(points[:, 0]) * np.ptp(points[:, 1]))) // 20, 5) + 2
+        height, width = img.shape[:2]
+        x0 = max(0, int(np.floor(points[:, 0].min())) - pad)
+        y0 = max(0, int(np.floor(points[:, 1].min())) - pad)
+        x1 = min(width, int(np.ceil(points[:, 0].max())) + pad + 1)
+        y1 = min(height, int(np.ceil(points[:, 1].max())) + pad + 1)
+        if x1 <= x0 or y1 <= y0:
+            return img
+
+        IM[:, 2] -= (x0, y0)
+        roi = img[y0:y1, x0:x1]
+        roi_size = (x1 - x0, y1 - y0)
+        fake = cv2.warpAffine(bgr_fake, IM, roi_size, borderValue=0.0)
+        mask = cv2.warpAffine(np.full((size, size), 255, dtype=np.float32), IM, roi_size, borderValue=0.0)
+        mask[mask > 20] = 255
+        rows, cols = np.where(mask == 255)
+        if rows.size == 0:
+            return img
+        mask_size = int(np.sqrt((rows.max() - rows.min()) * (cols.max() - cols.min())))
+        blur_k = max(mask_size // 20, 5)
+
+        erode_k = max(mask_size // 10, 10)
+        mask = cv2.erode(mask, np.ones((erode_k, erode_k), np.uint8), iterations=1)
+        mask = cv2.GaussianBlur(mask, (2 * blur_k + 1, 2 * blur_k + 1), 0)
+        mask *= 1 / 255
+        mask = mask[:, :, np.newaxis]
+
+        # roi = mask * fake + (1 - mask) * roi, written back into img
+        blended = fake.astype(np.float32)
+        blended -= roi
+        blended *= mask
+        blended += roi
+        np.copyto(roi, blended, casting="unsafe")
+        return img
+
     def enhance_image(self, img):
         """Apply enhancements to improve the swapped face
 
@@ -199,12 +356,17 @@ class FaceSwapEngine:
 
         return result_frames
 
-    def add_watermark(self, img, text="AI-Generated"):
+    def add_watermark(self, img, text="AI-Generated", out=None):
         """Add a watermark to the image
 
+        Only the corner the watermark covers is blended, so no full-size
+        overlay is allocated.
+
         Args:
             img: Image to watermark
             text: Watermark text
+            out: Preallocated array for the result; may be `img` itself to
+                watermark in place. A copy is allocated if omitted.
 
         Returns:
             Watermarked image
@@ -214,16 +376,29 @@ class FaceSwapEngine:
         font_scale = w / 1000
         thickness = max(1, int(w / 500))
 
+        if out is None:
+            out = img.copy()
+        elif out is not img:
+            np.copyto(out, img)
+
+        # Corner region holding the box and the text
+        (text_w, text_h), baseline = cv2.getTextSize(text, font, font_scale, thickness)
+        x1 = min(w, max(w // 4, 10 + text_w) + thickness + 2)
+        y0 = max(0, min(h - 30, h - 10 - text_h) - thickness - 2)
+        region = out[y0:h, 0:x1]
+        if region.size == 0:
+            return out
+
         # Add semi-transparent overlay in corner
-        overlay = img.copy()
-        cv2.rectangle(overlay, (0, h-30), (w//4, h), (0, 0, 0), -1)
-        cv2.putText(overlay, text, (10, h-10), font, font_scale, (255, 255, 255), thickness)
+        overlay = region.copy()
+        cv2.rectangle(overlay, (0, h - 30 - y0), (w // 4, h - y0), (0, 0, 0), -1)
+        cv2.putText(overlay, text, (10, h - 10 - y0), font, font_scale, (255, 255, 255), thickness)
 
         # Apply the overlay with transparency
         alpha = 0.7
-        result_img = cv2.addWeighted(overlay, alpha, img, 1 - alpha, 0)
+        cv2.addWeighted(overlay, alpha, region, 1 - alpha, 0, dst=region)
 
-        return result_img
+        return out
 
 # Singleton instance for reuse
 face_swap_engine = FaceSwapEngine()
@@ -0,0 +1,74 @@
+import threading
+import onnxruntime
+from .face_detection import face_detector
+from .face_swap import face_swap_engine
+
+def fork_safe_session_options():
+    """Session options for models that will be shared across forked children
+
+    ONNX Runtime thread pools don't survive fork(), so sessions created in a
+    prefork parent run single-threaded and children parallelize by process.
+    """
+    options = onnxruntime.SessionOptions()
+    options.intra_op_num_threads = 1
+    options.inter_op_num_threads = 1
+    options.execution_mode = onnxruntime.ExecutionMode.ORT_SEQUENTIAL
+    return options
+
+def preload_models(before_fork=False):
+    """Load the detection and swapping models into this process
+
+    Safe to call more than once; models already loaded are kept.
+
+    Args:
+        before_fork: Build fork-safe sessions so prefork children can share
+            the parent's read-only weights through copy-on-write
+    """
+    session_options = fork_safe_session_options() if before_fork else None
+
+    if not face_detector.is_initialized:
+        face_detector.initialize(session_options)
+    if not face_swap_engine.init_attempted:
+        face_swap_engine.initialize(session_options)
+
+# Thread started by preload_models_in_background in this process
+_preload_thread = None
+
+def preload_models_in_background(before_fork=False, then=None):
+    """Start preload_models in a thread and return at once
+
+    For process init hooks that must not block: a Celery child only reports
+    to its pool once worker_process_init returns, and is killed if that
+    takes longer than worker_proc_alive_timeout. Jobs call
+    wait_for_preload() before using the models.
+
+    Args:
+        before_fork: See preload_models
+        then: Optional callable run in the thread after the models load
+    """
+    global _preload_thread
+
+    def run():
+        try:
+            preload_models(before_fork)
+        except Exception as e:
+            # The first job loads them again (and reports the error)
+            print(f"Error preloading models: {str(e)}")
+        if then is not None:
+            then()
+
+    _preload_thread = threading.Thread(target=run, name="model-preload", daemon=True)
+    _preload_thread.start()
+    return _preload_thread
+
+def wait_for_preload():
+    """Block until a background preload in this process has finished"""
+    if _preload_thread is not None:
+        _preload_thread.join()
+
+def models_loaded():
+    """Report which models are loaded in this process"""
+    return {
+        "face_detector": face_detector.is_initialized,
+        "face_swapper": face_swap_engine.model_initialized
+    }
@@ -0,0 +1,142 @@
+import cv2
+import numpy as np
+from ..config import settings
+from .box_geometry import nms
+
+def tile_origins(length, tile, overlap):
+    """Start offsets of overlapping tiles covering `length` pixels"""
+    if length <= tile:
+        return [0]
+    stride = max(int(tile * (1 - overlap)), 1)
+    origins = list(range(0, length - tile, stride))
+    return origins + [length - tile]
+
+class TiledDetector:
+    """Two-level detection for images much larger than the detector input
+
+    The detector model sees a fixed `input_size` (640x640), so a large
+    photo is shrunk several times and small faces fall below what it can
+    find. Here a coarse pass runs on the image scaled to
+    TILED_DETECTION_COARSE_SIDE (tiled at the input size) with a low score
+    threshold to find candidates. Faces that are confident and big enough
+    at that scale are kept; only the full-resolution tiles around the
+    others are detected again. Boxes from both levels are merged with NMS.
+    """
+
+    def __init__(self, det_model, input_size=(640, 640)):
+        self.det_model = det_model
+        self.input_size = input_size
+
+    def _forward(self, img, threshold):
+        """Run the detector on one image (letterboxed into the input size)
+
+        Returns:
+            (boxes (N, 4), scores (N,), keypoints (N, 5, 2) or None) in
+            image coordinates, before NMS
+        """
+        input_width, input_height = self.input_size
+        scale = min(input_width / img.shape[1], input_height / img.shape[0])
+        width, height = max(int(img.shape[1] * scale), 1), max(int(img.shape[0] * scale), 1)
+        det_img = np.zeros((input_height, input_width, 3), dtype=np.uint8)
+        det_img[:height, :width] = cv2.resize(img, (width, height)) if scale != 1 else img
+
+        scores_list, bboxes_list, kpss_list = self.det_model.forward(det_img, threshold)
+        scores = np.vstack(scores_list).ravel() if scores_list else np.zeros(0, np.float32)
+        boxes = (np.vstack(bboxes_list) if bboxes_list else np.zeros((0, 4), np.float32)) / scale
+        kpss = np.vstack(kpss_list) / scale if kpss_list and getattr(self.det_model, "use_kps", True) else None
+        return boxes.astype(np.float32), scores.astype(np.float32), kpss
+
+    def _detect_tiles(self, img, origins, size, threshold):
+        """Detect in the given tiles, mapping results back to the image
+
+        Returns:
+            List of (boxes, scores, keypoints, truncated) per tile, where
+            `truncated` marks boxes touching a tile edge inside the image
+            (faces cut by the tile, seen whole by an overlapping one)
+        """
+        height, width = img.shape[:2]
+        results = []
+        for x, y in origins:
+            boxes, scores, kpss = self._forward(img[y:y + size[1], x:x + size[0]], threshold)
+            inner = np.array([x > 0, y > 0, x + size[0] < width, y + size[1] < height])
+            edges = np.array([0, 0, size[0], size[1]], dtype=np.float32)
+            truncated = ((np.abs(boxes - edges) <= 2) & inner).any(axis=1)
+            offset = np.array([x, y], dtype=np.float32)
+            boxes = boxes + np.tile(offset, 2)
+            kpss = kpss + offset if kpss is not None else np.zeros((len(boxes), 5, 2), np.float32)
+            results.append((boxes, scores, kpss, truncated))
+        return results
+
+    def candidate_tiles(self, shape, boxes, tile_size=None, overlap=None):
+        """Full-resolution tiles containing the centers of the candidate boxes"""
+        tile_size = tile_size or settings.TILED_DETECTION_TILE_SIZE
+        overlap = settings.TILED_DETECTION_TILE_OVERLAP if overlap is None else overlap
+        height, width = shape[:2]
+        tile_w, tile_h = min(tile_size, width), min(tile_size, height)
+        xs = np.array(tile_origins(width, tile_w, overlap))
+        ys = np.array(tile_origins(height, tile_h, overlap))
+
+        tiles = set()
+        for x1, y1, x2, y2 in boxes:
+            cx, cy = (x1 + x2) / 2, (y1 + y2) / 2
+            # The tile whose center is nearest, so the face is well inside it
+            x = xs[np.argmin(np.abs(xs + tile_w / 2 - cx))]
+            y = ys[np.argmin(np.abs(ys + tile_h / 2 - cy))]
+            tiles.add((int(x), int(y)))
+        return sorted(tiles), (tile_w, tile_h)
+
+    def detect(self, img):
+        """Detect faces in a large image
+
+        Returns:
+            (detections (N, 5) of box and score, keypoints (N, 5, 2)),
+            like the detector model's detect()
+        """
+        det_thresh = self.det_model.det_thresh
+        height, width = img.shape[:2]
+
+        # Coarse level: the image at coarse_side, in input-size tiles
+        scale = min(settings.TILED_DETECTION_COARSE_SIDE / max(height, width), 1.0)
+        coarse = cv2.resize(img, (max(int(width * scale), 1), max(int(height * scale), 1)), interpolation=cv2.INTER_AREA)
+        coarse_tiles = [
+            (x, y)
+            for y in tile_origins(coarse.shape[0], min(self.input_size[1], coarse.shape[0]), 0.25)
+            for x in tile_origins(coarse.shape[1], min(self.input_size[0], coarse.shape[1]), 0.25)
+        ]
+        coarse_size = (min(self.input_size[0], coarse.shape[1]), min(self.input_size[1], coarse.shape[0]))
+        levels = self._detect_tiles(coarse, coarse_tiles, coarse_size, settings.TILED_DETECTION_CANDIDATE_THRESHOLD)
+        boxes = np.concatenate([level[0] for level in levels]) / scale
+        scores = np.concatenate([level[1] for level in levels])
+        kpss = np.concatenate([level[2] for level in levels]) / scale
+
+        # Faces the coarse level resolved well are final; the rest are
+        # candidates for full-resolution tiles
+        coarse_sides = np.minimum(boxes[:, 2] - boxes[:, 0], boxes[:, 3] - boxes[:, 1]) * scale
+        reliable = (scores >= det_thresh) & (coarse_sides >= settings.TILED_DETECTION_RELIABLE_SIZE)
+        truncated = np.concatenate([level[3] for level in levels])
+        results = [(boxes[reliable], scores[reliable], kpss[reliable], truncated[reliable])]
+        tiles, tile_size = self.candidate_tiles(img.shape, boxes[~reliable & ~truncated])
+        results += self._detect_tiles(img, tiles, tile_size, det_thresh)
+
+        boxes, scores, kpss, truncated = (np.concatenate([result[i] for result in results]) for i in range(4))
+        confident = scores >= det_thresh
+        boxes, scores, kpss, truncated = boxes[confident], scores[confident], kpss[confident], truncated[confident]
+        return self._merge(boxes, scores, kpss, truncated)
+
+    def _merge(self, boxes, scores, kpss, truncated):
+        """NMS across tiles, preferring whole faces over tile-cut ones"""
+        keep = nms(boxes, scores - truncated, getattr(self.det_model, "nms_thresh", 0.4))
+        whole = keep[~truncated[keep]]
+        merged = []
+        for index in keep:
+            if truncated[index] and len(whole):
+                # A cut face mostly inside a whole one is a piece of it
+                box = boxes[index]
+                inside_x = np.clip(np.minimum(box[2], boxes[whole, 2]) - np.maximum(box[0], boxes[whole, 0]), 0, None)
+                inside_y = np.clip(np.minimum(box[3], boxes[whole, 3]) - np.maximum(box[1], boxes[whole, 1]), 0, None)
+                area = max(float((box[2] - box[0]) * (box[3] - box[1])), 1e-6)
+                if (inside_x * inside_y / area).max() > 0.5:
+                    continue
+            merged.append(index)
+        merged = np.array(merged, dtype=np.int64)
+        return np.hstack([boxes[merged], scores[merged, None]]).astype(np.float32), kpss[merged]
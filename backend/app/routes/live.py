@@ -11,7 +11,10 @@ from fastapi.responses import JSONResponse
 from ..config import settings
 from ..models.face_swap import face_swap_engine
 from ..models.face_detection import face_detector
+from ..models.adaptive_detection import FaceSizeTracker
 from ..utils.video_processor import video_processor
+from ..utils.face_hints import parse_face_hints, hints_match_detection
+from ..utils.latency_metrics import StageTimer, live_metrics
 
 router = APIRouter()
 
@@ -31,7 +34,12 @@ class ConnectionManager:
             active_connections[session_id] = {
                 "websocket": websocket,
                 "source_face": None,
-                "connected_at": time.time()
+                "connected_at": time.time(),
+                # Client face hint bookkeeping
+                "frames_since_verify": settings.LIVE_HINT_VERIFY_INTERVAL,
+                "hints_suspended_for": 0,
+                # Face sizes of the stream, for the detection input size
+                "face_sizes": FaceSizeTracker()
             }
         else:
             # Update existing session
@@ -42,6 +50,7 @@ class ConnectionManager:
         """Remove a WebSocket connection"""
         if session_id in active_connections:
             del active_connections[session_id]
+        live_metrics.drop_session(session_id)
 
     @staticmethod
     def get_connection(session_id: str) -> Optional[dict]:
@@ -62,6 +71,55 @@ class ConnectionManager:
 # Initialize connection manager
 connection_manager = ConnectionManager()
 
+def detect_live_faces(conn_info: dict, frame: np.ndarray):
+    """Server-side detection for a live frame, sized to the session's faces"""
+    face_sizes = conn_info.get("face_sizes")
+    if face_sizes is None or not settings.ADAPTIVE_DETECTION_ENABLED:
+        return face_detector.get_faces(frame, tiled=False)
+    faces = face_detector.get_faces(frame, tiled=False, min_face=face_sizes.min_face())
+    face_sizes.observe(faces)
+    return faces
+
+def resolve_target_faces(conn_info: dict, hints, frame: np.ndarray):
+    """Pick the target faces for a live frame
+
+    Client hints are used directly when valid, with server-side detection
+    run every LIVE_HINT_VERIFY_INTERVAL hinted frames to confirm them. A
+    failed check suspends hints for the session for one interval.
+
+    Args:
+        conn_info: Session info from the connection manager
+        hints: Optional "faces" field of the video_frame message
+        frame: Decoded video frame
+
+    Returns:
+        Tuple of (target faces or None to let the engine detect, source label)
+    """
+    if not settings.LIVE_FACE_HINTS_ENABLED or hints is None:
+        return None, "server"
+
+    if conn_info["hints_suspended_for"] > 0:
+        conn_info["hints_suspended_for"] -= 1
+        return None, "server"
+
+    hint_faces = parse_face_hints(hints, frame.shape)
+    if hint_faces is None:
+        return None, "server"
+
+    conn_info["frames_since_verify"] += 1
+    if conn_info["frames_since_verify"] < settings.LIVE_HINT_VERIFY_INTERVAL:
+        return hint_faces, "hint"
+
+    # Periodic verification against the server-side detector
+    conn_info["frames_since_verify"] = 0
+    detected_faces = detect_live_faces(conn_info, frame)
+    if hints_match_detection(hint_faces, detected_faces):
+        return hint_faces, "hint"
+
+    conn_info["hints_suspended_for"] = settings.LIVE_HINT_VERIFY_INTERVAL
+    conn_info["frames_since_verify"] = settings.LIVE_HINT_VERIFY_INTERVAL
+    return detected_faces, "server"
+
 @router.websocket("/process/live")
 async def live_face_swap(websocket: WebSocket):
     """WebSocket endpoint for real-time face swapping
@@ -137,25 +195,49 @@ async def live_face_swap(websocket: WebSocket):
                         continue
 
                     source_face = conn_info["source_face"]
+                    timer = StageTimer()
 
                     # Decode video frame
-                    encoded_data = message.get("data").split(",")[1]
-                    img_bytes = base64.b64decode(encoded_data)
-                    img_array = np.frombuffer(img_bytes, np.uint8)
-                    frame = cv2.imdecode(img_array, cv2.IMREAD_COLOR)
+                    with timer.stage("b64decode"):
+                        encoded_data = message.get("data").split(",")[1]
+                        img_bytes = base64.b64decode(encoded_data)
+                    with timer.stage("imdecode"):
+                        img_array = np.frombuffer(img_bytes, np.uint8)
+                        frame = cv2.imdecode(img_array, cv2.IMREAD_COLOR)
 
-                    # Process the frame
-                    result_frame = face_swap_engine.swap_face_video_frame(source_face, frame)
+                    # Use client face hints when available, else detect on the server
+                    with timer.stage("detect"):
+                        target_faces, detection_source = resolve_target_faces(
+                            conn_info, message.get("faces"), frame
+                        )
+                        if target_faces is None:
+                            target_faces = detect_live_faces(conn_info, frame)
+
+                    # Process the frame (in place: the decoded frame isn't used again)
+                    with timer.stage("swap"):
+                        result_frame = face_swap_engine.swap_face_video_frame(
+                            source_face, frame, target_faces=target_faces, out=frame
+                        )
 
                     # Encode result frame to base64
-                    _, buffer = cv2.imencode('.jpg', result_frame, [cv2.IMWRITE_JPEG_QUALITY, 85])
-                    encoded_result = base64.b64encode(buffer).decode('utf-8')
+                    with timer.stage("encode"):
+                        _, buffer = cv2.imencode('.jpg', result_frame, [cv2.IMWRITE_JPEG_QUALITY, 85])
+                        encoded_result = base64.b64encode(buffer).decode('utf-8')
 
-                    # Send processed frame
-                    await websocket.send_json({
+                    timings = timer.finish()
+                    live_metrics.record(session_id, timings)
+
+                    response = {
                         "type": "processed_frame",
-                        "data": f"data:image/jpeg;base64,{encoded_result}"
-                    })
+                        "data": f"data:image/jpeg;base64,{encoded_result}",
+                        "detection": detection_source
+                    }
+                    # Stage timings are opt-in per frame
+                    if message.get("timings"):
+                        response["timings"] = {name: round(value, 2) for name, value in timings.items()}
+
+                    # Send processed frame
+                    await websocket.send_json(response)
                 except Exception as e:
                     await websocket.send_json({
                         "type": "error",
@@ -183,3 +265,8 @@ async def get_active_sessions():
     return JSONResponse({
         "active_sessions": connection_manager.get_active_sessions()
     })
+
+@router.get("/status/live-metrics")
+async def get_live_metrics():
+    """Get rolling per-stage latency percentiles for live sessions on this worker"""
+    return JSONResponse(live_metrics.summary())
@@ -1,15 +1,30 @@
 import os
 import cv2
 import uuid
-from typing import Optional
+import json
+import time
+from typing import List, Optional
 from fastapi import APIRouter, UploadFile, File, Form, HTTPException, BackgroundTasks
 from fastapi.responses import FileResponse, JSONResponse
 from starlette.requests import Request
 from starlette.responses import StreamingResponse
 from ..config import settings
 from ..models.face_swap import face_swap_engine
+from ..models.face_gallery import TARGET_POLICIES, selector_for
 from ..utils.video_processor import video_processor
-from ..utils.celery_tasks import process_video_deepfake, get_task_status
+from ..utils.celery_tasks import get_task_status, job_uploads
+from ..utils.job_executor import job_executor
+from ..utils.progress_store import progress_store
+from ..utils.preview_store import preview_store
+from ..utils.result_cache import result_cache
+from ..utils.uploads import save_upload, UploadTooLargeError
+from ..utils.video_probe import video_probe
+from ..utils.job_routing import JOB_CLASSES, route_job, check_admission
+from ..utils.throughput_profile import throughput_profile
+from ..utils.storage import storage_manager
+from ..utils.file_serving import RangeFileResponse
+from ..utils.hls_writer import HLS_MEDIA_TYPES
+from starlette.concurrency import run_in_threadpool
 from slowapi.util import get_remote_address
 from slowapi import Limiter, _rate_limit_exceeded_handler
 
@@ -25,7 +40,12 @@ async def face_swap(
     source_img: UploadFile = File(...),
     target_img: UploadFile = File(...),
     enhance_result: bool = Form(True),
-    add_watermark: bool = Form(True)
+    add_watermark: bool = Form(True),
+    target_policy: str = Form("all"),
+    target_top_k: int = Form(1),
+    target_min_size: float = Form(0),
+    target_identities: Optional[List[UploadFile]] = File(None),
+    identity_sources: Optional[List[UploadFile]] = File(None)
 ):
     """Swap faces between two images
 
@@ -34,93 +54,507 @@ async def face_swap(
         target_img: Image to place face onto
         enhance_result: Whether to enhance the result
         add_watermark: Whether to add watermark
+        target_policy: Which faces to swap (see _save_target_selection)
+        target_top_k: Number of faces for the "top_k" policy
+        target_min_size: Skip faces smaller than this many pixels
+        target_identities: Reference photos of the people to replace
+            ("identity" policy)
+        identity_sources: Face to use for each identity, in the same order
+            (source_img for all if omitted)
 
     Returns:
         Processed image as binary data
     """
     try:
+        _validate_target_selection(target_policy, target_top_k, target_min_size, target_identities, identity_sources)
+
         # Save uploaded files
         source_filename = f"{uuid.uuid4()}_{source_img.filename}"
         target_filename = f"{uuid.uuid4()}_{target_img.filename}"
 
-        source_path = os.path.join(settings.UPLOAD_DIR, source_filename)
-        target_path = os.path.join(settings.UPLOAD_DIR, target_filename)
-
-        # Save source image
-        with open(source_path, "wb") as f:
-            f.write(await source_img.read())
-
-        # Save target image
-        with open(target_path, "wb") as f:
-            f.write(await target_img.read())
+        source_path = storage_manager.path_for("uploads", source_filename)
+        target_path = storage_manager.path_for("uploads", target_filename)
 
-        # Process face swap
-        source_img_data = cv2.imread(source_path)
-        target_img_data = cv2.imread(target_path)
-
-        result_img = face_swap_engine.swap_face(source_img_data, target_img_data, enhance_result)
-
-        if add_watermark:
-            result_img = face_swap_engine.add_watermark(result_img)
+        # Stream uploads to disk, hashing them on the way
+        source_hash, target_hash = await _save_uploads(
+            (source_img, source_path, settings.MAX_IMAGE_UPLOAD_BYTES),
+            (target_img, target_path, settings.MAX_IMAGE_UPLOAD_BYTES)
+        )
+        selection, selection_params, identity_paths = await _save_target_selection(
+            target_policy, target_top_k, target_min_size, target_identities, identity_sources,
+            uploaded=(source_path, target_path)
+        )
 
-        # Save result
-        result_filename = f"result_{uuid.uuid4()}.jpg"
-        result_path = os.path.join(settings.RESULTS_DIR, result_filename)
-        cv2.imwrite(result_path, result_img)
+        # Identical inputs and options reuse the stored result
+        cache_key = None
+        if settings.RESULT_CACHE_ENABLED:
+            cache_key = result_cache.make_key(
+                "face", [source_hash, target_hash],
+                {"enhance_result": enhance_result, "add_watermark": add_watermark, **selection_params}
+            )
+            owner_id = str(uuid.uuid4())
+            # Redis calls go to the thread pool so they never block the event loop
+            claimed, entry = await run_in_threadpool(
+                result_cache.claim, cache_key, owner_id, ttl=int(settings.RESULT_CACHE_WAIT_SECONDS) + 30
+            )
+            if not claimed:
+                # Coalesce with an identical request that is still running
+                if entry["status"] != "completed":
+                    entry = await result_cache.wait(cache_key)
+                cached_paths = entry and result_cache.result_paths(entry["result"])
+                if cached_paths:
+                    _remove_uploads(source_path, target_path, *identity_paths)
+                    storage_manager.touch(cached_paths[0])
+                    return FileResponse(
+                        cached_paths[0],
+                        media_type="image/jpeg",
+                        filename="face_swap_result.jpg",
+                        headers={"X-Cache": "HIT"}
+                    )
+                cache_key = None  # The other request failed or timed out; compute uncached
+
+        storage_manager.register(source_path, "uploads")
+        storage_manager.register(target_path, "uploads")
+        for path in identity_paths:
+            storage_manager.register(path, "uploads")
+
+        try:
+            try:
+                selector = selector_for(selection)
+            except ValueError as e:
+                raise HTTPException(status_code=400, detail=str(e))
+
+            # Process face swap
+            source_img_data = cv2.imread(source_path)
+            target_img_data = cv2.imread(target_path)
+
+            result_img = face_swap_engine.swap_face(source_img_data, target_img_data, enhance_result, selector)
+
+            if add_watermark:
+                result_img = face_swap_engine.add_watermark(result_img)
+
+            # Save result
+            result_filename = f"result_{uuid.uuid4()}.jpg"
+            result_path = storage_manager.path_for("results", result_filename)
+            cv2.imwrite(result_path, result_img)
+            storage_manager.register(result_path, "results")
+        except Exception:
+            if cache_key:
+                await run_in_threadpool(result_cache.release, cache_key, owner_id)
+            raise
+
+        if cache_key:
+            await run_in_threadpool(
+                result_cache.complete, cache_key, owner_id, {"result_url": f"/api/v1/results/{result_filename}"}
+            )
 
         # Return the processed image
         return FileResponse(
             result_path,
             media_type="image/jpeg",
-            filename="face_swap_result.jpg"
+            filename="face_swap_result.jpg",
+            headers={"X-Cache": "MISS"}
         )
 
     except Exception as e:
+        if isinstance(e, HTTPException):
+            raise e
         raise HTTPException(status_code=500, detail=str(e))
 
+async def _save_uploads(*uploads):
+    """Stream several uploads to storage with per-file size limits
+
+    Args:
+        *uploads: (UploadFile, path, max_bytes) tuples
+
+    Returns:
+        List of SHA-256 hex digests, in order
+
+    Raises:
+        HTTPException: 413 if an upload is over its limit (all files
+            written so far are removed)
+    """
+    hashes = []
+    try:
+        for upload, path, max_bytes in uploads:
+            _, digest = await save_upload(upload, path, max_bytes)
+            hashes.append(digest)
+    except UploadTooLargeError as e:
+        _remove_uploads(*(path for _, path, _ in uploads))
+        raise HTTPException(status_code=413, detail=str(e))
+    return hashes
+
+def _validate_target_selection(policy, top_k, min_size, identities, identity_sources):
+    """Check the target selection form fields, raising a 400 if invalid"""
+    if policy not in TARGET_POLICIES:
+        raise HTTPException(status_code=400, detail=f"target_policy must be one of {', '.join(TARGET_POLICIES)}")
+    if top_k < 1:
+        raise HTTPException(status_code=400, detail="target_top_k must be at least 1")
+    if min_size < 0:
+        raise HTTPException(status_code=400, detail="target_min_size must not be negative")
+    if policy == "identity" and not identities:
+        raise HTTPException(status_code=400, detail="target_policy 'identity' requires target_identities")
+    if identities and len(identities) > settings.MAX_TARGET_IDENTITIES:
+        raise HTTPException(
+            status_code=400, detail=f"At most {settings.MAX_TARGET_IDENTITIES} target_identities are allowed"
+        )
+    if identity_sources and len(identity_sources) != len(identities or []):
+        raise HTTPException(status_code=400, detail="identity_sources must match target_identities one to one")
+
+async def _save_target_selection(policy, top_k, min_size, identities=None, identity_sources=None, uploaded=()):
+    """Store identity uploads and build a job's target selection options
+
+    Policies: "all" (every face, the default), "largest", "top_k" (the
+    `top_k` largest faces), "min_size" (faces at least `min_size` pixels
+    on their shorter side) and "identity" (faces matching one of the
+    `identities` reference photos, each swapped with its entry in
+    `identity_sources`, or the main source image).
+
+    Args:
+        uploaded: Paths already stored for the request, removed along with
+            the identity uploads if one of those is too large
+
+    Returns:
+        (selection options for the job or None for the default,
+        cache key options, stored identity upload paths)
+    """
+    identity_sources = identity_sources or [None] * len(identities or [])
+    saved = []
+    for upload in [*(identities or []), *identity_sources]:
+        if upload is not None:
+            path = storage_manager.path_for("uploads", f"{uuid.uuid4()}_{upload.filename}")
+            saved.append((upload, path, settings.MAX_IMAGE_UPLOAD_BYTES))
+    try:
+        hashes = dict(zip((path for _, path, _ in saved), await _save_uploads(*saved)))
+    except HTTPException:
+        _remove_uploads(*uploaded)
+        raise
+    paths = [path for _, path, _ in saved]
+
+    if policy == "all" and not min_size:
+        return None, {}, paths
+
+    entries = []
+    paths_iter = iter(paths)
+    reference_paths = [next(paths_iter) for _ in identities or []]
+    for reference_path, source in zip(reference_paths, identity_sources):
+        entries.append({"target_path": reference_path, "source_path": next(paths_iter) if source else None})
+
+    selection = {"policy": policy, "top_k": top_k, "min_size": min_size}
+    if policy == "identity":
+        selection["identities"] = entries
+    # Cache by content, not by the per-upload paths
+    params = {"target_selection": {
+        "policy": policy, "top_k": top_k, "min_size": min_size,
+        "identities": [
+            [hashes[entry["target_path"]], entry["source_path"] and hashes[entry["source_path"]]]
+            for entry in selection.get("identities", [])
+        ]
+    }}
+    return selection, params, paths
+
+def _remove_uploads(*paths):
+    """Delete uploads that turned out not to be needed"""
+    for path in paths:
+        if os.path.exists(path):
+            os.remove(path)
+
+def _video_cache_key(input_hashes, output_format, selection_params=None, fast_mode=False):
+    if not settings.RESULT_CACHE_ENABLED or not input_hashes:
+        return None
+    options = {"output_format": output_format, **(selection_params or {})}
+    if fast_mode:
+        options["keyframe_interval"] = settings.FAST_MODE_KEYFRAME_INTERVAL
+    return result_cache.make_key("video", input_hashes, options)
+
+def _cached_video_response(entry):
+    """Response for a video job answered by the result cache"""
+    response = {
+        "status": "completed" if entry["status"] == "completed" else "processing",
+        "task_id": entry["task_id"],
+        "cached": True,
+        "message": "Identical video already processed" if entry["status"] == "completed"
+        else "Identical video is already being processed"
+    }
+    if entry.get("playlist_url"):
+        response["playlist_url"] = entry["playlist_url"]
+    if entry.get("result"):
+        response["result"] = entry["result"]
+    return response
+
+def _submit_pinned(uploads, kind, **options):
+    """Pin a job's uploads and submit it (see StorageManager.pin)"""
+    storage_manager.pin(*uploads)
+    try:
+        job_executor.submit(kind, **options)
+    except Exception:
+        storage_manager.unpin(*uploads)
+        raise
+
+def _submit_video_job(source_path, target_path, probe, output_format="mp4", input_hashes=None,
+                      selection=None, selection_params=None, fast_mode=False):
+    """Queue a full video render and build the API response
+
+    Args:
+        source_path: Stored source image
+        target_path: Stored target video
+        probe: Dict from VideoProbe.probe
+        output_format: "mp4" or "hls"
+        input_hashes: Content hashes of the uploads for the result cache
+        selection: Target selection options for the job
+        selection_params: Cache key options of the selection
+        fast_mode: Swap only every FAST_MODE_KEYFRAME_INTERVAL-th frame in
+            full and interpolate the rest
+
+    Returns:
+        Response dict with the task ID, routing and estimate, or the
+        cached response if an identical job exists
+    """
+    estimated_seconds = throughput_profile.estimate_seconds(probe)
+    route = route_job(probe)
+
+    # HLS output location is fixed up front so the playlist URL can be
+    # returned before the first frame is processed
+    hls_id = f"hls_{uuid.uuid4().hex}" if output_format == "hls" else None
+    playlist_url = f"/api/v1/results/hls/{hls_id}/master.m3u8" if hls_id else None
+    extra = {"playlist_url": playlist_url} if playlist_url else {}
+
+    # Claim the result before queueing so concurrent duplicates coalesce
+    task_id = str(uuid.uuid4())
+    cache_key = _video_cache_key(input_hashes, output_format, selection_params, fast_mode)
+    if cache_key:
+        claimed, entry = result_cache.claim(cache_key, task_id, **extra)
+        if not claimed:
+            return _cached_video_response(entry)
+
+    # Record the pending state first; a local job may start immediately
+    progress_store.update(task_id, 'pending', 0, job_class=route["job_class"], **extra)
+
+    # Keep the uploads out of quota eviction while the job waits in the
+    # queue; the job unpins them when it finishes
+    _submit_pinned(
+        job_uploads(source_path, target_path, selection),
+        "video",
+        args=(source_path, target_path, output_format, hls_id),
+        kwargs={
+            "cache_key": cache_key,
+            "selection": selection,
+            "keyframe_interval": settings.FAST_MODE_KEYFRAME_INTERVAL if fast_mode else 1
+        },
+        task_id=task_id,
+        queue=route["queue"],
+        priority=route["priority"]
+    )
+
+    return {
+        "status": "processing",
+        "task_id": task_id,
+        "message": "Video processing started",
+        **extra,
+        "job_class": route["job_class"],
+        "estimated_cost": route["estimated_cost"],
+        "estimate": {
+            "processing_seconds": round(estimated_seconds, 1),
+            "eta": round(time.time() + estimated_seconds, 3),
+            "calibrated": bool(throughput_profile.load().get("calibrated"))
+        },
+        "video": {
+            key: probe[key]
+            for key in ("frame_count", "fps", "width", "height", "duration", "codec", "container", "avg_faces")
+        }
+    }
+
 @router.post("/swap/video")
 @limiter.limit(f"{settings.RATE_LIMIT_PER_MINUTE}/minute")
 async def video_deepfake(
     request: Request,
     background_tasks: BackgroundTasks,
     source_img: UploadFile = File(...),
-    target_video: UploadFile = File(...)
+    target_video: UploadFile = File(...),
+    output_format: str = Form("mp4"),
+    fast_mode: bool = Form(False),
+    preview: bool = Form(False),
+    preview_mode: str = Form("head"),
+    target_policy: str = Form("all"),
+    target_top_k: int = Form(1),
+    target_min_size: float = Form(0),
+    target_identities: Optional[List[UploadFile]] = File(None),
+    identity_sources: Optional[List[UploadFile]] = File(None)
 ):
     """Process video deepfake
 
     Args:
         source_img: Image containing face to use
         target_video: Video to process
+        output_format: "mp4", or "hls" for a playlist that plays while the
+            job is still running
+        fast_mode: Trade some fidelity for speed by swapping only keyframes
+            and moving the swapped faces along the motion in between
+        preview: Render a short low-resolution preview instead; the full
+            render is started with /swap/video/{preview_id}/confirm
+        preview_mode: "head" (first seconds) or "sample" (frames spread
+            over the whole video)
+        target_policy, target_top_k, target_min_size, target_identities,
+        identity_sources: Which faces to swap (as for /swap/face)
 
     Returns:
         Task ID for checking status
     """
     try:
+        if output_format not in ("mp4", "hls"):
+            raise HTTPException(status_code=400, detail="output_format must be 'mp4' or 'hls'")
+        if preview_mode not in ("head", "sample"):
+            raise HTTPException(status_code=400, detail="preview_mode must be 'head' or 'sample'")
+        _validate_target_selection(target_policy, target_top_k, target_min_size, target_identities, identity_sources)
+
         # Save uploaded files
         source_filename = f"{uuid.uuid4()}_{source_img.filename}"
         target_filename = f"{uuid.uuid4()}_{target_video.filename}"
 
-        source_path = os.path.join(settings.UPLOAD_DIR, source_filename)
-        target_path = os.path.join(settings.UPLOAD_DIR, target_filename)
-
-        # Save source image
-        with open(source_path, "wb") as f:
-            f.write(await source_img.read())
-
-        # Save target video
-        with open(target_path, "wb") as f:
-            f.write(await target_video.read())
+        source_path = storage_manager.path_for("uploads", source_filename)
+        target_path = storage_manager.path_for("uploads", target_filename)
 
-        # Start asynchronous task
-        task = process_video_deepfake.delay(source_path, target_path)
+        # Stream uploads to disk, hashing them on the way
+        input_hashes = await _save_uploads(
+            (source_img, source_path, settings.MAX_IMAGE_UPLOAD_BYTES),
+            (target_video, target_path, settings.MAX_VIDEO_UPLOAD_BYTES)
+        )
+        selection, selection_params, identity_paths = await _save_target_selection(
+            target_policy, target_top_k, target_min_size, target_identities, identity_sources,
+            uploaded=(source_path, target_path)
+        )
+        uploads = (source_path, target_path, *identity_paths)
+
+        # Identical uploads with the same options reuse the stored or
+        # in-flight result, skipping the probe entirely
+        if settings.RESULT_CACHE_ENABLED:
+            entry = None if preview else await run_in_threadpool(
+                result_cache.get, _video_cache_key(input_hashes, output_format, selection_params, fast_mode)
+            )
+            if entry is not None:
+                _remove_uploads(*uploads)
+                return JSONResponse(_cached_video_response(entry))
+
+        # Probe the video, estimate its runtime and apply admission limits
+        try:
+            probe = await run_in_threadpool(video_probe.probe, target_path)
+        except Exception as e:
+            print(f"Error probing video {target_path}: {str(e)}")
+            probe = None
+
+        if probe is None:
+            rejection = "Could not read the uploaded video"
+            status_code = 400
+        else:
+            rejection = check_admission(probe, throughput_profile.estimate_seconds(probe))
+            status_code = 413
+
+        if rejection:
+            _remove_uploads(*uploads)
+            raise HTTPException(status_code=status_code, detail=rejection)
+
+        if not preview:
+            response = await run_in_threadpool(
+                _submit_video_job, source_path, target_path, probe, output_format, input_hashes, selection,
+                selection_params, fast_mode
+            )
+            if response.get("cached"):
+                # Lost a race with an identical submission
+                _remove_uploads(*uploads)
+            else:
+                for path in uploads:
+                    storage_manager.register(path, "uploads")
+            return JSONResponse(response)
+
+        # A preview that can't be confirmed isn't worth rendering
+        preview_id = str(uuid.uuid4())
+        if not await run_in_threadpool(preview_store.save, preview_id, {
+            "source_path": source_path,
+            "target_path": target_path,
+            "probe": probe,
+            "input_hashes": input_hashes,
+            "selection": selection,
+            "selection_params": selection_params
+        }):
+            _remove_uploads(*uploads)
+            raise HTTPException(status_code=503, detail="Could not store the preview, please try again")
+
+        for path in uploads:
+            storage_manager.register(path, "uploads")
+
+        # Previews always take the short, highest-priority path
+        queue, priority = JOB_CLASSES["short"]
+        await run_in_threadpool(progress_store.update, preview_id, 'pending', 0, job_class="preview")
+        await run_in_threadpool(
+            _submit_pinned,
+            job_uploads(source_path, target_path, selection),
+            "preview",
+            args=(source_path, target_path, preview_mode),
+            kwargs={"selection": selection},
+            task_id=preview_id,
+            queue=queue,
+            priority=priority
+        )
 
         return JSONResponse({
             "status": "processing",
-            "task_id": task.id,
-            "message": "Video processing started"
+            "task_id": preview_id,
+            "preview_id": preview_id,
+            "message": "Preview rendering started",
+            "confirm_url": f"/api/v1/swap/video/{preview_id}/confirm",
+            "estimate": {
+                "processing_seconds": round(throughput_profile.estimate_seconds(probe), 1),
+                "calibrated": bool(throughput_profile.load().get("calibrated"))
+            }
         })
 
     except Exception as e:
+        if isinstance(e, HTTPException):
+            raise e
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.post("/swap/video/{preview_id}/confirm")
+@limiter.limit(f"{settings.RATE_LIMIT_PER_MINUTE}/minute")
+async def confirm_video_preview(
+    request: Request,
+    preview_id: str,
+    output_format: str = Form("mp4"),
+    fast_mode: bool = Form(False)
+):
+    """Start the full render of a previewed video
+
+    Reuses the uploads, probe and detected source face of the preview.
+
+    Args:
+        preview_id: preview_id from the video_deepfake preview response
+        output_format: "mp4" or "hls"
+        fast_mode: Keyframe-only rendering (see video_deepfake)
+
+    Returns:
+        Task ID for checking status (same response as video_deepfake)
+    """
+    try:
+        if output_format not in ("mp4", "hls"):
+            raise HTTPException(status_code=400, detail="output_format must be 'mp4' or 'hls'")
+
+        context = await run_in_threadpool(preview_store.pop, preview_id)
+        if context is None:
+            raise HTTPException(status_code=404, detail="Preview not found, expired or already confirmed")
+
+        source_path, target_path = context["source_path"], context["target_path"]
+        if not (os.path.exists(source_path) and os.path.exists(target_path)):
+            raise HTTPException(status_code=410, detail="Preview uploads are no longer available")
+        storage_manager.touch(source_path)
+        storage_manager.touch(target_path)
+
+        return JSONResponse(await run_in_threadpool(
+            _submit_video_job, source_path, target_path, context["probe"], output_format,
+            context.get("input_hashes"), context.get("selection"), context.get("selection_params"), fast_mode
+        ))
+
+    except Exception as e:
+        if isinstance(e, HTTPException):
+            raise e
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/status/{task_id}")
@@ -134,15 +568,48 @@ async def check_task_status(task_id: str):
         Task status info
     """
     try:
-        status_info = get_task_status(task_id)
+        status_info = await run_in_threadpool(get_task_status, task_id)
         return JSONResponse(status_info)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.get("/status/{task_id}/events")
+async def stream_task_status(task_id: str):
+    """Push video processing progress as Server-Sent Events
+
+    Each event's data is the same JSON record returned by /status/{task_id}.
+    The stream ends after the completed or failed event, or after
+    PROGRESS_TTL_SECONDS without a record.
+
+    Args:
+        task_id: Task ID from video_deepfake endpoint
+
+    Returns:
+        text/event-stream response (404 for unknown or expired tasks)
+    """
+    if await run_in_threadpool(progress_store.get, task_id) is None:
+        raise HTTPException(status_code=404, detail="Task not found")
+
+    async def event_stream():
+        async for record in progress_store.subscribe(task_id):
+            if record is None:
+                # Comment line keeps proxies from closing an idle stream
+                yield ": keepalive\n\n"
+                continue
+            yield f"data: {json.dumps(record)}\n\n"
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 @router.get("/results/{result_id}")
-async def get_result(result_id: str):
+async def get_result(result_id: str, request: Request):
     """Get video processing result
 
+    Supports Range requests (206) and conditional requests (304).
+
     Args:
         result_id: Result ID (filename)
 
@@ -150,13 +617,15 @@ async def get_result(result_id: str):
         Processed video file
     """
     try:
-        result_path = os.path.join(settings.RESULTS_DIR, result_id)
+        result_path = storage_manager.resolve("results", result_id)
 
-        if not os.path.exists(result_path):
+        if result_path is None:
             raise HTTPException(status_code=404, detail="Result not found")
+        storage_manager.touch(result_path)
 
-        return FileResponse(
+        return RangeFileResponse(
             result_path,
+            request,
             media_type="video/mp4",
             filename=f"deepfake_{result_id}"
         )
@@ -166,9 +635,11 @@ async def get_result(result_id: str):
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/results/stream/{result_id}")
-async def stream_result(result_id: str):
+async def stream_result(result_id: str, request: Request):
     """Stream video processing result
 
+    Serves byte ranges so players can seek without re-downloading.
+
     Args:
         result_id: Result ID (filename)
 
@@ -176,20 +647,59 @@ async def stream_result(result_id: str):
         Streaming response for video
     """
     try:
-        result_path = os.path.join(settings.RESULTS_DIR, result_id)
+        result_path = storage_manager.resolve("results", result_id)
 
-        if not os.path.exists(result_path):
+        if result_path is None:
             raise HTTPException(status_code=404, detail="Result not found")
+        storage_manager.touch(result_path)
 
-        # Create streaming response
-        def iterfile():
-            with open(result_path, mode="rb") as file_like:
-                yield from file_like
+        return RangeFileResponse(
+            result_path,
+            request,
+            media_type="video/mp4",
+            content_disposition_type="inline"
+        )
+    except Exception as e:
+        if isinstance(e, HTTPException):
+            raise e
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/results/hls/{hls_id}/{file_path:path}")
+async def get_hls_file(hls_id: str, file_path: str, request: Request):
+    """Serve playlists and segments of an HLS result
+
+    Available while the job is still running. Playlists are revalidated on
+    every request since they grow as segments are written; segments are
+    immutable.
 
-        return StreamingResponse(
-            iterfile(),
-            media_type="video/mp4"
+    Args:
+        hls_id: HLS result ID from the video_deepfake response
+        file_path: Playlist or segment path inside the result
+
+    Returns:
+        Playlist or segment file
+    """
+    try:
+        directory = storage_manager.resolve_dir("results", hls_id)
+        if directory is None:
+            raise HTTPException(status_code=404, detail="Stream not found (it may not have started yet)")
+
+        root = os.path.realpath(directory)
+        path = os.path.realpath(os.path.join(root, file_path))
+        if not path.startswith(root + os.sep) or not os.path.isfile(path):
+            raise HTTPException(status_code=404, detail="Stream file not found (it may not be written yet)")
+        storage_manager.touch(directory)
+
+        extension = os.path.splitext(path)[1]
+        response = RangeFileResponse(
+            path,
+            request,
+            media_type=HLS_MEDIA_TYPES.get(extension, "application/octet-stream"),
+            content_disposition_type="inline"
         )
+        if extension == ".m3u8":
+            response.headers["cache-control"] = "no-cache"
+        return response
     except Exception as e:
         if isinstance(e, HTTPException):
             raise e
@@ -0,0 +1,180 @@
+import os
+import json
+import socket
+import tempfile
+import threading
+import time
+from ..config import settings
+
+# Shorter frame side up to which a frame belongs to each resolution class
+RESOLUTION_CLASSES = ((480, "480p"), (720, "720p"), (1080, "1080p"), (1440, "1440p"))
+
+def resolution_class(shape):
+    """Resolution class of a frame shape, e.g. "1080p" for (1080, 1920, 3)"""
+    side = min(shape[:2])
+    for limit, name in RESOLUTION_CLASSES:
+        if side <= limit:
+            return name
+    return "2160p"
+
+def available_memory():
+    """Memory available to new allocations in bytes (None if unknown)
+
+    Read from /proc/meminfo, so it accounts for every process of the job,
+    including the frame workers.
+    """
+    try:
+        with open("/proc/meminfo") as f:
+            for line in f:
+                if line.startswith("MemAvailable:"):
+                    return int(line.split()[1]) * 1024
+    except (OSError, ValueError, IndexError):
+        pass
+    try:
+        return os.sysconf("SC_AVPHYS_PAGES") * os.sysconf("SC_PAGE_SIZE")
+    except (AttributeError, ValueError, OSError):
+        return None
+
+class BatchSizeController:
+    """Frames in flight for the parallel frame workers, per resolution class
+
+    The first job of a resolution class starts from the configured window
+    and measures throughput over BATCH_TUNING_WINDOW frames at a time. The
+    window is doubled while that gains at least BATCH_TUNING_MIN_GAIN, then
+    settles on the smallest size within that margin of the best. Sizes are
+    capped so the frames in flight (BATCH_FRAME_MEMORY_FACTOR frame sizes
+    each) fit in BATCH_MEMORY_FRACTION of the available memory; a settled
+    size that no longer fits is halved. Settled sizes are saved per host,
+    so later jobs and worker processes start from them.
+
+    Only the parallel frame workers have frames in flight to tune; the
+    serial path swaps one frame at a time and reports a batch size of 1.
+    """
+
+    def __init__(self, path=None):
+        self.path = path or settings.BATCH_PROFILE_PATH
+        self._classes = None
+        self._lock = threading.Lock()
+
+    def _load(self):
+        if self._classes is None:
+            self._classes = {}
+            try:
+                with open(self.path) as f:
+                    saved = json.load(f).get("classes", {})
+                for name, batch_size in saved.items():
+                    self._classes[name] = {"batch_size": int(batch_size), "settled": True, "throughput": {}}
+            except FileNotFoundError:
+                pass
+            except (OSError, ValueError, AttributeError, TypeError) as e:
+                print(f"Error reading batch profile {self.path}: {str(e)}")
+        return self._classes
+
+    def _save(self):
+        """Atomically write the settled sizes"""
+        try:
+            directory = os.path.dirname(self.path) or "."
+            fd, temp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+            with os.fdopen(fd, "w") as f:
+                json.dump({
+                    "classes": {
+                        name: state["batch_size"] for name, state in self._classes.items() if state["settled"]
+                    },
+                    "updated_at": time.time(),
+                    "host": socket.gethostname()
+                }, f, indent=2)
+            os.replace(temp_path, self.path)
+        except OSError as e:
+            print(f"Error saving batch profile {self.path}: {str(e)}")
+
+    def max_batch_size(self, shape):
+        """Largest batch whose frames fit in the memory budget"""
+        frame_bytes = int(shape[0]) * int(shape[1]) * (int(shape[2]) if len(shape) > 2 else 1)
+        limit = settings.BATCH_SIZE_MAX
+        memory = available_memory()
+        if memory is not None:
+            per_frame = max(frame_bytes * settings.BATCH_FRAME_MEMORY_FACTOR, 1)
+            limit = min(limit, int(memory * settings.BATCH_MEMORY_FRACTION / per_frame))
+        return max(limit, 1)
+
+    def batch_size(self, shape, initial, floor=1):
+        """Batch size to start a job with
+
+        Args:
+            shape: Frame shape of the job
+            initial: Size to start tuning from for an unseen class
+            floor: Smallest useful size (e.g. one frame per worker); the
+                memory cap still wins over it
+        """
+        with self._lock:
+            state = self._load().setdefault(
+                resolution_class(shape), {"batch_size": initial, "settled": False, "throughput": {}}
+            )
+            state["batch_size"] = min(max(state["batch_size"], floor), self.max_batch_size(shape))
+            return state["batch_size"]
+
+    def record(self, shape, batch_size, frames, seconds):
+        """Report the throughput of `frames` frames processed at `batch_size`
+
+        Returns:
+            Batch size for the next frames
+        """
+        if frames <= 0 or seconds <= 0:
+            return batch_size
+        name = resolution_class(shape)
+        with self._lock:
+            state = self._load().setdefault(name, {"batch_size": batch_size, "settled": False, "throughput": {}})
+            cap = self.max_batch_size(shape)
+            throughput = state["throughput"]
+            throughput[batch_size] = frames / seconds
+
+            if state["settled"]:
+                if batch_size > cap:
+                    state["batch_size"] = max(min(batch_size // 2, cap), 1)
+                    print(f"Batch size for {name} lowered to {state['batch_size']} (memory)")
+                    self._save()
+                else:
+                    state["batch_size"] = batch_size
+                return state["batch_size"]
+
+            gain = 1 + max(settings.BATCH_TUNING_MIN_GAIN, 0.0)
+            smaller = [throughput[size] for size in throughput if size < batch_size]
+            larger = min(batch_size * 2, cap)
+            if larger > batch_size and (not smaller or throughput[batch_size] >= max(smaller) * gain):
+                # Still improving: try a larger batch
+                state["batch_size"] = larger
+                return larger
+
+            # Settle on the smallest size within the gain margin of the best
+            best_throughput = max(throughput.values())
+            best = min(size for size in throughput if throughput[size] * gain >= best_throughput)
+            state["batch_size"] = min(best, cap)
+            state["settled"] = True
+            print(f"✓ Batch size for {name} settled at {state['batch_size']} ({throughput[best]:.1f} frames/s)")
+            self._save()
+            return state["batch_size"]
+
+    def summary(self, shape=None):
+        """Chosen batch sizes, for metrics
+
+        Returns:
+            Dict of resolution class to batch size, settled flag and
+            measured throughput (frames/s) per size tried; just the class
+            of `shape` if given
+        """
+        with self._lock:
+            classes = {
+                name: {
+                    "batch_size": state["batch_size"],
+                    "settled": state["settled"],
+                    "throughput": {str(size): round(fps, 2) for size, fps in sorted(state["throughput"].items())}
+                }
+                for name, state in self._load().items()
+            }
+        if shape is not None:
+            name = resolution_class(shape)
+            return {"resolution_class": name, **classes.get(name, {})}
+        return classes
+
+# Singleton instance (per job process; settled sizes are shared via the profile)
+batch_controller = BatchSizeController()
@@ -0,0 +1,69 @@
+import threading
+from contextlib import contextmanager
+import numpy as np
+from ..config import settings
+
+class BufferPool:
+    """Reusable arrays keyed by shape and dtype
+
+    Frame stages take a buffer with `acquire`, write into it (through the
+    `dst=`/`out=` arguments of OpenCV and numpy) and hand it back with
+    `release`, so in steady state a video or live session reuses the same
+    few full-frame arrays instead of allocating new ones for every frame.
+    """
+
+    def __init__(self, max_per_key=None):
+        self.max_per_key = max_per_key
+        self._free = {}  # (shape, dtype) -> list of arrays
+        self._lock = threading.Lock()
+        self.allocated = 0
+        self.reused = 0
+
+    @staticmethod
+    def _key(shape, dtype):
+        return tuple(shape), np.dtype(dtype).str
+
+    def acquire(self, shape, dtype=np.uint8):
+        """Take a buffer (contents undefined) of the given shape and dtype"""
+        key = self._key(shape, dtype)
+        with self._lock:
+            free = self._free.get(key)
+            if free:
+                self.reused += 1
+                return free.pop()
+            self.allocated += 1
+        return np.empty(shape, dtype=dtype)
+
+    def release(self, buffer):
+        """Return a buffer for reuse (the caller must not use it afterwards)"""
+        if buffer is None or buffer.base is not None:
+            # Views don't own their memory; keeping them would pin the parent
+            return
+        max_per_key = self.max_per_key if self.max_per_key is not None else settings.BUFFER_POOL_MAX_PER_SHAPE
+        key = self._key(buffer.shape, buffer.dtype)
+        with self._lock:
+            free = self._free.setdefault(key, [])
+            if len(free) < max_per_key and not any(b is buffer for b in free):
+                free.append(buffer)
+
+    @contextmanager
+    def borrow(self, shape, dtype=np.uint8):
+        """Acquire a buffer for the duration of a with block"""
+        buffer = self.acquire(shape, dtype)
+        try:
+            yield buffer
+        finally:
+            self.release(buffer)
+
+    def stats(self):
+        """Allocation counters and the number of idle buffers"""
+        with self._lock:
+            idle = sum(len(free) for free in self._free.values())
+        return {"allocated": self.allocated, "reused": self.reused, "idle": idle}
+
+    def clear(self):
+        with self._lock:
+            self._free.clear()
+
+# Singleton instance (per process)
+frame_buffers = BufferPool()
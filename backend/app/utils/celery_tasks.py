@@ -1,132 +1,332 @@
 import os
+import json
 import uuid
 import time
 from celery import Celery
 from ..config import settings
 from ..models.face_swap import face_swap_engine
+from ..models.lifecycle import wait_for_preload
 from ..utils.video_processor import video_processor
+from ..utils.progress_store import progress_store
+from ..utils.job_routing import configure_queues
+from ..utils.storage import storage_manager
+from ..utils.checkpoints import JobCheckpoint, cleanup_checkpoints
+from ..utils.frame_store import sweep_stale_frame_stores
+from ..utils.result_cache import result_cache
+from ..utils.keyframes import frame_stats_report
 
 # Initialize Celery
 celery_app = Celery('tasks', broker=settings.CELERY_BROKER_URL, backend=settings.CELERY_RESULT_BACKEND)
+configure_queues(celery_app)
 
-# Task status storage (in-memory for now, could be moved to Redis/DB)
-task_status = {}
+class JobLockedError(RuntimeError):
+    """Another worker is already processing this job"""
 
-@celery_app.task(bind=True)
-def process_video_deepfake(self, source_img_path, target_video_path):
-    """Process a video deepfake as an asynchronous task
+def job_uploads(source_img_path, target_video_path, selection=None):
+    """Upload paths a video job reads, pinned from submit until it finishes"""
+    paths = [source_img_path, target_video_path]
+    for identity in (selection or {}).get("identities", []):
+        paths.extend(path for path in (identity["target_path"], identity.get("source_path")) if path)
+    return paths
+
+def run_video_job(task_id, source_img_path, target_video_path, output_format="mp4", hls_id=None,
+                  cache_key=None, progress_callback=None, selection=None, keyframe_interval=1):
+    """Process a video deepfake, reporting through the progress store
+
+    Shared by the Celery task and the local executor.
 
     Args:
+        task_id: Job ID used for progress records
         source_img_path: Path to the source image
         target_video_path: Path to the target video
+        output_format: "mp4" for a finished file, or "hls" to write playlist
+            segments while frames are processed
+        hls_id: Results directory name for HLS output (chosen by the API so
+            it can return the playlist URL before the task starts)
+        cache_key: Result cache entry this job was claimed for
+        progress_callback: Called with progress (0-100) after each accepted
+            progress write
+        selection: Target selection options (see TargetSelector.from_options)
+        keyframe_interval: Fast mode when above 1: swap only every Nth
+            frame in full (see VideoProcessor._swap_frames)
 
     Returns:
         Dict with task status and result info
-    """
-    task_id = self.request.id
 
-    # Update task status
-    task_status[task_id] = {
-        'status': 'processing',
-        'progress': 0,
-        'start_time': time.time()
-    }
+    Raises:
+        JobLockedError: A duplicate delivery of a job that is still running
+    """
+    def mark_started():
+        progress_store.update(task_id, 'processing', 0, start_time=round(time.time(), 3))
 
     try:
         def update_progress(progress):
-            task_status[task_id]['progress'] = progress
-            # Also update Celery's task state
-            self.update_state(
-                state='PROGRESS',
-                meta={'progress': progress}
-            )
+            # The store throttles writes; pass on only accepted ones
+            if progress_store.update(task_id, 'processing', progress) and progress_callback:
+                progress_callback(progress)
 
-        # Process the video
-        output_path = video_processor.process_video(
-            source_img_path,
-            target_video_path,
-            update_progress
-        )
+        if output_format == "hls":
+            mark_started()
+            result = _process_hls(
+                source_img_path, target_video_path, hls_id or f"hls_{uuid.uuid4().hex}", update_progress, selection,
+                keyframe_interval
+            )
+        else:
+            # Segments swapped with other target faces can't be reused
+            key_parts = (source_img_path, target_video_path)
+            if selection:
+                key_parts += (json.dumps(selection, sort_keys=True),)
+            if keyframe_interval > 1:
+                key_parts += (f"keyframes={keyframe_interval}",)
+            checkpoint = JobCheckpoint(JobCheckpoint.key_for(*key_parts))
+            if not checkpoint.acquire():
+                raise JobLockedError(f"Job {task_id} is already being processed")
+            # Only now: a duplicate delivery mustn't reset the running job's progress
+            mark_started()
+            try:
+                result = checkpoint.finished_result() or _process_mp4(
+                    source_img_path, target_video_path, checkpoint, update_progress, selection, keyframe_interval
+                )
+            finally:
+                checkpoint.release()
 
-        # Create a streaming version
-        streaming_path = video_processor.compress_for_streaming(output_path)
+        _register_source_face(source_img_path)
+        if cache_key:
+            result_cache.complete(cache_key, task_id, result)
+        storage_manager.unpin(*job_uploads(source_img_path, target_video_path, selection))
 
         # Update task status
-        task_status[task_id] = {
-            'status': 'completed',
-            'progress': 100,
-            'result': {
-                'download_url': f"/api/v1/results/{os.path.basename(output_path)}",
-                'streaming_url': f"/api/v1/results/stream/{os.path.basename(streaming_path)}",
-            },
-            'finish_time': time.time()
-        }
+        progress_store.update(
+            task_id,
+            'completed',
+            100,
+            result=result,
+            finish_time=round(time.time(), 3)
+        )
 
         # Return result info
-        return {
-            'status': 'completed',
-            'download_url': f"/api/v1/results/{os.path.basename(output_path)}",
-            'streaming_url': f"/api/v1/results/stream/{os.path.basename(streaming_path)}"
-        }
+        return {'status': 'completed', **result}
+
+    except JobLockedError:
+        # The running copy unpins the uploads when it finishes
+        raise
 
     except Exception as e:
         # Update task status on error
-        task_status[task_id] = {
-            'status': 'failed',
-            'error': str(e),
-            'finish_time': time.time()
-        }
+        progress_store.update(task_id, 'failed', error=str(e), finish_time=round(time.time(), 3))
+        if cache_key:
+            # Let the next identical submission run instead of joining a failed job
+            result_cache.release(cache_key, task_id)
+        storage_manager.unpin(*job_uploads(source_img_path, target_video_path, selection))
 
         # Re-raise the exception
         raise
 
+# Acked only after completion, so a job whose worker dies is redelivered
+# and resumes from its checkpoint
+@celery_app.task(bind=True, acks_late=True, reject_on_worker_lost=True)
+def process_video_deepfake(self, source_img_path, target_video_path, output_format="mp4", hls_id=None, cache_key=None,
+                           selection=None, keyframe_interval=1):
+    """Process a video deepfake as an asynchronous task
+
+    Args:
+        source_img_path: Path to the source image
+        target_video_path: Path to the target video
+        output_format: "mp4" or "hls" (see run_video_job)
+        hls_id: Results directory name for HLS output
+        cache_key: Result cache entry this task was claimed for
+        selection: Target selection options
+        keyframe_interval: Fast mode keyframe interval (1 for off)
+
+    Returns:
+        Dict with task status and result info
+    """
+    wait_for_preload()
+    try:
+        return run_video_job(
+            self.request.id, source_img_path, target_video_path, output_format, hls_id, cache_key,
+            lambda progress: self.update_state(state='PROGRESS', meta={'progress': progress}),
+            selection, keyframe_interval
+        )
+    except JobLockedError:
+        # Duplicate delivery while another worker is still on this job;
+        # capped so a lock that is never released can't requeue it forever
+        raise self.retry(countdown=60, max_retries=settings.CHECKPOINT_LOCK_MAX_RETRIES)
+
+def _process_mp4(source_img_path, target_video_path, checkpoint, progress_callback, selection=None,
+                 keyframe_interval=1):
+    """Run the checkpointed MP4 pipeline and build the task result"""
+    # Process the video
+    frame_stats = {}
+    output_path = video_processor.process_video(
+        source_img_path,
+        target_video_path,
+        progress_callback,
+        checkpoint=checkpoint,
+        selection=selection,
+        stats=frame_stats,
+        keyframe_interval=keyframe_interval
+    )
+
+    # Create a streaming version
+    streaming_path = video_processor.compress_for_streaming(output_path)
+
+    storage_manager.register(output_path, "results")
+    if streaming_path != output_path:
+        storage_manager.register(streaming_path, "results")
+
+    result = {
+        'download_url': f"/api/v1/results/{os.path.basename(output_path)}",
+        'streaming_url': f"/api/v1/results/stream/{os.path.basename(streaming_path)}",
+        'frame_stats': frame_stats_report(frame_stats),
+    }
+    # A redelivered copy of the task returns this instead of re-rendering
+    checkpoint.mark_completed(result)
+    return result
+
+def _process_hls(source_img_path, target_video_path, hls_id, progress_callback, selection=None, keyframe_interval=1):
+    """Run the progressive HLS pipeline and build the task result
+
+    The output directory is indexed before the first segment is written, so
+    the TTL and quota sweeps also cover the partial ladder of a failed or
+    killed job. It is kept recently used while frames are processed.
+    """
+    output_dir = storage_manager.path_for("results", hls_id)
+    os.makedirs(output_dir, exist_ok=True)
+    storage_manager.register(output_dir, "results")
+    last_touch = [time.monotonic()]
+
+    def update_progress(progress):
+        if time.monotonic() - last_touch[0] >= 60:
+            storage_manager.touch(output_dir)
+            last_touch[0] = time.monotonic()
+        progress_callback(progress)
+
+    frame_stats = {}
+    try:
+        writer = video_processor.process_video_hls(
+            source_img_path,
+            target_video_path,
+            output_dir,
+            update_progress,
+            selection=selection,
+            stats=frame_stats,
+            keyframe_interval=keyframe_interval
+        )
+    finally:
+        # Index the final size of the complete or partial output
+        storage_manager.register(output_dir, "results")
+
+    result = {
+        'playlist_url': f"/api/v1/results/hls/{hls_id}/master.m3u8",
+        'renditions': writer.ladder,
+        'frame_stats': frame_stats_report(frame_stats),
+    }
+
+    # Single-file copy of the top rendition for download and plain <video>
+    try:
+        download_path = writer.remux_to_mp4(storage_manager.path_for("results", f"{hls_id}.mp4"))
+        storage_manager.register(download_path, "results")
+        result['download_url'] = f"/api/v1/results/{os.path.basename(download_path)}"
+        result['streaming_url'] = f"/api/v1/results/stream/{os.path.basename(download_path)}"
+    except Exception as e:
+        print(f"Error remuxing HLS output {hls_id}: {str(e)}")
+
+    return result
+
+def _register_source_face(source_img_path):
+    """Index the cached source face written next to an upload"""
+    face_path = face_swap_engine.face_file_path(source_img_path)
+    if os.path.exists(face_path):
+        storage_manager.register(face_path, "uploads")
+
+def run_preview_job(task_id, source_img_path, target_video_path, mode="head", selection=None):
+    """Render a short, low-resolution preview of a video deepfake
+
+    Shared by the Celery task and the local executor.
+
+    Args:
+        task_id: Job ID used for progress records
+        source_img_path: Path to the source image
+        target_video_path: Path to the target video
+        mode: "head" (first seconds) or "sample" (frames across the video)
+        selection: Target selection options (see TargetSelector.from_options)
+
+    Returns:
+        Dict with task status and the preview URL
+    """
+    progress_store.update(task_id, 'processing', 0, start_time=round(time.time(), 3))
+
+    try:
+        frame_stats = {}
+        preview_path = video_processor.process_preview(
+            source_img_path,
+            target_video_path,
+            mode,
+            lambda progress: progress_store.update(task_id, 'processing', progress),
+            selection,
+            stats=frame_stats
+        )
+        storage_manager.register(preview_path, "results")
+        # The detected source face is reused by the full render
+        _register_source_face(source_img_path)
+
+        result = {
+            'preview_url': f"/api/v1/results/stream/{os.path.basename(preview_path)}",
+            'frame_stats': frame_stats_report(frame_stats),
+        }
+        progress_store.update(task_id, 'completed', 100, result=result, finish_time=round(time.time(), 3))
+        return {'status': 'completed', **result}
+
+    except Exception as e:
+        progress_store.update(task_id, 'failed', error=str(e), finish_time=round(time.time(), 3))
+        raise
+
+    finally:
+        storage_manager.unpin(*job_uploads(source_img_path, target_video_path, selection))
+
+@celery_app.task(bind=True)
+def render_video_preview(self, source_img_path, target_video_path, mode="head", selection=None):
+    """Render a video preview as an asynchronous task (see run_preview_job)"""
+    wait_for_preload()
+    return run_preview_job(self.request.id, source_img_path, target_video_path, mode, selection)
+
 @celery_app.task
-def cleanup_old_files(max_age_hours=24):
+def cleanup_old_files(max_age_hours=None):
     """Clean up old files that are no longer needed
 
+    Uses the storage index, so the cost is proportional to the number of
+    files deleted rather than the number stored.
+
     Args:
-        max_age_hours: Maximum age of files in hours
+        max_age_hours: Also delete files created more than this many hours ago
     """
-    max_age_seconds = max_age_hours * 3600
-    current_time = time.time()
-
-    # Check uploads directory
-    for filename in os.listdir(settings.UPLOAD_DIR):
-        file_path = os.path.join(settings.UPLOAD_DIR, filename)
-        if os.path.isfile(file_path):
-            file_age = current_time - os.path.getmtime(file_path)
-            if file_age > max_age_seconds:
-                try:
-                    os.remove(file_path)
-                    print(f"Removed old upload: {file_path}")
-                except Exception as e:
-                    print(f"Error removing old upload {file_path}: {str(e)}")
-
-    # Check results directory
-    for filename in os.listdir(settings.RESULTS_DIR):
-        file_path = os.path.join(settings.RESULTS_DIR, filename)
-        if os.path.isfile(file_path):
-            file_age = current_time - os.path.getmtime(file_path)
-            if file_age > max_age_seconds:
-                try:
-                    os.remove(file_path)
-                    print(f"Removed old result: {file_path}")
-                except Exception as e:
-                    print(f"Error removing old result {file_path}: {str(e)}")
+    removed = storage_manager.cleanup(max_age_hours)
+    removed["checkpoints"] = cleanup_checkpoints()
+    removed["frame_stores"] = sweep_stale_frame_stores()
+    print(
+        f"Storage cleanup: {removed['expired']} expired, {removed['evicted']} evicted, "
+        f"{removed['checkpoints']} stale checkpoints, {removed['frame_stores']} orphaned frame stores"
+    )
+    return removed
 
 def get_task_status(task_id):
     """Get the status of a task
 
     Args:
-        task_id: The Celery task ID
+        task_id: The task ID
 
     Returns:
         Dict with task status info
     """
-    if task_id in task_status:
-        return task_status[task_id]
+    # Shared progress store written by the workers
+    status_info = progress_store.get(task_id)
+    if status_info is not None:
+        return status_info
 
-    # Try to get task status from Celery
+    # Fall back to Celery for tasks the store doesn't know about
+    if settings.JOB_EXECUTOR == "local":
+        return {'status': 'unknown'}
     task = process_video_deepfake.AsyncResult(task_id)
 
     if task.state == 'PENDING':
@@ -0,0 +1,215 @@
+import os
+import json
+import time
+import shutil
+import socket
+import hashlib
+import tempfile
+import threading
+from ..config import settings
+from .file_locks import try_lock, is_locked
+
+class JobCheckpoint:
+    """Completed segments and manifest of a video job, for resuming
+
+    A job writes each finished segment of frames to its checkpoint
+    directory and records it in `manifest.json`. A retried or redelivered
+    task for the same inputs skips the recorded segments, and one that
+    finds the job already finished returns the stored result.
+    """
+
+    def __init__(self, job_key, base_dir=None):
+        self.directory = os.path.join(base_dir or settings.CHECKPOINT_DIR, job_key)
+        self.manifest_path = os.path.join(self.directory, "manifest.json")
+        self.lock_path = os.path.join(self.directory, "lock")
+        self.manifest = None
+        self._heartbeat_stop = None
+        self._lock_fd = None
+
+    @staticmethod
+    def key_for(*parts):
+        """Stable checkpoint key for a job's inputs"""
+        return hashlib.sha1("|".join(str(part) for part in parts).encode("utf-8")).hexdigest()[:20]
+
+    def _read_manifest(self):
+        try:
+            with open(self.manifest_path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _save(self):
+        fd, temp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        with os.fdopen(fd, "w") as f:
+            json.dump(self.manifest, f)
+        os.replace(temp_path, self.manifest_path)
+
+    def finished_result(self):
+        """Result of a job that already completed, or None"""
+        manifest = self._read_manifest()
+        return manifest.get("result") if manifest else None
+
+    def load(self, params):
+        """Load the manifest, or start a new one if the job parameters changed
+
+        Args:
+            params: Dict describing the input and segmenting (fps, size,
+                frame count, segment length); segments are only reused
+                when it matches
+
+        Returns:
+            Set of completed segment indices
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        manifest = self._read_manifest()
+        if manifest is None or manifest.get("params") != params:
+            if manifest is not None:
+                print(f"Checkpoint {self.directory} doesn't match the job, starting over")
+            for filename in os.listdir(self.directory):
+                if filename.startswith("segment_"):
+                    os.remove(os.path.join(self.directory, filename))
+            manifest = {"params": params, "segments": [], "result": None, "created_at": time.time()}
+        self.manifest = manifest
+        self._save()
+        return set(manifest["segments"])
+
+    def segment_path(self, index):
+        return os.path.join(self.directory, f"segment_{index:05d}.mp4")
+
+    def mark_segment_done(self, index):
+        """Record a segment whose file has been fully written"""
+        self.manifest["segments"].append(index)
+        self._save()
+        self.heartbeat()
+
+    def mark_completed(self, result):
+        """Store the job result and drop the segments"""
+        self.manifest = self._read_manifest() or {}
+        self.manifest.update({"result": result, "segments": []})
+        self._save()
+        for filename in os.listdir(self.directory):
+            if filename.startswith("segment_"):
+                os.remove(os.path.join(self.directory, filename))
+
+    def discard(self):
+        """Remove the checkpoint entirely"""
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    @staticmethod
+    def _owner():
+        """Lock file content identifying this process"""
+        return f"{socket.gethostname()}:{os.getpid()}"
+
+    def _held_by_other_host(self, content, modified):
+        """Whether lock content names a live holder on another host
+
+        flock may not reach across hosts on a shared checkpoint directory,
+        so another host's holder is alive while its heartbeat is fresh.
+        """
+        host = content.partition(":")[0]
+        return bool(host) and host != socket.gethostname() and \
+            time.time() - modified <= settings.CHECKPOINT_LOCK_STALE_SECONDS
+
+    def _lock_is_stale(self):
+        if is_locked(self.lock_path):
+            return False
+        try:
+            with open(self.lock_path) as f:
+                content = f.read()
+            modified = os.path.getmtime(self.lock_path)
+        except OSError:
+            return True
+        return not self._held_by_other_host(content, modified)
+
+    def acquire(self):
+        """Take the job lock so a duplicate delivery doesn't run concurrently
+
+        The lock is an flock on the lock file, which the kernel drops when
+        the holder dies, so a crashed worker's lock is free at once, even
+        if its pid now belongs to another process. For workers on other
+        hosts, a background thread also refreshes the lock's mtime every
+        quarter of CHECKPOINT_LOCK_STALE_SECONDS while it is held.
+
+        Returns:
+            True if acquired, False if another live worker holds it
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        fd = try_lock(self.lock_path)
+        if fd is None:
+            return False
+        try:
+            content = os.pread(fd, 256, 0).decode("utf-8", "replace")
+            if self._held_by_other_host(content, os.fstat(fd).st_mtime):
+                os.close(fd)
+                return False
+            owner = self._owner().encode("utf-8")
+            os.ftruncate(fd, 0)
+            os.pwrite(fd, owner, 0)
+        except OSError:
+            os.close(fd)
+            raise
+        self._lock_fd = fd
+        self._start_heartbeat()
+        return True
+
+    def _start_heartbeat(self):
+        stop = self._heartbeat_stop = threading.Event()
+        interval = max(settings.CHECKPOINT_LOCK_STALE_SECONDS / 4, 1)
+
+        def beat():
+            while not stop.wait(interval):
+                self.heartbeat()
+
+        threading.Thread(target=beat, name="checkpoint-heartbeat", daemon=True).start()
+
+    def heartbeat(self):
+        """Refresh the lock so another host doesn't take it over as stale"""
+        try:
+            os.utime(self.lock_path)
+        except OSError:
+            pass
+
+    def release(self):
+        """Drop the job lock if this process still holds it"""
+        if self._heartbeat_stop is not None:
+            self._heartbeat_stop.set()
+            self._heartbeat_stop = None
+        fd, self._lock_fd = self._lock_fd, None
+        if fd is None:
+            return
+        try:
+            # Removed while still locked, so nobody locks the old file
+            # (try_lock checks the file it locked is still in place)
+            if os.pread(fd, 256, 0).decode("utf-8", "replace") == self._owner():
+                os.remove(self.lock_path)
+        except FileNotFoundError:
+            pass
+        finally:
+            os.close(fd)
+
+def cleanup_checkpoints(max_age_hours=None, base_dir=None):
+    """Delete checkpoints of jobs abandoned or finished long ago
+
+    Returns:
+        Number of checkpoints deleted
+    """
+    if max_age_hours is None:
+        max_age_hours = settings.CHECKPOINT_TTL_HOURS
+    base_dir = base_dir or settings.CHECKPOINT_DIR
+    if not os.path.isdir(base_dir):
+        return 0
+
+    cutoff = time.time() - max_age_hours * 3600
+    deleted = 0
+    for entry in os.scandir(base_dir):
+        if not entry.is_dir():
+            continue
+        checkpoint = JobCheckpoint(entry.name, base_dir)
+        try:
+            last_update = os.path.getmtime(checkpoint.manifest_path)
+        except OSError:
+            last_update = entry.stat().st_mtime
+        if last_update < cutoff and (not os.path.exists(checkpoint.lock_path) or checkpoint._lock_is_stale()):
+            checkpoint.discard()
+            deleted += 1
+    return deleted
@@ -0,0 +1,111 @@
+import numpy as np
+from ..models.face_results import FaceDetections
+from ..models.box_geometry import bbox_ious
+from ..config import settings
+
+# Typical 5-point landmark positions relative to a detector bounding box
+# (left eye, right eye, nose tip, left mouth corner, right mouth corner)
+KPS_BBOX_TEMPLATE = np.array([
+    [0.31, 0.40],
+    [0.69, 0.40],
+    [0.50, 0.58],
+    [0.35, 0.78],
+    [0.65, 0.78]
+], dtype=np.float32)
+
+
+def parse_face_hints(hints, frame_shape):
+    """Validate client-supplied face hints and convert them to face objects
+
+    Each hint is a dict with a "bbox" ([x1, y1, x2, y2]) and/or "kps"
+    (five [x, y] points). A missing bbox is derived from the keypoints and
+    missing keypoints are estimated from the bbox.
+
+    Args:
+        hints: List of hint dicts from a video_frame message
+        frame_shape: Shape of the decoded frame
+
+    Returns:
+        FaceDetections, or None if any hint is unusable
+    """
+    if not isinstance(hints, list) or not hints:
+        return None
+    if len(hints) > settings.LIVE_HINT_MAX_FACES:
+        return None
+
+    height, width = frame_shape[:2]
+    faces = []
+
+    for hint in hints:
+        if not isinstance(hint, dict):
+            return None
+
+        try:
+            bbox = np.asarray(hint["bbox"], dtype=np.float32) if hint.get("bbox") is not None else None
+            kps = np.asarray(hint["kps"], dtype=np.float32) if hint.get("kps") is not None else None
+            det_score = float(hint.get("score", 1.0))
+        except (TypeError, ValueError):
+            return None
+
+        if bbox is None and kps is None:
+            return None
+        if bbox is not None and (bbox.shape != (4,) or not np.isfinite(bbox).all()):
+            return None
+        if kps is not None and (kps.shape != (5, 2) or not np.isfinite(kps).all()):
+            return None
+
+        if bbox is None:
+            # Pad the keypoint extent out to a face-sized box
+            x1, y1 = kps.min(axis=0)
+            x2, y2 = kps.max(axis=0)
+            pad_x = (x2 - x1) * 0.5
+            pad_y = (y2 - y1) * 0.6
+            bbox = np.array([x1 - pad_x, y1 - pad_y, x2 + pad_x, y2 + pad_y], dtype=np.float32)
+
+        # Clip to frame and reject degenerate boxes
+        bbox[[0, 2]] = np.clip(bbox[[0, 2]], 0, width)
+        bbox[[1, 3]] = np.clip(bbox[[1, 3]], 0, height)
+        box_w = bbox[2] - bbox[0]
+        box_h = bbox[3] - bbox[1]
+        if min(box_w, box_h) < settings.LIVE_HINT_MIN_FACE_SIZE:
+            return None
+
+        if kps is None:
+            kps = bbox[:2] + KPS_BBOX_TEMPLATE * np.array([box_w, box_h], dtype=np.float32)
+        else:
+            # Keypoints must fall inside a loosely expanded bbox
+            margin = np.array([box_w, box_h], dtype=np.float32) * 0.25
+            if (kps < bbox[:2] - margin).any() or (kps > bbox[2:] + margin).any():
+                return None
+
+        faces.append((bbox, kps, det_score))
+
+    bboxes, kps, det_scores = zip(*faces)
+    return FaceDetections.from_arrays(np.stack(bboxes), np.stack(kps), det_scores)
+
+
+def hints_match_detection(hint_faces, detected_faces, min_iou=None):
+    """Check that every hinted face overlaps a server-detected face
+
+    Args:
+        hint_faces: Faces built from client hints
+        detected_faces: Faces found by the server-side detector
+        min_iou: Minimum IoU to count as a match
+
+    Returns:
+        True if all hints are confirmed by detection
+    """
+    if min_iou is None:
+        min_iou = settings.LIVE_HINT_MIN_IOU
+
+    if isinstance(detected_faces, FaceDetections):
+        detected_boxes = detected_faces.bboxes
+    else:
+        detected_boxes = np.array([face.bbox for face in detected_faces], dtype=np.float32).reshape(-1, 4)
+
+    for hint_face in hint_faces:
+        ious = bbox_ious(hint_face.bbox, detected_boxes)
+        if not ious.size or ious.max() < min_iou:
+            return False
+
+    return True
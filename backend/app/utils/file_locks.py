@@ -0,0 +1,51 @@
+import os
+import fcntl
+
+def try_lock(path):
+    """Take an exclusive advisory lock (flock) on a file without waiting
+
+    The kernel drops the lock when the holding process exits, however it
+    dies, so unlike a recorded pid the lock can't outlive its holder or be
+    mistaken for a live one after the pid is reused.
+
+    Args:
+        path: File to lock (created if missing)
+
+    Returns:
+        File descriptor holding the lock (close it to release), or None if
+        another process holds it
+    """
+    for _ in range(3):
+        fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            os.close(fd)
+            return None
+        try:
+            # The previous holder may have removed the file before we got
+            # the lock; a lock on the unlinked file guards nothing
+            if os.fstat(fd).st_ino == os.stat(path).st_ino:
+                return fd
+        except FileNotFoundError:
+            pass
+        os.close(fd)
+    return None
+
+def is_locked(path):
+    """Whether another process holds a try_lock() lock on a file
+
+    Returns:
+        True if locked, False if unlocked or missing
+    """
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except FileNotFoundError:
+        return False
+    try:
+        fcntl.flock(fd, fcntl.LOCK_SH | fcntl.LOCK_NB)
+    except BlockingIOError:
+        return True
+    finally:
+        os.close(fd)
+    return False
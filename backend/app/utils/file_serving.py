@@ -0,0 +1,153 @@
+import os
+from email.utils import formatdate, parsedate_to_datetime
+import anyio
+from starlette.requests import Request
+from starlette.responses import FileResponse
+from starlette.types import Receive, Scope, Send
+
+# Results are written once under unique names, so clients may cache forever
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+def parse_range_header(range_header, size):
+    """Parse a single-range `Range: bytes=...` header
+
+    Args:
+        range_header: Value of the Range header
+        size: Size of the file in bytes
+
+    Returns:
+        (start, end) inclusive byte offsets, None to serve the whole file
+        (missing, malformed or multi-range headers), or "unsatisfiable"
+    """
+    if not range_header:
+        return None
+    unit, _, ranges = range_header.partition("=")
+    if unit.strip().lower() != "bytes" or "," in ranges:
+        return None
+
+    start_text, _, end_text = ranges.strip().partition("-")
+    try:
+        if start_text == "":
+            # Suffix range: the last N bytes
+            length = int(end_text)
+            if length <= 0:
+                return "unsatisfiable"
+            return max(0, size - length), size - 1
+        start = int(start_text)
+        end = int(end_text) if end_text else size - 1
+    except ValueError:
+        return None
+
+    if start >= size or start < 0 or end < start:
+        return "unsatisfiable"
+    return start, min(end, size - 1)
+
+class RangeFileResponse(FileResponse):
+    """FileResponse with byte ranges, conditional requests and zero-copy sends
+
+    Serves 206 Partial Content for `Range` requests, 304 Not Modified for
+    matching `If-None-Match`/`If-Modified-Since`, and 416 for ranges past
+    the end. The body goes out through the ASGI zero-copy extension when
+    the server offers it, otherwise in fixed-size chunks.
+    """
+
+    chunk_size = 256 * 1024
+
+    def __init__(self, path, request: Request, media_type=None, filename=None, content_disposition_type="attachment"):
+        stat_result = os.stat(path)
+        super().__init__(
+            path,
+            media_type=media_type,
+            filename=filename,
+            stat_result=stat_result,
+            method=request.method,
+            content_disposition_type=content_disposition_type
+        )
+        size = stat_result.st_size
+        etag = f'"{stat_result.st_mtime_ns:x}-{size:x}"'
+        self.headers["etag"] = etag
+        self.headers["last-modified"] = formatdate(stat_result.st_mtime, usegmt=True)
+        self.headers["accept-ranges"] = "bytes"
+        self.headers["cache-control"] = IMMUTABLE_CACHE_CONTROL
+
+        self.offset = 0
+        self.count = size
+
+        if self._not_modified(request, etag, stat_result.st_mtime):
+            self.status_code = 304
+            self.count = 0
+            del self.headers["content-length"]
+            return
+
+        # If-Range: only honour the range if the client's copy is current
+        byte_range = parse_range_header(request.headers.get("range"), size)
+        if_range = request.headers.get("if-range")
+        if if_range and if_range != etag and if_range != self.headers["last-modified"]:
+            byte_range = None
+
+        if byte_range == "unsatisfiable":
+            self.status_code = 416
+            self.count = 0
+            self.headers["content-range"] = f"bytes */{size}"
+            self.headers["content-length"] = "0"
+        elif byte_range is not None:
+            start, end = byte_range
+            self.status_code = 206
+            self.offset = start
+            self.count = end - start + 1
+            self.headers["content-range"] = f"bytes {start}-{end}/{size}"
+            self.headers["content-length"] = str(self.count)
+
+    @staticmethod
+    def _not_modified(request, etag, mtime):
+        if_none_match = request.headers.get("if-none-match")
+        if if_none_match is not None:
+            return if_none_match.strip() == "*" or etag in [tag.strip() for tag in if_none_match.split(",")]
+
+        if_modified_since = request.headers.get("if-modified-since")
+        if if_modified_since:
+            try:
+                return int(mtime) <= parsedate_to_datetime(if_modified_since).timestamp()
+            except (TypeError, ValueError):
+                return False
+        return False
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        await send({
+            "type": "http.response.start",
+            "status": self.status_code,
+            "headers": self.raw_headers,
+        })
+
+        if self.send_header_only or self.count == 0:
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+        elif "http.response.zerocopysend" in scope.get("extensions", {}):
+            # Server-side sendfile straight from the file descriptor
+            with open(self.path, "rb") as file:
+                await send({
+                    "type": "http.response.zerocopysend",
+                    "file": file.fileno(),
+                    "offset": self.offset,
+                    "count": self.count,
+                    "more_body": False,
+                })
+        else:
+            async with await anyio.open_file(self.path, mode="rb") as file:
+                await file.seek(self.offset)
+                remaining = self.count
+                while remaining > 0:
+                    chunk = await file.read(min(self.chunk_size, remaining))
+                    if not chunk:
+                        break
+                    remaining -= len(chunk)
+                    await send({
+                        "type": "http.response.body",
+                        "body": chunk,
+                        "more_body": remaining > 0,
+                    })
+                if remaining > 0:
+                    # File shrank underneath us; close the body cleanly
+                    await send({"type": "http.response.body", "body": b"", "more_body": False})
+
+        if self.background is not None:
+            await self.background()
@@ -0,0 +1,87 @@
+import cv2
+import numpy as np
+from ..config import settings
+
+# Frame kinds returned by FrameChangeDetector.classify
+NEW_FRAME = "new"  # Detect and swap
+STATIC_FRAME = "static"  # Swap with the last detection
+DUPLICATE_FRAME = "duplicate"  # Reuse the last output
+
+class FrameChangeDetector:
+    """Classify video frames by how much they changed
+
+    Each frame is reduced to a small grayscale thumbnail. A frame whose
+    thumbnail and pixels equal the previous frame's (frozen frames, VFR
+    padding) is a duplicate. A frame that differs from the frame of the
+    last detection by less than `face_threshold` (mean absolute difference,
+    0-255) inside every detected face and less than `block_threshold` in
+    every thumbnail block is static, so that detection is still valid.
+    Anything else, or a static run longer than `max_run`, is new.
+    """
+
+    THUMBNAIL_SIZE = 64
+    BLOCK_SIZE = 4  # Thumbnail pixels per block side
+
+    def __init__(self, face_threshold=None, block_threshold=None, max_run=None):
+        self.face_threshold = face_threshold if face_threshold is not None else settings.FRAME_REUSE_FACE_THRESHOLD
+        self.block_threshold = block_threshold if block_threshold is not None else settings.FRAME_REUSE_BLOCK_THRESHOLD
+        self.max_run = max_run if max_run is not None else settings.FRAME_REUSE_MAX_RUN
+        self._previous = None  # Copy of the last frame
+        self._previous_thumbnail = None
+        self._reference_thumbnail = None  # Thumbnail of the last new frame
+        self._run = 0
+
+    def thumbnail(self, frame):
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY) if frame.ndim == 3 else frame
+        size = self.THUMBNAIL_SIZE
+        return cv2.resize(gray, (size, size), interpolation=cv2.INTER_AREA)
+
+    def classify(self, frame, faces=None):
+        """Compare a frame with the previous ones
+
+        Args:
+            frame: BGR frame (may be reused by the caller afterwards)
+            faces: Detections of the last new frame, for the face region
+                check (FaceDetections or a list of faces)
+
+        Returns:
+            NEW_FRAME, STATIC_FRAME or DUPLICATE_FRAME
+        """
+        thumbnail = self.thumbnail(frame)
+        if self._previous is not None and self._previous.shape == frame.shape:
+            # The thumbnails act as a hash; pixels are compared only on a match
+            if np.array_equal(thumbnail, self._previous_thumbnail) and np.array_equal(frame, self._previous):
+                return DUPLICATE_FRAME
+            np.copyto(self._previous, frame)
+            self._previous_thumbnail = thumbnail
+            if self._run < self.max_run and self._is_static(thumbnail, faces, frame.shape):
+                self._run += 1
+                return STATIC_FRAME
+        else:
+            self._previous = frame.copy()
+            self._previous_thumbnail = thumbnail
+
+        self._reference_thumbnail = thumbnail
+        self._run = 0
+        return NEW_FRAME
+
+    def _is_static(self, thumbnail, faces, shape):
+        diff = cv2.absdiff(thumbnail, self._reference_thumbnail).astype(np.float32)
+
+        # Any block changing (e.g. a face entering) needs a new detection
+        blocks = self.THUMBNAIL_SIZE // self.BLOCK_SIZE
+        if cv2.resize(diff, (blocks, blocks), interpolation=cv2.INTER_AREA).max() > self.block_threshold:
+            return False
+
+        # Faces are where the swap shows; they must barely move
+        if faces is not None and len(faces):
+            height, width = shape[:2]
+            scale = np.array([width, height, width, height], dtype=np.float32) / self.THUMBNAIL_SIZE
+            for face in faces:
+                x1, y1, x2, y2 = np.asarray(face.bbox, dtype=np.float32) / scale
+                x1, y1 = max(int(x1), 0), max(int(y1), 0)
+                x2 = min(max(int(np.ceil(x2)), x1 + 1), self.THUMBNAIL_SIZE)
+                y2 = min(max(int(np.ceil(y2)), y1 + 1), self.THUMBNAIL_SIZE)
+                if x1 < x2 and y1 < y2 and diff[y1:y2, x1:x2].mean() > self.face_threshold:
+                    return False
+        return True
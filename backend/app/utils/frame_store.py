@@ -0,0 +1,240 @@
+import os
+import time
+import uuid
+import socket
+import tempfile
+import threading
+import numpy as np
+from ..config import settings
+from .file_locks import try_lock, is_locked
+
+# What happens when every slot holds a frame and another one is added
+EVICTION_POLICIES = ("oldest", "released")
+
+class FrameStoreFullError(RuntimeError):
+    """No slot could be freed for a new frame in time"""
+
+def _store_directory():
+    return settings.FRAME_STORE_DIR or tempfile.gettempdir()
+
+def sweep_stale_frame_stores(directory=None, max_age_hours=None):
+    """Delete backing files left behind by jobs that died without close()
+
+    The job that created a file holds an flock on it, which the kernel
+    drops when the job dies, so a file of this host that isn't locked is
+    stale. Files are named after their host; those of other hosts (a
+    shared FRAME_STORE_DIR) or of an older naming are deleted once older
+    than `max_age_hours` (default STORAGE_TTL_HOURS).
+
+    Returns:
+        Number of files deleted
+    """
+    directory = directory or _store_directory()
+    if max_age_hours is None:
+        max_age_hours = settings.STORAGE_TTL_HOURS
+    hostname = socket.gethostname()
+    cutoff = time.time() - max_age_hours * 3600
+    deleted = 0
+    try:
+        entries = list(os.scandir(directory))
+    except OSError:
+        return 0
+    for entry in entries:
+        if not (entry.name.startswith("frames_") and entry.name.endswith(".mmap")):
+            continue
+        host = entry.name[len("frames_"):-len(".mmap")].rpartition("_")[0]
+        try:
+            if host == hostname:
+                if is_locked(entry.path):
+                    continue  # The job is still running
+            elif entry.stat().st_mtime >= cutoff:
+                continue
+            os.remove(entry.path)
+            deleted += 1
+        except OSError:
+            pass
+    return deleted
+
+class FrameStore:
+    """Fixed-size ring of decoded frames in a preallocated memory-mapped file
+
+    Frames are addressed by their index in the video. The decoder writes
+    straight into a slot (`read_from`), swap code reads slots as numpy
+    views without copying (`get`) and the encoder drains them (`release`).
+    Because the slots live in a file-backed memmap, the OS can page cold
+    frames out to disk instead of the job holding every frame in RAM, and
+    other processes can open the same slots with `attach`.
+
+    Eviction policies:
+        oldest: a new frame overwrites the oldest slot when the ring is full
+        released: a new frame waits until the oldest frame is released
+    """
+
+    def __init__(self, capacity, shape, dtype=np.uint8, path=None, eviction=None):
+        """
+        Args:
+            capacity: Number of frame slots
+            shape: Frame shape, e.g. (height, width, 3)
+            dtype: Frame dtype
+            path: Backing file (a new file in FRAME_STORE_DIR if omitted)
+            eviction: "oldest" or "released" (default FRAME_STORE_EVICTION)
+        """
+        eviction = eviction or settings.FRAME_STORE_EVICTION
+        if eviction not in EVICTION_POLICIES:
+            raise ValueError(f"Unknown eviction policy {eviction!r}, expected one of {EVICTION_POLICIES}")
+        if capacity < 1:
+            raise ValueError("Frame store capacity must be at least 1")
+
+        self.capacity = int(capacity)
+        self.shape = tuple(shape)
+        self.dtype = np.dtype(dtype)
+        self.eviction = eviction
+        self._owner = path is None
+        self._lock_fd = None
+        if path is None:
+            directory = _store_directory()
+            os.makedirs(directory, exist_ok=True)
+            path = os.path.join(directory, f"frames_{socket.gethostname()}_{uuid.uuid4().hex}.mmap")
+            # Held until close() (or the job's death) so
+            # sweep_stale_frame_stores can tell the file is in use
+            self._lock_fd = try_lock(path)
+        self.path = path
+        mode = "w+" if self._owner else "r+"
+        self.slots = np.memmap(path, dtype=self.dtype, mode=mode, shape=(self.capacity,) + self.shape)
+
+        # Stored frames occupy indices [_first, _next); _released holds the
+        # ones the consumer is done with
+        self._first = 0
+        self._next = 0
+        self._released = set()
+        self._condition = threading.Condition()
+
+    @classmethod
+    def attach(cls, path, capacity, shape, dtype=np.uint8):
+        """Open an existing store's slots from another process
+
+        The attached store only reads and writes slots by index; the
+        owner keeps track of which frames are stored.
+        """
+        return cls(capacity, shape, dtype=dtype, path=path, eviction="oldest")
+
+    @classmethod
+    def for_video(cls, width, height, capacity=None, **kwargs):
+        """Store for BGR frames of the given size"""
+        return cls(capacity or settings.CHECKPOINT_SEGMENT_FRAMES, (height, width, 3), **kwargs)
+
+    def __len__(self):
+        return self._next - self._first
+
+    def __contains__(self, index):
+        return self._first <= index < self._next
+
+    @property
+    def next_index(self):
+        """Index the next stored frame will get"""
+        return self._next
+
+    def slot_for(self, index):
+        """Slot view for a frame index, whether or not it is stored"""
+        return self.slots[index % self.capacity]
+
+    def slot_of(self, view):
+        """Slot number of a view handed out by `get`
+
+        Raises:
+            ValueError: The array is not a whole slot of this store
+        """
+        offset = view.__array_interface__["data"][0] - self.slots.__array_interface__["data"][0]
+        slot, remainder = divmod(offset, self.slots[0].nbytes)
+        if remainder or not 0 <= slot < self.capacity or view.shape != self.shape:
+            raise ValueError("Array is not a frame store slot")
+        return slot
+
+    def _reserve(self, timeout):
+        """Make room for frame `_next` and return its slot"""
+        with self._condition:
+            if self._next - self._first >= self.capacity:
+                if self.eviction == "released":
+                    freed = self._condition.wait_for(lambda: self._first in self._released, timeout)
+                    if not freed:
+                        raise FrameStoreFullError(f"Frame store full ({self.capacity} frames) and nothing was released")
+                self._released.discard(self._first)
+                self._first += 1
+            return self.slot_for(self._next)
+
+    def _commit(self):
+        with self._condition:
+            self._next += 1
+            return self._next - 1
+
+    def put(self, frame, timeout=None):
+        """Copy a frame into the next slot
+
+        Args:
+            frame: Frame array matching the store's shape
+            timeout: Seconds to wait for a released slot (None waits forever)
+
+        Returns:
+            Index of the stored frame
+        """
+        if frame.shape != self.shape:
+            raise ValueError(f"Frame shape {frame.shape} does not match store shape {self.shape}")
+        np.copyto(self._reserve(timeout), frame, casting="unsafe")
+        return self._commit()
+
+    def read_from(self, cap, timeout=None):
+        """Decode the next frame of a cv2.VideoCapture straight into a slot
+
+        Returns:
+            Index of the stored frame, or None at the end of the video
+        """
+        slot = self._reserve(timeout)
+        ret, frame = cap.read(slot)
+        if not ret:
+            return None
+        if frame is not slot and not np.shares_memory(frame, slot):
+            # The decoder allocated its own buffer (e.g. a size change)
+            if frame.shape != self.shape:
+                raise ValueError(f"Decoded frame shape {frame.shape} does not match store shape {self.shape}")
+            np.copyto(slot, frame)
+        return self._commit()
+
+    def get(self, index):
+        """Zero-copy view of a stored frame
+
+        Raises:
+            KeyError: The frame was never stored or has been evicted
+        """
+        if index not in self:
+            raise KeyError(f"Frame {index} is not in the store")
+        return self.slot_for(index)
+
+    def release(self, index):
+        """Mark a frame as consumed so its slot can be reused
+
+        Frames are evicted in order, so a slot frees up once every older
+        frame has been released too.
+        """
+        with self._condition:
+            if index in self:
+                self._released.add(index)
+                self._condition.notify_all()
+
+    def close(self):
+        """Drop the mapping and delete the backing file (if this store created it)
+
+        Views handed out by `get` stay valid until they are garbage
+        collected; the file's pages are freed once the last one is gone.
+        """
+        self.slots = None
+        if self._owner and os.path.exists(self.path):
+            os.remove(self.path)
+        if self._lock_fd is not None:
+            os.close(self._lock_fd)
+            self._lock_fd = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
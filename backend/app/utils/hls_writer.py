@@ -0,0 +1,167 @@
+import os
+import subprocess
+import tempfile
+import numpy as np
+from ..config import settings
+
+MASTER_PLAYLIST = "master.m3u8"
+
+# Playlist and segment content types for serving
+HLS_MEDIA_TYPES = {
+    ".m3u8": "application/vnd.apple.mpegurl",
+    ".m4s": "video/iso.segment",
+    ".mp4": "video/mp4",
+}
+
+def build_ladder(width, height, fps, heights=None):
+    """Pick the renditions to encode for a video
+
+    Rungs taller than the source are dropped; a source smaller than every
+    rung gets a single rendition at its own size.
+
+    Args:
+        width: Source frame width
+        height: Source frame height
+        fps: Source frame rate
+        heights: Rendition heights (default HLS_RENDITION_HEIGHTS)
+
+    Returns:
+        List of dicts with width, height and bitrate (kbit/s), largest first
+    """
+    if heights is None:
+        heights = settings.HLS_RENDITION_HEIGHTS
+    rungs = sorted({h for h in heights if h <= height}, reverse=True) or [height]
+
+    ladder = []
+    for rung in rungs:
+        # Even dimensions for yuv420p
+        rung_height = rung - rung % 2
+        rung_width = int(round(width * rung / height / 2)) * 2
+        bitrate = int(rung_width * rung_height * fps * settings.HLS_BITS_PER_PIXEL / 1000)
+        ladder.append({"width": rung_width, "height": rung_height, "bitrate": max(bitrate, 200)})
+    return ladder
+
+class HLSWriter:
+    """Encode frames into fMP4 HLS renditions as they are produced
+
+    A single ffmpeg process reads raw BGR frames on stdin, scales them to
+    every rendition of the ladder and writes segments plus playlists under
+    `output_dir`. Players can start on `master.m3u8` as soon as the first
+    segment is written; the playlists are closed with ENDLIST by `close()`.
+    """
+
+    def __init__(self, output_dir, width, height, fps, ladder=None):
+        self.output_dir = output_dir
+        self.width = width
+        self.height = height
+        self.fps = fps or 30.0
+        self.ladder = ladder or build_ladder(width, height, self.fps)
+        self.process = None
+        self._stderr_file = None
+
+    def build_command(self):
+        """ffmpeg arguments for the raw-frame to HLS pipeline"""
+        gop = max(1, int(round(self.fps * settings.HLS_SEGMENT_SECONDS)))
+        splits = "".join(f"[v{i}]" for i in range(len(self.ladder)))
+        filters = [f"[0:v]split={len(self.ladder)}{splits}"] + [
+            f"[v{i}]scale={rung['width']}:{rung['height']}[out{i}]"
+            for i, rung in enumerate(self.ladder)
+        ]
+
+        command = [
+            "ffmpeg", "-y", "-loglevel", "error",
+            "-f", "rawvideo", "-pix_fmt", "bgr24",
+            "-s", f"{self.width}x{self.height}", "-r", f"{self.fps:.3f}",
+            "-i", "-",
+            "-filter_complex", ";".join(filters),
+        ]
+        for i, rung in enumerate(self.ladder):
+            command += [
+                "-map", f"[out{i}]",
+                f"-c:v:{i}", "libx264",
+                f"-b:v:{i}", f"{rung['bitrate']}k",
+                f"-maxrate:v:{i}", f"{int(rung['bitrate'] * 1.1)}k",
+                f"-bufsize:v:{i}", f"{rung['bitrate'] * 2}k",
+            ]
+        command += [
+            "-preset", "veryfast", "-pix_fmt", "yuv420p",
+            # Fixed GOP so every rendition cuts segments on the same frames
+            "-g", str(gop), "-keyint_min", str(gop), "-sc_threshold", "0",
+            "-f", "hls",
+            "-hls_time", str(settings.HLS_SEGMENT_SECONDS),
+            "-hls_playlist_type", "event",
+            "-hls_segment_type", "fmp4",
+            "-hls_flags", "independent_segments+temp_file",
+            "-hls_fmp4_init_filename", "init_%v.mp4",
+            "-hls_segment_filename", os.path.join(self.output_dir, "%v", "segment_%05d.m4s"),
+            "-master_pl_name", MASTER_PLAYLIST,
+            "-var_stream_map", " ".join(f"v:{i}" for i in range(len(self.ladder))),
+            os.path.join(self.output_dir, "%v", "playlist.m3u8"),
+        ]
+        return command
+
+    def start(self):
+        """Start the encoder process"""
+        for i in range(len(self.ladder)):
+            os.makedirs(os.path.join(self.output_dir, str(i)), exist_ok=True)
+        # stderr goes to a file rather than a pipe nobody drains until exit:
+        # once a chatty encoder filled the pipe it would block, stop reading
+        # stdin and stall write() for good
+        self._stderr_file = tempfile.TemporaryFile()
+        self.process = subprocess.Popen(self.build_command(), stdin=subprocess.PIPE, stderr=self._stderr_file)
+        return self
+
+    def write(self, frame):
+        """Send one BGR frame to the encoder"""
+        if frame.shape[1] != self.width or frame.shape[0] != self.height:
+            raise ValueError(f"Frame size {frame.shape[1]}x{frame.shape[0]} doesn't match {self.width}x{self.height}")
+        try:
+            # A view of the frame's buffer, no per-frame copy
+            self.process.stdin.write(memoryview(np.ascontiguousarray(frame)))
+        except BrokenPipeError:
+            self.process.wait()
+            raise RuntimeError(f"HLS encoder exited: {self._stderr()}")
+
+    def close(self):
+        """Flush the last segment and finalize the playlists
+
+        Returns:
+            Path to the master playlist
+        """
+        self.process.stdin.close()
+        try:
+            returncode = self.process.wait()
+            if returncode != 0:
+                raise RuntimeError(f"HLS encoder failed ({returncode}): {self._stderr()}")
+        finally:
+            self._stderr_file.close()
+        return os.path.join(self.output_dir, MASTER_PLAYLIST)
+
+    def abort(self):
+        """Stop the encoder without finalizing"""
+        if self.process and self.process.poll() is None:
+            self.process.kill()
+            self.process.wait()
+        if self._stderr_file:
+            self._stderr_file.close()
+
+    def _stderr(self):
+        try:
+            self._stderr_file.seek(0)
+            return self._stderr_file.read().decode("utf-8", "replace").strip()
+        except Exception:
+            return ""
+
+    def remux_to_mp4(self, output_path, rendition=0):
+        """Copy one finished rendition into a single MP4 for download
+
+        Stream copy only, so this costs a read of the segments rather than
+        another encode.
+        """
+        subprocess.run(
+            ["ffmpeg", "-y", "-loglevel", "error",
+             "-i", os.path.join(self.output_dir, str(rendition), "playlist.m3u8"),
+             "-c", "copy", "-movflags", "+faststart", output_path],
+            check=True, capture_output=True
+        )
+        return output_path
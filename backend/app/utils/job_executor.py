@@ -0,0 +1,202 @@
+import time
+import heapq
+import itertools
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from ..config import settings
+from .progress_store import progress_store
+from .result_cache import result_cache
+from .storage import storage_manager
+from .local_store import LocalStore, ForwardingClient
+
+class CeleryExecutor:
+    """Submit jobs to the Celery workers through the Redis broker"""
+
+    def submit(self, kind, args=(), kwargs=None, task_id=None, queue=None, priority=None):
+        """Queue a job
+
+        Args:
+            kind: "video" or "preview"
+            args: Positional job arguments
+            kwargs: Keyword job arguments
+            task_id: Job ID to use (generated if omitted)
+            queue: Celery queue name
+            priority: Priority on the queue (0 is served first)
+
+        Returns:
+            Job ID
+        """
+        from .celery_tasks import process_video_deepfake, render_video_preview
+        task = {"video": process_video_deepfake, "preview": render_video_preview}[kind]
+        return task.apply_async(args=args, kwargs=kwargs, task_id=task_id, queue=queue, priority=priority).id
+
+    def start(self):
+        pass
+
+    def shutdown(self):
+        pass
+
+def _init_local_worker(ops_queue):
+    """Job process initializer: send store writes to the API process"""
+    progress_store.use_local(ForwardingClient(ops_queue))
+
+def _run_job(kind, task_id, args, kwargs):
+    from .celery_tasks import run_video_job, run_preview_job
+    job = {"video": run_video_job, "preview": run_preview_job}[kind]
+    return job(task_id, *args, **(kwargs or {}))
+
+class LocalExecutor:
+    """Run jobs in a process pool owned by the API process
+
+    For single-node installs: no Redis or Celery worker is needed. Job
+    processes are forked from the API after its models are loaded, so
+    they share the weights copy-on-write instead of loading their own.
+    Progress, the result cache and previews use an in-memory store that
+    job processes write to through a queue. Jobs are dispatched by queue
+    priority, and a job whose process dies is retried once (resuming
+    from its checkpoint).
+    """
+
+    def __init__(self, max_workers=None):
+        self.max_workers = max_workers or settings.LOCAL_EXECUTOR_WORKERS
+        self.store = LocalStore()
+        self._pool = None
+        self._ops = None
+        self._jobs = []  # heap of (priority, sequence, job)
+        self._sequence = itertools.count()
+        self._running = 0
+        self._condition = threading.Condition()
+        self._stopped = False
+        self._replace_pool = False  # Set when the pool broke; the dispatcher replaces it
+
+    def start(self):
+        """Create the pool and the dispatch, store and cleanup threads"""
+        progress_store.use_local(self.store)
+        self._ops = multiprocessing.get_context("fork").Queue()
+        # Job processes are forked here, before this executor starts any thread
+        self._pool = self._new_pool()
+        for target in (self._dispatch, self._apply_store_writes, self._cleanup_loop):
+            threading.Thread(target=target, daemon=True).start()
+
+    def _new_pool(self):
+        """Pool of job processes, all forked before this returns
+
+        fork so children inherit the loaded (fork-safe) model sessions. A
+        fork pool starts every process on its first submit, so a no-op job
+        is run right away instead of forking from whichever thread submits
+        the first real job.
+        """
+        pool = ProcessPoolExecutor(
+            max_workers=self.max_workers,
+            mp_context=multiprocessing.get_context("fork"),
+            initializer=_init_local_worker,
+            initargs=(self._ops,)
+        )
+        pool.submit(int).result()
+        return pool
+
+    def submit(self, kind, args=(), kwargs=None, task_id=None, queue=None, priority=None):
+        """Queue a job (same interface as CeleryExecutor.submit)"""
+        job = {"kind": kind, "task_id": task_id, "args": tuple(args), "kwargs": kwargs or {}, "attempts": 0}
+        with self._condition:
+            heapq.heappush(self._jobs, (priority or 0, next(self._sequence), job))
+            self._condition.notify()
+        return task_id
+
+    def _dispatch(self):
+        while True:
+            with self._condition:
+                while not self._stopped and not self._replace_pool and (
+                    not self._jobs or self._running >= self.max_workers
+                ):
+                    self._condition.wait()
+                if self._stopped:
+                    return
+                replace_pool = self._replace_pool
+                self._replace_pool = False
+                if not replace_pool:
+                    _, _, job = heapq.heappop(self._jobs)
+                    self._running += 1
+            if replace_pool:
+                # Pools are only (re)built here, never from a future callback
+                broken, self._pool = self._pool, self._new_pool()
+                broken.shutdown(wait=False)
+                continue
+            job["attempts"] += 1
+            pool = self._pool
+            try:
+                future = pool.submit(_run_job, job["kind"], job["task_id"], job["args"], job["kwargs"])
+            except BrokenProcessPool as e:
+                self._finished(job, pool, e)
+                continue
+            future.add_done_callback(lambda future, job=job, pool=pool: self._finished(job, pool, future.exception()))
+
+    def _finished(self, job, pool, error):
+        with self._condition:
+            self._running -= 1
+            self._condition.notify()
+        if error is None:
+            return
+
+        if isinstance(error, BrokenProcessPool):
+            # A job process died (e.g. OOM kill); every job on that pool
+            # fails with it, so have it replaced only once
+            with self._condition:
+                if not self._stopped and self._pool is pool:
+                    self._replace_pool = True
+                    self._condition.notify()
+            if job["attempts"] < 2:
+                print(f"Job process died, retrying job {job['task_id']}")
+                with self._condition:
+                    heapq.heappush(self._jobs, (0, next(self._sequence), job))
+                    self._condition.notify()
+                return
+
+        # The job process can't read the store, so failure cleanup happens here
+        progress_store.update(job["task_id"], 'failed', error=str(error), finish_time=round(time.time(), 3))
+        cache_key = job["kwargs"].get("cache_key")
+        if cache_key:
+            result_cache.release(cache_key, job["task_id"])
+        if isinstance(error, BrokenProcessPool):
+            # A job that raised unpinned its uploads itself; a dead one couldn't
+            from .celery_tasks import job_uploads
+            source_path, target_path = job["args"][:2]
+            storage_manager.unpin(*job_uploads(source_path, target_path, job["kwargs"].get("selection")))
+
+    def _apply_store_writes(self):
+        while True:
+            try:
+                method, args, kwargs = self._ops.get()
+                self.store.apply(method, args, kwargs)
+            except (EOFError, OSError):
+                return
+            except Exception as e:
+                print(f"Error applying job store write: {str(e)}")
+
+    def _cleanup_loop(self):
+        # Stands in for the Celery beat schedule
+        from .celery_tasks import cleanup_old_files
+        while not self._stopped:
+            time.sleep(600)
+            try:
+                cleanup_old_files(settings.STORAGE_TTL_HOURS)
+            except Exception as e:
+                print(f"Error in storage cleanup: {str(e)}")
+
+    def shutdown(self):
+        with self._condition:
+            self._stopped = True
+            self._condition.notify_all()
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+
+def create_executor():
+    """Build the executor selected by JOB_EXECUTOR ("celery" or "local")"""
+    if settings.JOB_EXECUTOR == "local":
+        return LocalExecutor()
+    return CeleryExecutor()
+
+# Singleton instance
+job_executor = create_executor()
@@ -0,0 +1,104 @@
+from kombu import Queue
+from ..config import settings
+
+# Job class -> (queue name, Redis priority; 0 is served first)
+JOB_CLASSES = {
+    "short": ("video_short", 0),
+    "long": ("video_long", 3),
+    "bulk": ("video_bulk", 6),
+}
+
+DEFAULT_QUEUE = "celery"
+
+def estimate_cost(probe):
+    """Estimate the processing cost of a video job
+
+    Cost is measured in megapixel-frames weighted by the number of faces
+    per frame, since detection scales with pixels and swapping with faces.
+
+    Args:
+        probe: Dict from VideoProbe.probe
+
+    Returns:
+        Cost estimate (float)
+    """
+    megapixels = probe["width"] * probe["height"] / 1e6
+    return probe["frame_count"] * megapixels * max(1.0, probe["avg_faces"])
+
+def classify_job(cost):
+    """Map an estimated cost to a job class (short, long or bulk)"""
+    if cost <= settings.ROUTING_SHORT_MAX_COST:
+        return "short"
+    if cost <= settings.ROUTING_LONG_MAX_COST:
+        return "long"
+    return "bulk"
+
+def route_job(probe):
+    """Pick the queue and priority for a video job
+
+    Args:
+        probe: Dict from VideoProbe.probe, or None if probing failed
+
+    Returns:
+        Dict with job_class, queue, priority and estimated_cost
+    """
+    if probe is None:
+        # Unknown size: keep it away from the short-job pool
+        queue, priority = JOB_CLASSES["long"]
+        return {"job_class": "long", "queue": queue, "priority": priority, "estimated_cost": None}
+
+    cost = estimate_cost(probe)
+    job_class = classify_job(cost)
+    queue, priority = JOB_CLASSES[job_class]
+    return {
+        "job_class": job_class,
+        "queue": queue,
+        "priority": priority,
+        "estimated_cost": round(cost, 1)
+    }
+
+def configure_queues(celery_app):
+    """Apply the shared queue and priority configuration to a Celery app
+
+    Both the worker app and the app used to submit tasks need this so that
+    priorities are encoded the same way on the Redis broker.
+    """
+    celery_app.conf.update(
+        task_queues=[
+            Queue(queue, routing_key=queue)
+            for queue in [DEFAULT_QUEUE] + [name for name, _ in JOB_CLASSES.values()]
+        ],
+        task_default_queue=DEFAULT_QUEUE,
+        broker_transport_options={
+            "priority_steps": list(range(10)),
+            "queue_order_strategy": "priority",
+            # Late-acked jobs are redelivered only if unacked this long
+            "visibility_timeout": settings.CELERY_VISIBILITY_TIMEOUT,
+        },
+        # One job at a time per worker process so queued short jobs
+        # aren't stuck behind prefetched long ones
+        worker_prefetch_multiplier=1,
+    )
+
+def check_admission(probe, estimated_seconds):
+    """Check a probed video against the configured job limits
+
+    Args:
+        probe: Dict from VideoProbe.probe
+        estimated_seconds: Estimated processing time on this host
+
+    Returns:
+        Reason the job is rejected, or None if it is admitted
+    """
+    if probe["frame_count"] <= 0 or probe["width"] <= 0 or probe["height"] <= 0:
+        return "Video has no readable frames"
+    if probe["duration"] > settings.MAX_VIDEO_DURATION:
+        return f"Video is {probe['duration']:.0f}s long; the limit is {settings.MAX_VIDEO_DURATION:.0f}s"
+    if probe["width"] * probe["height"] > settings.MAX_VIDEO_PIXELS:
+        return f"Video resolution {probe['width']}x{probe['height']} exceeds the limit"
+    if estimated_seconds > settings.MAX_JOB_ESTIMATED_SECONDS:
+        return (
+            f"Estimated processing time {estimated_seconds:.0f}s exceeds "
+            f"the limit of {settings.MAX_JOB_ESTIMATED_SECONDS:.0f}s"
+        )
+    return None
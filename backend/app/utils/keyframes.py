@@ -0,0 +1,161 @@
+import cv2
+import numpy as np
+
+class KeyframeInterpolator:
+    """Approximate swapped frames between keyframes
+
+    After a keyframe has been swapped, the swapped face patches are kept
+    together with trackable points in each face (the 5 keypoints plus
+    corners found in the face box). For a later frame, the points are
+    tracked with pyramidal Lucas-Kanade optical flow, a similarity
+    transform is fitted per face, and the patch is warped along it and
+    blended into the frame through a feathered mask. This costs a fraction
+    of detection and swapping, at the price of the face not following
+    expression changes until the next keyframe.
+    """
+
+    PATCH_PADDING = 0.15  # Fraction of the face box added on each side
+    MIN_TRACKED_POINTS = 3
+    MAX_CORNERS = 40
+
+    def __init__(self):
+        self._gray = None
+        self._faces = []  # (points in frame coords, patch, mask, patch origin)
+
+    @property
+    def has_keyframe(self):
+        return self._gray is not None
+
+    def reset(self):
+        self._gray = None
+        self._faces = []
+
+    def set_keyframe(self, original, swapped, faces):
+        """Remember a fully swapped frame
+
+        Args:
+            original: The frame before swapping
+            swapped: The swapped frame
+            faces: Faces detected in the frame; those the swap left
+                unchanged (e.g. not selected) are not carried forward
+        """
+        height, width = original.shape[:2]
+        gray = cv2.cvtColor(original, cv2.COLOR_BGR2GRAY)
+        self._faces = []
+        for face in faces if faces is not None else ():
+            x1, y1, x2, y2 = np.asarray(face.bbox, dtype=np.float32)
+            pad_x, pad_y = (x2 - x1) * self.PATCH_PADDING, (y2 - y1) * self.PATCH_PADDING
+            x1, y1 = max(int(x1 - pad_x), 0), max(int(y1 - pad_y), 0)
+            x2, y2 = min(int(np.ceil(x2 + pad_x)), width), min(int(np.ceil(y2 + pad_y)), height)
+            if x2 - x1 < 2 or y2 - y1 < 2:
+                continue
+            patch = swapped[y1:y2, x1:x2]
+            if np.array_equal(patch, original[y1:y2, x1:x2]):
+                continue
+
+            points = [np.asarray(face.kps, dtype=np.float32).reshape(-1, 2)]
+            corners = cv2.goodFeaturesToTrack(gray[y1:y2, x1:x2], self.MAX_CORNERS, 0.01, 5)
+            if corners is not None:
+                points.append(corners.reshape(-1, 2) + np.array([x1, y1], dtype=np.float32))
+
+            # Feathered ellipse, so the warped patch has no visible edge
+            mask = np.zeros((y2 - y1, x2 - x1), dtype=np.float32)
+            axes = (max(int((x2 - x1) / 2 - pad_x / 2), 1), max(int((y2 - y1) / 2 - pad_y / 2), 1))
+            cv2.ellipse(mask, ((x2 - x1) // 2, (y2 - y1) // 2), axes, 0, 0, 360, 1.0, -1)
+            blur = max(int(min(pad_x, pad_y)) // 2 * 2 + 1, 3)
+            mask = cv2.GaussianBlur(mask, (blur, blur), 0)
+            self._faces.append((np.concatenate(points), patch.copy(), mask, np.array([x1, y1], dtype=np.float32)))
+        self._gray = gray
+
+    def interpolate(self, frame, out):
+        """Render the keyframe's swapped faces onto a later frame
+
+        Args:
+            frame: BGR frame after the keyframe
+            out: Array to write into (may be `frame` itself)
+
+        Returns:
+            `out`, or None if a face could not be tracked (the frame should
+            be swapped in full instead)
+        """
+        if out is not frame:
+            np.copyto(out, frame)
+        if not self._faces:
+            return out
+
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        # One optical flow call for the points of every face
+        points = np.concatenate([face[0] for face in self._faces]).reshape(-1, 1, 2)
+        tracked, status, _ = cv2.calcOpticalFlowPyrLK(
+            self._gray, gray, points, None, winSize=(21, 21), maxLevel=3
+        )
+        tracked, status = tracked.reshape(-1, 2), status.ravel().astype(bool)
+
+        height, width = frame.shape[:2]
+        start = 0
+        for face_points, patch, mask, origin in self._faces:
+            end = start + len(face_points)
+            good = status[start:end]
+            src, dst = face_points[good] - origin, tracked[start:end][good]
+            start = end
+            if len(src) < self.MIN_TRACKED_POINTS:
+                return None
+            matrix, _ = cv2.estimateAffinePartial2D(src, dst, method=cv2.RANSAC, ransacReprojThreshold=3.0)
+            if matrix is None:
+                return None
+
+            # Warp only into the box the moved patch covers
+            patch_height, patch_width = patch.shape[:2]
+            corners = np.array([[0, 0], [patch_width, 0], [0, patch_height], [patch_width, patch_height]], np.float32)
+            moved = corners @ matrix[:, :2].T + matrix[:, 2]
+            x1, y1 = np.maximum(np.floor(moved.min(axis=0)).astype(int), 0)
+            x2, y2 = np.minimum(np.ceil(moved.max(axis=0)).astype(int), [width, height])
+            if x2 <= x1 or y2 <= y1:
+                continue
+            matrix[:, 2] -= (x1, y1)
+            size = (int(x2 - x1), int(y2 - y1))
+            warped = cv2.warpAffine(patch, matrix, size, flags=cv2.INTER_LINEAR, borderMode=cv2.BORDER_REPLICATE)
+            alpha = cv2.warpAffine(mask, matrix, size, flags=cv2.INTER_LINEAR, borderValue=0)[..., None]
+
+            roi = out[y1:y2, x1:x2]
+            roi[...] = (warped * alpha + roi * (1.0 - alpha) + 0.5).astype(np.uint8)
+        return out
+
+def face_psnr(a, b, faces):
+    """PSNR (dB) between two frames over the faces' boxes (None without faces)"""
+    height, width = a.shape[:2]
+    squared_error, count = 0.0, 0
+    for face in faces if faces is not None else ():
+        x1, y1, x2, y2 = np.asarray(face.bbox, dtype=np.float32)
+        x1, y1 = max(int(x1), 0), max(int(y1), 0)
+        x2, y2 = min(int(np.ceil(x2)), width), min(int(np.ceil(y2)), height)
+        if x2 <= x1 or y2 <= y1:
+            continue
+        diff = a[y1:y2, x1:x2].astype(np.float32) - b[y1:y2, x1:x2]
+        squared_error += float(np.square(diff).sum())
+        count += diff.size
+    if not count:
+        return None
+    mse = squared_error / count
+    return 100.0 if mse == 0 else float(10 * np.log10(255.0 ** 2 / mse))
+
+def frame_stats_report(stats):
+    """Task result form of the counters filled in by VideoProcessor._swap_frames
+
+    The raw keyframe timings and PSNR sums are replaced by `speedup` (the
+    estimated time to swap every frame over the time taken) and
+    `interpolation_psnr` (mean face-region PSNR of interpolated frames
+    against a full swap, measured at each following keyframe).
+    """
+    report = dict(stats)
+    keyframe_seconds = report.pop("keyframe_seconds", 0.0)
+    interpolated_seconds = report.pop("interpolated_seconds", 0.0)
+    psnr_sum = report.pop("psnr_sum", 0.0)
+    psnr_samples = report.pop("psnr_samples", 0)
+    if report.get("interpolated_frames"):
+        processed = report["keyframes"] + report["interpolated_frames"]
+        total_seconds = keyframe_seconds + interpolated_seconds
+        if report["keyframes"] and total_seconds > 0:
+            report["speedup"] = round(keyframe_seconds / report["keyframes"] * processed / total_seconds, 2)
+        report["interpolation_psnr"] = round(psnr_sum / psnr_samples, 2) if psnr_samples else None
+    return report
@@ -0,0 +1,99 @@
+import os
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Dict
+import numpy as np
+from ..config import settings
+
+class StageTimer:
+    """Per-frame stage timings measured with a monotonic clock"""
+
+    def __init__(self):
+        self.timings = {}
+        self._start = time.perf_counter()
+
+    @contextmanager
+    def stage(self, name):
+        """Time the enclosed block as stage `name` (milliseconds)"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.timings[name] = (time.perf_counter() - start) * 1000
+
+    def finish(self):
+        """Record the total frame time and return all timings
+
+        Returns:
+            Dict of stage name to duration in milliseconds
+        """
+        self.timings["total"] = (time.perf_counter() - self._start) * 1000
+        return self.timings
+
+class LatencyWindow:
+    """Rolling window of stage timings with percentile summaries"""
+
+    def __init__(self, size):
+        self.size = size
+        self.stages: Dict[str, deque] = {}
+        self.frames = 0
+
+    def add(self, timings):
+        """Add one frame's stage timings to the window"""
+        self.frames += 1
+        for name, value in timings.items():
+            if name not in self.stages:
+                self.stages[name] = deque(maxlen=self.size)
+            self.stages[name].append(value)
+
+    def summary(self):
+        """Get p50/p95/p99 per stage over the window
+
+        Returns:
+            Dict with frame count and per-stage percentiles in milliseconds
+        """
+        stages = {}
+        for name, values in self.stages.items():
+            p50, p95, p99 = np.percentile(np.fromiter(values, dtype=np.float64), [50, 95, 99])
+            stages[name] = {
+                "p50": round(float(p50), 2),
+                "p95": round(float(p95), 2),
+                "p99": round(float(p99), 2)
+            }
+        return {"frames": self.frames, "stages": stages}
+
+class LatencyMetrics:
+    """Aggregates live frame timings per session and for this worker"""
+
+    def __init__(self, window_size=None):
+        self.window_size = window_size or settings.LIVE_METRICS_WINDOW
+        self.worker = LatencyWindow(self.window_size)
+        self.sessions: Dict[str, LatencyWindow] = {}
+
+    def record(self, session_id, timings):
+        """Record one frame's timings for a session"""
+        self.worker.add(timings)
+        if session_id not in self.sessions:
+            self.sessions[session_id] = LatencyWindow(self.window_size)
+        self.sessions[session_id].add(timings)
+
+    def drop_session(self, session_id):
+        """Forget a session's timings once it disconnects"""
+        self.sessions.pop(session_id, None)
+
+    def summary(self):
+        """Get worker-wide and per-session latency summaries"""
+        worker = self.worker.summary()
+        worker["pid"] = os.getpid()
+        return {
+            "window_size": self.window_size,
+            "worker": worker,
+            "sessions": {
+                session_id: window.summary()
+                for session_id, window in self.sessions.items()
+            }
+        }
+
+# Singleton instance for the live endpoint
+live_metrics = LatencyMetrics()
@@ -0,0 +1,164 @@
+import time
+import asyncio
+import threading
+import redis
+
+class LocalStore:
+    """In-process stand-in for the Redis calls made by the shared stores
+
+    Used by the local executor so single-node installs need no Redis. It
+    covers what ProgressStore, ResultCache and PreviewStore use: get, set
+    (with `ex` and `nx`), delete, publish and pipelines (including
+    WATCH/MULTI transactions). Published messages go to asyncio queues
+    registered with `listen`.
+    """
+
+    def __init__(self):
+        self._data = {}  # key -> (value, expires_at or None)
+        self._listeners = {}  # channel -> set of (loop, asyncio.Queue)
+        # Reentrant so a transaction can hold it across its commands
+        self._lock = threading.RLock()
+        self._writes = 0
+
+    def _purge_expired(self, now):
+        for key in [key for key, (_, expires_at) in self._data.items() if expires_at and expires_at <= now]:
+            del self._data[key]
+
+    def get(self, key):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            value, expires_at = item
+            if expires_at and expires_at <= time.time():
+                del self._data[key]
+                return None
+            return value
+
+    def set(self, key, value, ex=None, nx=False):
+        now = time.time()
+        with self._lock:
+            if nx:
+                item = self._data.get(key)
+                if item is not None and not (item[1] and item[1] <= now):
+                    return None
+            self._data[key] = (value, now + ex if ex else None)
+            # Expired keys are dropped lazily; sweep now and then to bound memory
+            self._writes += 1
+            if self._writes % 1000 == 0:
+                self._purge_expired(now)
+        return True
+
+    def delete(self, key):
+        with self._lock:
+            return 1 if self._data.pop(key, None) is not None else 0
+
+    def publish(self, channel, message):
+        with self._lock:
+            listeners = list(self._listeners.get(channel, ()))
+        for loop, queue in listeners:
+            loop.call_soon_threadsafe(queue.put_nowait, message)
+        return len(listeners)
+
+    def listen(self, channel):
+        """Register an asyncio queue for a channel on the running loop"""
+        queue = asyncio.Queue()
+        with self._lock:
+            self._listeners.setdefault(channel, set()).add((asyncio.get_running_loop(), queue))
+        return queue
+
+    def unlisten(self, channel, queue):
+        with self._lock:
+            listeners = self._listeners.get(channel, set())
+            listeners.discard((asyncio.get_running_loop(), queue))
+            if not listeners:
+                self._listeners.pop(channel, None)
+
+    def pipeline(self, transaction=True):
+        return _Pipeline(self)
+
+    def apply(self, method, args, kwargs):
+        """Run a forwarded call from a child process"""
+        return getattr(self, method)(*args, **kwargs)
+
+class _Pipeline:
+    """Buffers calls and runs them in order on execute()
+
+    Like a redis-py pipeline, after watch() calls run immediately until
+    multi(), and execute() raises redis.WatchError if a watched key's value
+    changed since it was watched.
+    """
+
+    def __init__(self, client):
+        self._client = client
+        self._calls = []
+        self._watched = None  # key -> value when watched
+        self._immediate = False
+
+    def __getattr__(self, method):
+        if self._immediate:
+            return getattr(self._client, method)
+
+        def buffer(*args, **kwargs):
+            self._calls.append((method, args, kwargs))
+            return self
+        return buffer
+
+    def watch(self, *keys):
+        self._watched = {key: self._client.get(key) for key in keys}
+        self._immediate = True
+
+    def multi(self):
+        self._immediate = False
+
+    def reset(self):
+        self._calls = []
+        self._watched = None
+        self._immediate = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.reset()
+
+    def execute(self):
+        calls, self._calls = self._calls, []
+        watched, self._watched = self._watched, None
+        if not watched:
+            return [getattr(self._client, method)(*args, **kwargs) for method, args, kwargs in calls]
+        with self._client._lock:
+            if any(self._client.get(key) != value for key, value in watched.items()):
+                raise redis.WatchError("Watched variable changed")
+            return [getattr(self._client, method)(*args, **kwargs) for method, args, kwargs in calls]
+
+class ForwardingClient:
+    """Store client for local executor children
+
+    Writes are sent to the API process, which applies them to its
+    LocalStore in order. Reads return nothing: job code only writes, and
+    the parent handles anything that needs the current state (e.g.
+    releasing the result cache claim of a failed job).
+    """
+
+    def __init__(self, queue):
+        self._queue = queue
+
+    def _forward(self, method, *args, **kwargs):
+        self._queue.put((method, args, kwargs))
+        return True
+
+    def set(self, *args, **kwargs):
+        return self._forward("set", *args, **kwargs)
+
+    def delete(self, *args, **kwargs):
+        return self._forward("delete", *args, **kwargs)
+
+    def publish(self, *args, **kwargs):
+        return self._forward("publish", *args, **kwargs)
+
+    def get(self, key):
+        return None
+
+    def pipeline(self, transaction=True):
+        return _Pipeline(self)
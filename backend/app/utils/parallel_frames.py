@@ -0,0 +1,266 @@
+import os
+import time
+import multiprocessing
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing import shared_memory
+import numpy as np
+from ..config import settings
+from ..models.face_gallery import selector_for
+from ..models.face_swap import face_swap_engine
+from ..models.lifecycle import preload_models
+from .batch_tuning import batch_controller, resolution_class
+from .frame_store import FrameStore
+
+# Shared memory blocks and frame stores attached by this frame worker, by name
+_attached = {}
+
+def _init_frame_worker():
+    """Frame worker initializer: load this process's own engine"""
+    # Single-threaded sessions: the pool parallelizes by process
+    preload_models(before_fork=True)
+
+def _attach(name, open_block=None):
+    block = _attached.get(name)
+    if block is None:
+        # One job at a time per pool, so earlier jobs' blocks are done with
+        for old in _attached.values():
+            old.close()
+        _attached.clear()
+        block = _attached[name] = (open_block or (lambda: shared_memory.SharedMemory(name=name)))()
+    return block
+
+def _swap_in_place(frame, source_img_path, add_watermark, selection=None):
+    """Swap (and watermark) one frame, writing into the frame itself"""
+    source_face = face_swap_engine.get_source_face(source_img_path)
+    face_swap_engine.swap_face_video_frame(source_face, frame, out=frame, selector=selector_for(selection))
+    if add_watermark:
+        face_swap_engine.add_watermark(frame, "DeepFaceSwap AI", out=frame)
+    return frame
+
+def _swap_slot(name, shape, slot, source_img_path, add_watermark, selection=None):
+    """Swap the frame in one shared memory slot in place"""
+    block = _attach(name)
+    frame_bytes = int(np.prod(shape))
+    frame = np.ndarray(shape, dtype=np.uint8, buffer=block.buf, offset=slot * frame_bytes)
+    _swap_in_place(frame, source_img_path, add_watermark, selection)
+    return slot
+
+def _swap_store_slot(path, capacity, shape, slot, source_img_path, add_watermark, selection=None):
+    """Swap the frame in one FrameStore slot in place"""
+    store = _attach(path, lambda: FrameStore.attach(path, capacity, shape))
+    _swap_in_place(store.slots[slot], source_img_path, add_watermark, selection)
+    return slot
+
+class ParallelFrameSwapper:
+    """Swap the frames of one video across a pool of worker processes
+
+    Each worker loads its own engine, so the Python-side preprocessing,
+    paste-back and cv2 work that ONNX intra-op threads don't cover runs on
+    every core. Frames travel through `multiprocessing.shared_memory` slots,
+    one per frame in flight, instead of being pickled: the caller's frame is
+    copied into a slot, a worker swaps it in place, and results are yielded
+    in input order. Frames decoded into a FrameStore skip the copy: workers
+    swap them in the store's own slots. The pool is created on first use and
+    kept for later jobs.
+
+    Daemonic processes may not start children, so inside one (a Celery
+    prefork child) the frames are swapped in the calling process instead;
+    run Celery with `--pool=solo` or `--pool=threads` to use the workers.
+    """
+
+    def __init__(self, workers=None):
+        self._workers = workers
+        self._pool = None
+        self._warned_daemonic = False
+
+    @property
+    def workers(self):
+        workers = self._workers if self._workers is not None else settings.PARALLEL_FRAME_WORKERS
+        return (os.cpu_count() or 1) if workers < 0 else workers
+
+    def can_start_workers(self):
+        """Whether this process may have children (daemonic ones may not)"""
+        if not multiprocessing.current_process().daemon:
+            return True
+        if not self._warned_daemonic:
+            self._warned_daemonic = True
+            print("Parallel frame workers unavailable in a daemonic process (e.g. Celery prefork); "
+                  "swapping frames serially")
+        return False
+
+    @property
+    def enabled(self):
+        return self.workers > 1 and self.can_start_workers()
+
+    def _get_pool(self):
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context(settings.PARALLEL_FRAME_START_METHOD),
+                initializer=_init_frame_worker
+            )
+        return self._pool
+
+    def batch_size(self, shape):
+        """Frames to keep in flight for a job with frames of `shape`"""
+        initial = self.workers * max(1, settings.PARALLEL_FRAME_SLOTS_PER_WORKER)
+        if not settings.BATCH_AUTOTUNE_ENABLED:
+            return initial
+        return batch_controller.batch_size(shape, initial, floor=self.workers)
+
+    @staticmethod
+    def _close_block(block):
+        block.unlink()
+        try:
+            block.close()
+        except BufferError:
+            # The caller still holds a yielded view; the mapping goes away
+            # when it is collected
+            pass
+
+    def map(self, source_img_path, frames, add_watermark=True, selection=None, stats=None, frame_store=None):
+        """Swap faces in a stream of frames, keeping their order
+
+        Up to a batch of frames is in flight at a time. With
+        BATCH_AUTOTUNE_ENABLED, the batch size comes from the
+        BatchSizeController, which is given the measured throughput every
+        BATCH_TUNING_WINDOW frames and may change it; a larger batch is
+        switched to once the frames in flight are done.
+
+        Args:
+            source_img_path: Path to the source image (each worker loads
+                the face from the engine's cache)
+            frames: Iterable of BGR frames, all the same shape
+            add_watermark: Whether to watermark each frame
+            selection: Target selection options (JSON-serializable, so
+                workers build their own selector)
+            stats: Dict that receives the final "batch_size" and the frames'
+                "resolution_class"
+            frame_store: FrameStore the frames are views of (as yielded by
+                VideoProcessor._iter_frames). Workers swap its slots in
+                place, and the batch is kept two below its capacity so a
+                slot isn't decoded over while in flight.
+
+        Yields:
+            Processed frames in input order. Each is a view of a shared
+            slot that is reused once the next frame is requested, so copy
+            it to keep it.
+        """
+        if not self.can_start_workers():
+            yield from self._map_serial(source_img_path, frames, add_watermark, selection, stats)
+            return
+
+        frames = iter(frames)
+        first = next(frames, None)
+        if first is None:
+            return
+
+        shape = first.shape
+        # Besides the batch, the caller holds one frame and the decoder
+        # reads one ahead
+        max_batch = frame_store.capacity - 2 if frame_store is not None else None
+        batch_size = self.batch_size(shape)
+        if max_batch is not None:
+            batch_size = max(min(batch_size, max_batch), 1)
+        tuning = settings.BATCH_AUTOTUNE_ENABLED
+        block = slots = None
+        if frame_store is None:
+            block = shared_memory.SharedMemory(create=True, size=batch_size * first.nbytes)
+            slots = np.ndarray((batch_size,) + shape, dtype=np.uint8, buffer=block.buf)
+            free = deque(range(batch_size))
+        yielded = None  # Slot of the frame the caller is holding
+        pool = self._get_pool()
+        pending = deque()  # (slot, future) in frame order
+        next_frame = first
+        window_start, window_frames = time.perf_counter(), 0
+        try:
+            while True:
+                if yielded is not None and block is not None:
+                    free.append(yielded)
+                yielded = None
+                growing = block is not None and len(slots) < batch_size
+                if growing and not pending:
+                    # Grown by the controller: a new block, now the old one is idle
+                    growing = False
+                    slots = None
+                    self._close_block(block)
+                    block = shared_memory.SharedMemory(create=True, size=batch_size * first.nbytes)
+                    slots = np.ndarray((batch_size,) + shape, dtype=np.uint8, buffer=block.buf)
+                    free = deque(range(batch_size))
+
+                # Keep the batch full while frames remain
+                while not growing and next_frame is not None and len(pending) < batch_size and \
+                        (block is None or free):
+                    if next_frame.shape != shape:
+                        raise ValueError(f"Frame shape {next_frame.shape} differs from {shape}")
+                    if block is None:
+                        slot = frame_store.slot_of(next_frame)
+                        future = pool.submit(
+                            _swap_store_slot, frame_store.path, frame_store.capacity, shape, slot,
+                            source_img_path, add_watermark, selection
+                        )
+                    else:
+                        slot = free.popleft()
+                        slots[slot] = next_frame
+                        future = pool.submit(
+                            _swap_slot, block.name, shape, slot, source_img_path, add_watermark, selection
+                        )
+                    pending.append((slot, future))
+                    next_frame = next(frames, None)
+                if not pending:
+                    break
+
+                slot, future = pending.popleft()
+                future.result()
+                yielded = slot
+                yield frame_store.slots[slot] if block is None else slots[slot]
+
+                window_frames += 1
+                if tuning and window_frames >= settings.BATCH_TUNING_WINDOW:
+                    batch_size = batch_controller.record(
+                        shape, batch_size, window_frames, time.perf_counter() - window_start
+                    )
+                    if max_batch is not None:
+                        batch_size = max(min(batch_size, max_batch), 1)
+                    window_start, window_frames = time.perf_counter(), 0
+        except BrokenProcessPool:
+            # A worker died; start a fresh pool for the next job
+            self._pool = None
+            raise
+        finally:
+            for _, future in pending:
+                future.cancel()
+            for _, future in pending:
+                if not future.cancelled():
+                    try:
+                        future.result()
+                    except Exception:
+                        pass
+            slots = None
+            if block is not None:
+                self._close_block(block)
+            if stats is not None:
+                stats["batch_size"] = batch_size
+                stats["resolution_class"] = resolution_class(shape)
+
+    @staticmethod
+    def _map_serial(source_img_path, frames, add_watermark, selection, stats=None):
+        """map() in the calling process, through one reused buffer"""
+        buffer = None
+        for frame in frames:
+            if buffer is None or buffer.shape != frame.shape:
+                buffer = np.empty_like(frame)
+                if stats is not None:
+                    stats.update(batch_size=1, resolution_class=resolution_class(frame.shape))
+            np.copyto(buffer, frame)
+            yield _swap_in_place(buffer, source_img_path, add_watermark, selection)
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=True, cancel_futures=True)
+            self._pool = None
+
+# Singleton instance (one pool per job process)
+parallel_swapper = ParallelFrameSwapper()
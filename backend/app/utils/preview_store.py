@@ -0,0 +1,57 @@
+import json
+import redis
+from ..config import settings
+from .progress_store import progress_store
+
+class PreviewStore:
+    """Pending preview renders waiting for the user to confirm
+
+    Keeps the upload paths and probe of each preview in Redis under
+    `preview:<preview_id>`, so the full render can start without
+    re-uploading or re-probing the video.
+    """
+
+    KEY_PREFIX = "preview:"
+
+    def _key(self, preview_id):
+        return f"{self.KEY_PREFIX}{preview_id}"
+
+    def save(self, preview_id, context):
+        """Store a preview's context for PREVIEW_TTL_SECONDS
+
+        Args:
+            preview_id: Preview task ID
+            context: Dict with source_path, target_path and probe
+
+        Returns:
+            True if stored, False on a Redis error
+        """
+        try:
+            progress_store.client.set(
+                self._key(preview_id),
+                json.dumps(context, separators=(",", ":")),
+                ex=settings.PREVIEW_TTL_SECONDS
+            )
+        except redis.RedisError as e:
+            print(f"Error writing preview {preview_id}: {str(e)}")
+            return False
+        return True
+
+    def pop(self, preview_id):
+        """Take a preview's context so it can only be confirmed once
+
+        Returns:
+            Context dict, or None if unknown or expired
+        """
+        try:
+            pipe = progress_store.client.pipeline()
+            pipe.get(self._key(preview_id))
+            pipe.delete(self._key(preview_id))
+            payload, _ = pipe.execute()
+        except redis.RedisError as e:
+            print(f"Error reading preview {preview_id}: {str(e)}")
+            return None
+        return json.loads(payload) if payload else None
+
+# Singleton instance
+preview_store = PreviewStore()
@@ -0,0 +1,191 @@
+import json
+import time
+import asyncio
+import redis
+import redis.asyncio as aioredis
+from ..config import settings
+
+# Task states after which no further updates are published
+TERMINAL_STATUSES = ("completed", "failed")
+
+class ProgressStore:
+    """Redis-backed task progress shared by the API and Celery workers
+
+    Each task has one compact JSON record under `progress:<task_id>` and a
+    pub/sub channel of the same name. Progress writes are throttled so a
+    fast worker doesn't hammer Redis, while status changes always go out.
+    """
+
+    KEY_PREFIX = "progress:"
+
+    def __init__(self):
+        self._client = None
+        self._async_client = None
+        self._local = False
+        # task_id -> (time, progress, status) of the last accepted write
+        self._last_write = {}
+
+    def use_local(self, client):
+        """Switch to an in-process client (local executor, no Redis)
+
+        Args:
+            client: LocalStore in the API process, or a ForwardingClient in
+                its job processes
+        """
+        self._client = client
+        self._local = True
+        self._last_write = {}
+
+    @property
+    def client(self):
+        if self._client is None:
+            self._client = redis.Redis(
+                host=settings.REDIS_HOST,
+                port=settings.REDIS_PORT,
+                db=settings.PROGRESS_REDIS_DB,
+                socket_timeout=5
+            )
+        return self._client
+
+    @property
+    def async_client(self):
+        if self._async_client is None:
+            self._async_client = aioredis.Redis(
+                host=settings.REDIS_HOST,
+                port=settings.REDIS_PORT,
+                db=settings.PROGRESS_REDIS_DB
+            )
+        return self._async_client
+
+    def _key(self, task_id):
+        return f"{self.KEY_PREFIX}{task_id}"
+
+    def _should_write(self, task_id, status, progress):
+        """Throttle progress-only updates by time and progress delta"""
+        last = self._last_write.get(task_id)
+        if last is None or status != last[2] or status in TERMINAL_STATUSES:
+            return True
+
+        last_time, last_progress, _ = last
+        if progress is not None and last_progress is not None:
+            if progress - last_progress >= settings.PROGRESS_MIN_DELTA:
+                return True
+        return time.monotonic() - last_time >= settings.PROGRESS_MIN_INTERVAL
+
+    def update(self, task_id, status, progress=None, **fields):
+        """Write and publish a task progress record
+
+        Args:
+            task_id: Celery task ID
+            status: pending, processing, completed or failed
+            progress: Progress percentage (0-100)
+            **fields: Extra record fields, e.g. result or error
+
+        Returns:
+            True if the record was written, False if throttled or Redis failed
+        """
+        if progress is not None:
+            progress = round(float(progress), 1)
+
+        if not self._should_write(task_id, status, progress):
+            return False
+
+        record = {"status": status, "updated_at": round(time.time(), 3)}
+        if progress is not None:
+            record["progress"] = progress
+        record.update(fields)
+        payload = json.dumps(record, separators=(",", ":"))
+
+        try:
+            pipe = self.client.pipeline(transaction=False)
+            pipe.set(self._key(task_id), payload, ex=settings.PROGRESS_TTL_SECONDS)
+            pipe.publish(self._key(task_id), payload)
+            pipe.execute()
+        except redis.RedisError as e:
+            print(f"Error writing progress for task {task_id}: {str(e)}")
+            return False
+
+        if status in TERMINAL_STATUSES:
+            self._last_write.pop(task_id, None)
+        else:
+            self._last_write[task_id] = (time.monotonic(), progress, status)
+        return True
+
+    def get(self, task_id):
+        """Get the latest progress record for a task
+
+        Returns:
+            Record dict, or None if unknown or Redis is unavailable
+        """
+        try:
+            payload = self.client.get(self._key(task_id))
+        except redis.RedisError as e:
+            print(f"Error reading progress for task {task_id}: {str(e)}")
+            return None
+        return json.loads(payload) if payload else None
+
+    async def subscribe(self, task_id, keepalive=15.0, idle_timeout=None):
+        """Yield progress records for a task as they are published
+
+        The current record (if any) is yielded first. Iteration stops after
+        a terminal record, or once no record has arrived for `idle_timeout`
+        seconds (PROGRESS_TTL_SECONDS by default: the record would have
+        expired, e.g. because the worker died before writing `failed`).
+        None is yielded on idle keepalive intervals.
+        """
+        if idle_timeout is None:
+            idle_timeout = settings.PROGRESS_TTL_SECONDS
+        messages = self._local_messages if self._local else self._redis_messages
+        stream = messages(self._key(task_id), keepalive)
+        last_record = time.monotonic()
+        try:
+            async for payload in stream:
+                if payload is None:
+                    if time.monotonic() - last_record >= idle_timeout:
+                        return
+                    yield None
+                    continue
+                last_record = time.monotonic()
+                record = json.loads(payload)
+                yield record
+                if record.get("status") in TERMINAL_STATUSES:
+                    return
+        finally:
+            # Unsubscribe now rather than when the generator is collected
+            await stream.aclose()
+
+    async def _redis_messages(self, key, keepalive):
+        """Current payload, then published payloads (None on idle)"""
+        pubsub = self.async_client.pubsub()
+        await pubsub.subscribe(key)
+        try:
+            # Read the snapshot after subscribing so no update is missed
+            payload = await self.async_client.get(key)
+            if payload:
+                yield payload
+
+            while True:
+                message = await pubsub.get_message(ignore_subscribe_messages=True, timeout=keepalive)
+                yield message["data"] if message is not None else None
+        finally:
+            await pubsub.unsubscribe(key)
+            await pubsub.aclose()
+
+    async def _local_messages(self, key, keepalive):
+        """Same as _redis_messages, from the in-process store"""
+        queue = self._client.listen(key)
+        try:
+            payload = self._client.get(key)
+            if payload:
+                yield payload
+
+            while True:
+                try:
+                    yield await asyncio.wait_for(queue.get(), keepalive)
+                except asyncio.TimeoutError:
+                    yield None
+        finally:
+            self._client.unlisten(key, queue)
+
+# Singleton instance
+progress_store = ProgressStore()
@@ -0,0 +1,171 @@
+import json
+import asyncio
+import hashlib
+import redis
+from ..config import settings
+from .progress_store import progress_store
+from .storage import storage_manager
+
+class ResultCache:
+    """Content-addressed cache of swap results
+
+    Entries live in Redis under `result_cache:<key>`, where the key hashes
+    the input bytes and the request parameters. An entry is either
+    `pending` (a job is computing it, identified by task_id) or `completed`
+    with the result URLs. Results themselves stay in the storage index, so
+    an entry whose files were expired or evicted counts as a miss.
+    """
+
+    KEY_PREFIX = "result_cache:"
+
+    def _key(self, key):
+        return f"{self.KEY_PREFIX}{key}"
+
+    @staticmethod
+    def hash_file(path, chunk_size=1024 * 1024):
+        """SHA-256 of a file's contents"""
+        digest = hashlib.sha256()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(chunk_size), b""):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    @staticmethod
+    def make_key(kind, input_hashes, params):
+        """Cache key for a job
+
+        Args:
+            kind: Job type, e.g. "face" or "video"
+            input_hashes: Content hashes of the inputs, in order
+            params: Dict of options that change the output
+
+        Returns:
+            Hex digest identifying the result
+        """
+        payload = json.dumps({"kind": kind, "inputs": list(input_hashes), "params": params}, sort_keys=True)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def _artifact_for_url(url):
+        """Stored path behind a /results URL, or None if it is gone"""
+        _, _, name = url.partition("/results/")
+        if name.startswith("hls/"):
+            return storage_manager.resolve_dir("results", name.split("/")[1])
+        if name.startswith("stream/"):
+            name = name[len("stream/"):]
+        return storage_manager.resolve("results", name)
+
+    def result_paths(self, result):
+        """Stored paths of a cached result, or None if any file is missing"""
+        paths = []
+        for field in ("result_url", "download_url", "streaming_url", "playlist_url"):
+            if result.get(field):
+                path = self._artifact_for_url(result[field])
+                if path is None:
+                    return None
+                paths.append(path)
+        return paths or None
+
+    def get(self, key):
+        """Get a usable cache entry
+
+        Returns:
+            Entry dict, or None on a miss (including results evicted from
+            storage and Redis errors)
+        """
+        try:
+            payload = progress_store.client.get(self._key(key))
+        except redis.RedisError as e:
+            print(f"Error reading result cache: {str(e)}")
+            return None
+        return self._usable(payload)
+
+    def _usable(self, payload):
+        """Entry of a stored payload, or None if missing or its result is gone"""
+        if not payload:
+            return None
+        entry = json.loads(payload)
+        if entry["status"] == "completed" and self.result_paths(entry["result"]) is None:
+            return None
+        return entry
+
+    def claim(self, key, task_id, ttl=None, **fields):
+        """Register a job as the one computing a result
+
+        Args:
+            key: Cache key
+            task_id: ID of the job that will compute it
+            ttl: Seconds before an unfinished claim lapses
+            **fields: Extra entry fields returned to coalesced requests
+
+        Returns:
+            (True, None) if claimed, or (False, entry) with the completed
+            or in-flight entry of an identical job
+        """
+        if ttl is None:
+            ttl = settings.RESULT_CACHE_PENDING_SECONDS
+        payload = json.dumps({"status": "pending", "task_id": task_id, **fields}, separators=(",", ":"))
+        cache_key = self._key(key)
+        client = progress_store.client
+        try:
+            for _ in range(3):
+                if client.set(cache_key, payload, nx=True, ex=ttl):
+                    return True, None
+                # Replace a stale entry (result evicted) in a WATCH/MULTI
+                # transaction, so two requests that both saw it can't both
+                # claim: the second one's write fails and it looks again
+                with client.pipeline() as pipe:
+                    try:
+                        pipe.watch(cache_key)
+                        current = pipe.get(cache_key)
+                        if current is None:
+                            continue  # Expired meanwhile: try SET NX again
+                        entry = self._usable(current)
+                        if entry is not None:
+                            return False, entry
+                        pipe.multi()
+                        pipe.set(cache_key, payload, ex=ttl)
+                        pipe.execute()
+                        return True, None
+                    except redis.WatchError:
+                        continue
+        except redis.RedisError as e:
+            print(f"Error claiming result cache entry: {str(e)}")
+        return True, None
+
+    def complete(self, key, task_id, result):
+        """Store a finished result for STORAGE_TTL_HOURS"""
+        payload = json.dumps({"status": "completed", "task_id": task_id, "result": result}, separators=(",", ":"))
+        try:
+            progress_store.client.set(self._key(key), payload, ex=int(settings.STORAGE_TTL_HOURS * 3600))
+        except redis.RedisError as e:
+            print(f"Error writing result cache: {str(e)}")
+
+    def release(self, key, task_id):
+        """Drop a pending claim after its job failed"""
+        try:
+            payload = progress_store.client.get(self._key(key))
+            if payload and json.loads(payload).get("task_id") == task_id:
+                progress_store.client.delete(self._key(key))
+        except redis.RedisError as e:
+            print(f"Error releasing result cache entry: {str(e)}")
+
+    async def wait(self, key, timeout=None, interval=0.1):
+        """Wait for an in-flight identical job to finish
+
+        Returns:
+            The completed entry, or None if it failed or didn't finish in time
+        """
+        if timeout is None:
+            timeout = settings.RESULT_CACHE_WAIT_SECONDS
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        while loop.time() < deadline:
+            entry = await asyncio.to_thread(self.get, key)
+            if entry is None or entry["status"] == "completed":
+                return entry
+            await asyncio.sleep(interval)
+        return None
+
+# Singleton instance
+result_cache = ResultCache()
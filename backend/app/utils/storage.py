@@ -0,0 +1,326 @@
+import os
+import time
+import hashlib
+import shutil
+import sqlite3
+import threading
+from contextlib import contextmanager
+from ..config import settings
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS artifacts (
+    path TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    created_at REAL NOT NULL,
+    last_access REAL NOT NULL,
+    expires_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS artifacts_expires ON artifacts (expires_at);
+CREATE INDEX IF NOT EXISTS artifacts_created ON artifacts (created_at);
+CREATE INDEX IF NOT EXISTS artifacts_access ON artifacts (last_access);
+
+-- Running byte total so quota checks never scan the table
+CREATE TABLE IF NOT EXISTS totals (id INTEGER PRIMARY KEY CHECK (id = 0), bytes INTEGER NOT NULL);
+INSERT OR IGNORE INTO totals (id, bytes) VALUES (0, 0);
+CREATE TRIGGER IF NOT EXISTS artifacts_insert AFTER INSERT ON artifacts
+    BEGIN UPDATE totals SET bytes = bytes + NEW.size WHERE id = 0; END;
+CREATE TRIGGER IF NOT EXISTS artifacts_delete AFTER DELETE ON artifacts
+    BEGIN UPDATE totals SET bytes = bytes - OLD.size WHERE id = 0; END;
+CREATE TRIGGER IF NOT EXISTS artifacts_update AFTER UPDATE OF size ON artifacts
+    BEGIN UPDATE totals SET bytes = bytes - OLD.size + NEW.size WHERE id = 0; END;
+
+-- Files of queued or running jobs, exempt from quota eviction
+CREATE TABLE IF NOT EXISTS pins (path TEXT PRIMARY KEY, count INTEGER NOT NULL, pinned_at REAL NOT NULL);
+"""
+
+class StorageManager:
+    """Sharded file storage for uploads and results with an expiry index
+
+    Files live in `<base>/<2 hex chars>/<name>` so no directory grows
+    without bound. Every artifact is recorded in a SQLite index with its
+    size, last access and expiry, so cleanup only touches the rows it
+    deletes instead of listing and stat-ing every stored file.
+    """
+
+    def __init__(self, index_path=None):
+        self.index_path = index_path or settings.STORAGE_INDEX_PATH
+        self.base_dirs = {
+            "uploads": settings.UPLOAD_DIR,
+            "results": settings.RESULTS_DIR,
+        }
+        self._local = threading.local()
+        self._schema_ready = False
+
+    @contextmanager
+    def _connect(self):
+        """Per-thread connection to the index (WAL allows concurrent readers)"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None or getattr(self._local, "pid", None) != os.getpid():
+            conn = sqlite3.connect(self.index_path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            if not self._schema_ready:
+                conn.executescript(SCHEMA)
+                self._schema_ready = True
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        yield conn
+
+    def path_for(self, kind, filename):
+        """Get the sharded path for a new artifact, creating its directory
+
+        Args:
+            kind: "uploads" or "results"
+            filename: File name (must be unique within the kind)
+
+        Returns:
+            Absolute path to write the file to
+        """
+        shard = hashlib.sha1(filename.encode("utf-8")).hexdigest()[:2]
+        directory = os.path.join(self.base_dirs[kind], shard)
+        os.makedirs(directory, exist_ok=True)
+        return os.path.join(directory, filename)
+
+    def resolve(self, kind, filename):
+        """Find a stored artifact by name
+
+        Returns:
+            Path of the file, or None if it doesn't exist
+        """
+        filename = os.path.basename(filename)
+        shard = hashlib.sha1(filename.encode("utf-8")).hexdigest()[:2]
+        for path in (
+            os.path.join(self.base_dirs[kind], shard, filename),
+            os.path.join(self.base_dirs[kind], filename),  # Pre-sharding layout
+        ):
+            if os.path.isfile(path):
+                return path
+        return None
+
+    def resolve_dir(self, kind, name):
+        """Find a stored directory artifact (e.g. HLS output) by name
+
+        Returns:
+            Path of the directory, or None if it doesn't exist
+        """
+        name = os.path.basename(name)
+        shard = hashlib.sha1(name.encode("utf-8")).hexdigest()[:2]
+        path = os.path.join(self.base_dirs[kind], shard, name)
+        return path if os.path.isdir(path) else None
+
+    @staticmethod
+    def _artifact_size(path):
+        """Size of a file, or of all files under a directory"""
+        if not os.path.isdir(path):
+            return os.path.getsize(path)
+        total = 0
+        for root, _, files in os.walk(path):
+            for filename in files:
+                try:
+                    total += os.path.getsize(os.path.join(root, filename))
+                except OSError:
+                    pass
+        return total
+
+    def register(self, path, kind, ttl_hours=None):
+        """Record a written artifact in the expiry index
+
+        Args:
+            path: Path of the written file or directory
+            kind: "uploads" or "results"
+            ttl_hours: Hours until the file expires (default STORAGE_TTL_HOURS)
+        """
+        if ttl_hours is None:
+            ttl_hours = settings.STORAGE_TTL_HOURS
+        try:
+            size = self._artifact_size(path)
+        except OSError:
+            return
+
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT INTO artifacts (path, kind, size, created_at, last_access, expires_at) "
+                "VALUES (?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT(path) DO UPDATE SET size = excluded.size, "
+                "last_access = excluded.last_access, expires_at = excluded.expires_at",
+                (os.path.abspath(path), kind, size, now, now, now + ttl_hours * 3600)
+            )
+            over_quota = settings.STORAGE_QUOTA_BYTES and \
+                conn.execute("SELECT bytes FROM totals WHERE id = 0").fetchone()[0] > settings.STORAGE_QUOTA_BYTES
+
+        # Evict right away instead of letting the disk fill until the next sweep
+        if over_quota:
+            self.enforce_quota()
+
+    def touch(self, path):
+        """Mark an artifact as recently used for LRU eviction"""
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE artifacts SET last_access = ? WHERE path = ?",
+                (time.time(), os.path.abspath(path))
+            )
+
+    def pin(self, *paths):
+        """Protect files from quota eviction until unpinned
+
+        Pins are counted, so files shared by several jobs (a preview and
+        its confirmed render) stay pinned until every job unpins them.
+        A pin lapses after STORAGE_TTL_HOURS so a lost job can't hold its
+        files forever.
+        """
+        now = time.time()
+        with self._connect() as conn:
+            for path in paths:
+                conn.execute(
+                    "INSERT INTO pins (path, count, pinned_at) VALUES (?, 1, ?) "
+                    "ON CONFLICT(path) DO UPDATE SET count = count + 1, pinned_at = excluded.pinned_at",
+                    (os.path.abspath(path), now)
+                )
+
+    def unpin(self, *paths):
+        """Release pins taken with pin()"""
+        with self._connect() as conn:
+            for path in paths:
+                path = os.path.abspath(path)
+                conn.execute("UPDATE pins SET count = count - 1 WHERE path = ?", (path,))
+                conn.execute("DELETE FROM pins WHERE path = ? AND count <= 0", (path,))
+
+    def total_bytes(self):
+        """Total size of all indexed artifacts"""
+        with self._connect() as conn:
+            return conn.execute("SELECT bytes FROM totals WHERE id = 0").fetchone()[0]
+
+    def _delete(self, conn, paths):
+        """Remove files and their index rows"""
+        for path in paths:
+            try:
+                if os.path.isdir(path):
+                    shutil.rmtree(path)
+                else:
+                    os.remove(path)
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                # Drop the row anyway so one bad file can't stall cleanup
+                print(f"Error removing stored file {path}: {str(e)}")
+            conn.execute("DELETE FROM artifacts WHERE path = ?", (path,))
+            conn.execute("DELETE FROM pins WHERE path = ?", (path,))
+        return len(paths)
+
+    def evict_expired(self, max_age_hours=None, batch_size=500):
+        """Delete artifacts past their expiry (or older than max_age_hours)
+
+        Returns:
+            Number of files deleted
+        """
+        now = time.time()
+        created_before = now - max_age_hours * 3600 if max_age_hours is not None else 0
+        deleted = 0
+        with self._connect() as conn:
+            while True:
+                rows = conn.execute(
+                    "SELECT path FROM artifacts WHERE expires_at <= ? "
+                    "UNION SELECT path FROM artifacts WHERE created_at <= ? LIMIT ?",
+                    (now, created_before, batch_size)
+                ).fetchall()
+                if not rows:
+                    break
+                deleted += self._delete(conn, [row[0] for row in rows])
+        return deleted
+
+    def enforce_quota(self, quota_bytes=None, batch_size=100):
+        """Delete least recently used artifacts until under the quota
+
+        Artifacts used within STORAGE_MIN_RESIDENCY_SECONDS and files pinned
+        by queued or running jobs are never evicted, so a burst of uploads
+        can't delete the inputs of a job waiting in the queue.
+
+        Returns:
+            Number of files deleted
+        """
+        if quota_bytes is None:
+            quota_bytes = settings.STORAGE_QUOTA_BYTES
+        if not quota_bytes:
+            return 0
+
+        now = time.time()
+        protected_after = now - settings.STORAGE_MIN_RESIDENCY_SECONDS
+        pinned_after = now - settings.STORAGE_TTL_HOURS * 3600
+        deleted = 0
+        with self._connect() as conn:
+            conn.execute("DELETE FROM pins WHERE pinned_at <= ?", (pinned_after,))
+            excess = conn.execute("SELECT bytes FROM totals WHERE id = 0").fetchone()[0] - quota_bytes
+            while excess > 0:
+                rows = conn.execute(
+                    "SELECT path, size FROM artifacts WHERE last_access < ? "
+                    "AND path NOT IN (SELECT path FROM pins) ORDER BY last_access LIMIT ?",
+                    (protected_after, batch_size)
+                ).fetchall()
+                if not rows:
+                    break
+                victims = []
+                for path, size in rows:
+                    if excess <= 0:
+                        break
+                    victims.append(path)
+                    excess -= size
+                deleted += self._delete(conn, victims)
+        return deleted
+
+    def cleanup(self, max_age_hours=None):
+        """Run TTL expiry and quota eviction
+
+        Returns:
+            Dict with the number of expired and evicted files
+        """
+        return {
+            "expired": self.evict_expired(max_age_hours),
+            "evicted": self.enforce_quota()
+        }
+
+    def reindex(self):
+        """Index files already on disk (e.g. from before the index existed)
+
+        Walks both storage directories once; existing files keep their
+        modification time as creation and access time. Directories inside
+        a shard (HLS output) are indexed as one artifact.
+
+        Returns:
+            Number of artifacts indexed
+        """
+        indexed = 0
+        ttl_seconds = settings.STORAGE_TTL_HOURS * 3600
+        with self._connect() as conn:
+            for kind, base_dir in self.base_dirs.items():
+                if not os.path.isdir(base_dir):
+                    continue
+                # Flat files from before sharding, then each shard's entries
+                entries = [entry for entry in os.scandir(base_dir) if entry.is_file()]
+                for shard in os.scandir(base_dir):
+                    if shard.is_dir():
+                        entries.extend(os.scandir(shard.path))
+
+                for entry in entries:
+                    if entry.name.startswith(".storage_index"):
+                        continue
+                    path = os.path.abspath(entry.path)
+                    try:
+                        mtime = entry.stat().st_mtime
+                        size = self._artifact_size(path)
+                    except OSError:
+                        continue
+                    conn.execute(
+                        "INSERT OR IGNORE INTO artifacts (path, kind, size, created_at, last_access, expires_at) "
+                        "VALUES (?, ?, ?, ?, ?, ?)",
+                        (path, kind, size, mtime, mtime, mtime + ttl_seconds)
+                    )
+                    indexed += 1
+        return indexed
+
+# Singleton instance
+storage_manager = StorageManager()
+
+if __name__ == "__main__":
+    print(f"Indexed {storage_manager.reindex()} files")
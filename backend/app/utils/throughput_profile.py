@@ -0,0 +1,155 @@
+import os
+import json
+import time
+import socket
+import tempfile
+import cv2
+import numpy as np
+from insightface.app.common import Face
+from ..config import settings
+
+# Conservative CPU figures used until a host has been calibrated
+DEFAULT_PROFILE = {
+    "detect_ms_per_mp": 120.0,  # Detection per frame megapixel
+    "swap_ms_per_face": 60.0,  # Swap and paste-back per face
+    "encode_ms_per_mp": 15.0,  # One video encode pass per frame megapixel
+    "encode_passes": 3,  # OpenCV write, H.264 conversion, streaming copy
+    "calibrated": False
+}
+
+class ThroughputProfile:
+    """Per-host processing speed used to estimate video job runtimes"""
+
+    def __init__(self, path=None):
+        self.path = path or settings.THROUGHPUT_PROFILE_PATH
+        self._profile = None
+        self._mtime = None
+
+    def load(self):
+        """Get the host profile, reloading it if the file has changed"""
+        try:
+            mtime = os.path.getmtime(self.path)
+        except OSError:
+            return dict(DEFAULT_PROFILE)
+
+        if self._profile is None or mtime != self._mtime:
+            try:
+                with open(self.path) as f:
+                    self._profile = {**DEFAULT_PROFILE, **json.load(f)}
+                self._mtime = mtime
+            except (OSError, ValueError) as e:
+                print(f"Error reading throughput profile {self.path}: {str(e)}")
+                return dict(DEFAULT_PROFILE)
+        return self._profile
+
+    def save(self, profile):
+        """Atomically write a calibrated profile"""
+        directory = os.path.dirname(self.path) or "."
+        fd, temp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        with os.fdopen(fd, "w") as f:
+            json.dump(profile, f, indent=2)
+        os.replace(temp_path, self.path)
+        self._profile = None
+
+    def estimate_seconds(self, probe):
+        """Estimate processing time for a probed video on this host
+
+        Args:
+            probe: Dict from VideoProbe.probe
+
+        Returns:
+            Estimated processing time in seconds
+        """
+        profile = self.load()
+        megapixels = probe["width"] * probe["height"] / 1e6
+        per_frame_ms = (
+            profile["detect_ms_per_mp"] * megapixels
+            + profile["swap_ms_per_face"] * probe["avg_faces"]
+            + profile["encode_ms_per_mp"] * megapixels * profile["encode_passes"]
+        )
+        return probe["frame_count"] * per_frame_ms / 1000
+
+    def calibrate(self, iterations=10, width=1280, height=720):
+        """Benchmark detection, swapping and encoding on this host
+
+        Runs the loaded engines on a synthetic frame and saves the measured
+        per-megapixel and per-face costs.
+
+        Returns:
+            The saved profile dict
+        """
+        from ..models.face_detection import face_detector
+        from ..models.face_swap import face_swap_engine
+        from .face_hints import KPS_BBOX_TEMPLATE
+
+        rng = np.random.default_rng(0)
+        frame = rng.integers(0, 255, (height, width, 3), dtype=np.uint8)
+        megapixels = width * height / 1e6
+        profile = dict(DEFAULT_PROFILE)
+
+        # Detection cost per megapixel
+        face_detector.get_faces(frame, tiled=False)  # Warm-up
+        start = time.perf_counter()
+        for _ in range(iterations):
+            face_detector.get_faces(frame, tiled=False)
+        profile["detect_ms_per_mp"] = (time.perf_counter() - start) * 1000 / iterations / megapixels
+
+        # Swap cost per face, using a synthetic face in the middle of the frame
+        face_swap_engine.ensure_initialized()
+        if face_swap_engine.model_initialized:
+            bbox = np.array([width * 0.35, height * 0.2, width * 0.65, height * 0.8], dtype=np.float32)
+            size = bbox[2:] - bbox[:2]
+            target_face = Face(bbox=bbox, kps=bbox[:2] + KPS_BBOX_TEMPLATE * size, det_score=1.0)
+            source_face = Face(embedding=rng.standard_normal(512).astype(np.float32))
+            face_swap_engine.swap_face_video_frame(source_face, frame, target_faces=[target_face])
+            start = time.perf_counter()
+            for _ in range(iterations):
+                face_swap_engine.swap_face_video_frame(source_face, frame, target_faces=[target_face])
+            profile["swap_ms_per_face"] = (time.perf_counter() - start) * 1000 / iterations
+
+        # Encode cost per megapixel
+        with tempfile.TemporaryDirectory() as temp_dir:
+            out = cv2.VideoWriter(os.path.join(temp_dir, "calibrate.mp4"), cv2.VideoWriter_fourcc(*'mp4v'), 30, (width, height))
+            start = time.perf_counter()
+            for _ in range(iterations * 3):
+                out.write(frame)
+            out.release()
+            profile["encode_ms_per_mp"] = (time.perf_counter() - start) * 1000 / (iterations * 3) / megapixels
+
+        profile.update({
+            "calibrated": True,
+            "calibrated_at": time.time(),
+            "host": socket.gethostname()
+        })
+        self.save(profile)
+        return profile
+
+    def ensure_calibrated(self):
+        """Calibrate once per host if no profile has been saved yet"""
+        if os.path.exists(self.path):
+            return
+        # O_EXCL lock so concurrent worker processes don't all benchmark
+        lock_path = self.path + ".lock"
+        try:
+            if time.time() - os.path.getmtime(lock_path) > 600:
+                os.remove(lock_path)  # Left behind by a crashed calibration
+        except OSError:
+            pass
+        try:
+            fd = os.open(lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+        except FileExistsError:
+            return
+        try:
+            os.close(fd)
+            profile = self.calibrate()
+            print(f"✓ Throughput profile calibrated: {profile}")
+        except Exception as e:
+            print(f"Error calibrating throughput profile: {str(e)}")
+        finally:
+            os.remove(lock_path)
+
+# Singleton instance
+throughput_profile = ThroughputProfile()
+
+if __name__ == "__main__":
+    print(json.dumps(throughput_profile.calibrate(), indent=2))
@@ -0,0 +1,113 @@
+import os
+import json
+import hashlib
+import aiofiles
+from fastapi import HTTPException
+from starlette.types import ASGIApp, Receive, Scope, Send
+from ..config import settings
+
+class UploadTooLargeError(ValueError):
+    """An upload exceeded its size limit"""
+
+async def save_upload(upload, path, max_bytes=None, chunk_size=None):
+    """Stream an uploaded file to disk in fixed-size chunks
+
+    The file is hashed while it is copied and the copy stops as soon as it
+    passes `max_bytes`, so memory stays at one chunk regardless of size and
+    the event loop is never blocked on disk writes.
+
+    Args:
+        upload: FastAPI UploadFile
+        path: Destination path
+        max_bytes: Size limit in bytes (None for no limit)
+        chunk_size: Bytes per read/write (default UPLOAD_CHUNK_BYTES)
+
+    Returns:
+        (size in bytes, SHA-256 hex digest)
+
+    Raises:
+        UploadTooLargeError: The upload is larger than max_bytes (the
+            partial file is removed)
+    """
+    chunk_size = chunk_size or settings.UPLOAD_CHUNK_BYTES
+    digest = hashlib.sha256()
+    size = 0
+    try:
+        async with aiofiles.open(path, "wb") as f:
+            while True:
+                chunk = await upload.read(chunk_size)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if max_bytes is not None and size > max_bytes:
+                    raise UploadTooLargeError(
+                        f"{upload.filename or 'Upload'} exceeds the {max_bytes // (1024 * 1024)} MiB limit"
+                    )
+                digest.update(chunk)
+                await f.write(chunk)
+    except BaseException:
+        if os.path.exists(path):
+            os.remove(path)
+        raise
+    return size, digest.hexdigest()
+
+class RequestSizeLimitMiddleware:
+    """Reject request bodies over a size limit while they are received
+
+    Requests declaring a larger Content-Length get 413 before any body is
+    read; chunked bodies are counted as they arrive and cut off at the
+    limit, so an oversized upload is never spooled to disk in full.
+    """
+
+    def __init__(self, app: ASGIApp, max_bytes=None):
+        self.app = app
+        self.max_bytes = max_bytes if max_bytes is not None else settings.MAX_REQUEST_BYTES
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not self.max_bytes:
+            await self.app(scope, receive, send)
+            return
+
+        content_length = dict(scope["headers"]).get(b"content-length")
+        if content_length is not None and content_length.isdigit() and int(content_length) > self.max_bytes:
+            await self._reject(send)
+            return
+
+        received = 0
+        response_started = False
+
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.max_bytes:
+                    # HTTPException passes through FastAPI's body parsing as-is
+                    raise HTTPException(status_code=413, detail="Request body too large")
+            return message
+
+        async def tracking_send(message):
+            nonlocal response_started
+            if message["type"] == "http.response.start":
+                response_started = True
+            await send(message)
+
+        try:
+            await self.app(scope, limited_receive, tracking_send)
+        except HTTPException as e:
+            if e.status_code != 413 or response_started:
+                raise
+            await self._reject(send)
+
+    async def _reject(self, send):
+        body = json.dumps({"detail": "Request body too large"}).encode("utf-8")
+        await send({
+            "type": "http.response.start",
+            "status": 413,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode("latin-1")),
+                (b"connection", b"close"),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
@@ -0,0 +1,123 @@
+import cv2
+import ffmpeg
+import numpy as np
+from ..config import settings
+from ..models.face_detection import face_detector
+
+def _parse_rate(rate):
+    """Parse an ffprobe frame rate such as '30000/1001'"""
+    try:
+        num, _, den = str(rate).partition('/')
+        value = float(num) / float(den or 1)
+        return value if value > 0 else None
+    except (ValueError, ZeroDivisionError):
+        return None
+
+class VideoProbe:
+    """Cheap inspection of an uploaded video before it is queued"""
+
+    @staticmethod
+    def read_metadata(video_path):
+        """Read container metadata without decoding frames
+
+        Uses ffprobe (header parsing only) and falls back to OpenCV's
+        capture properties when ffprobe isn't available.
+
+        Args:
+            video_path: Path to the uploaded video
+
+        Returns:
+            Dict with frame_count, fps, width, height, duration, codec and container
+        """
+        try:
+            info = ffmpeg.probe(video_path)
+            stream = next(s for s in info["streams"] if s.get("codec_type") == "video")
+            container = info.get("format", {})
+
+            fps = _parse_rate(stream.get("avg_frame_rate")) or _parse_rate(stream.get("r_frame_rate")) or 30.0
+            duration = float(stream.get("duration") or container.get("duration") or 0.0)
+            frame_count = int(stream.get("nb_frames") or 0) or int(round(duration * fps))
+
+            return {
+                "frame_count": frame_count,
+                "fps": fps,
+                "width": int(stream["width"]),
+                "height": int(stream["height"]),
+                "duration": duration or (frame_count / fps),
+                "codec": stream.get("codec_name"),
+                "container": container.get("format_name"),
+                "bit_rate": int(container["bit_rate"]) if container.get("bit_rate") else None
+            }
+        except StopIteration:
+            raise ValueError(f"No video stream in {video_path}")
+        except (ffmpeg.Error, FileNotFoundError, KeyError, ValueError) as e:
+            print(f"ffprobe unavailable for {video_path}, using OpenCV: {str(e)}")
+
+        cap = cv2.VideoCapture(video_path)
+        if not cap.isOpened():
+            raise ValueError(f"Could not open video file {video_path}")
+        try:
+            fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
+            frame_count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+            fourcc = int(cap.get(cv2.CAP_PROP_FOURCC))
+            return {
+                "frame_count": frame_count,
+                "fps": fps,
+                "width": int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)),
+                "height": int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)),
+                "duration": frame_count / fps if fps else 0.0,
+                "codec": "".join(chr((fourcc >> 8 * i) & 0xFF) for i in range(4)).strip() or None,
+                "container": None,
+                "bit_rate": None
+            }
+        finally:
+            cap.release()
+
+    @staticmethod
+    def sample_face_density(video_path, frame_count, face_samples=None):
+        """Average face count over a few evenly spaced frames
+
+        Args:
+            video_path: Path to the uploaded video
+            frame_count: Number of frames in the video
+            face_samples: Number of frames to run detection on
+
+        Returns:
+            Average faces per sampled frame (1.0 if nothing could be sampled)
+        """
+        if face_samples is None:
+            face_samples = settings.ROUTING_FACE_SAMPLES
+        if face_samples <= 0 or frame_count <= 0:
+            return 1.0
+
+        face_counts = []
+        cap = cv2.VideoCapture(video_path)
+        try:
+            indices = np.linspace(0, frame_count - 1, num=min(face_samples, frame_count), dtype=int)
+            for index in indices:
+                cap.set(cv2.CAP_PROP_POS_FRAMES, int(index))
+                ret, frame = cap.read()
+                if ret:
+                    face_counts.append(len(face_detector.get_faces(frame, tiled=False)))
+        finally:
+            cap.release()
+
+        return float(np.mean(face_counts)) if face_counts else 1.0
+
+    @staticmethod
+    def probe(video_path, face_samples=None):
+        """Read video metadata and estimate face density
+
+        Args:
+            video_path: Path to the uploaded video
+            face_samples: Number of evenly spaced frames to run detection on
+
+        Returns:
+            Metadata dict from read_metadata plus avg_faces
+        """
+        probe = VideoProbe.read_metadata(video_path)
+        probe["avg_faces"] = VideoProbe.sample_face_density(video_path, probe["frame_count"], face_samples)
+        return probe
+
+# Singleton instance
+video_probe = VideoProbe()
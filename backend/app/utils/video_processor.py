@@ -3,9 +3,22 @@ import cv2
 import numpy as np
 import ffmpeg
 import uuid
+import time
+import itertools
 import tempfile
 from ..config import settings
 from ..models.face_swap import face_swap_engine
+from ..models.face_gallery import selector_for
+from ..models.adaptive_detection import FaceSizeTracker
+from .storage import storage_manager
+from .hls_writer import HLSWriter
+from .checkpoints import JobCheckpoint
+from .frame_store import FrameStore
+from .parallel_frames import parallel_swapper
+from .batch_tuning import resolution_class
+from .buffer_pool import frame_buffers
+from .frame_reuse import FrameChangeDetector, NEW_FRAME, STATIC_FRAME, DUPLICATE_FRAME
+from .keyframes import KeyframeInterpolator, face_psnr
 
 class VideoProcessor:
     """Utility class for video processing operations"""
@@ -69,7 +82,7 @@ class VideoProcessor:
         # Generate output path if not specified
         if not output_path:
             output_filename = f"deepfake_{uuid.uuid4()}.mp4"
-            output_path = os.path.join(settings.RESULTS_DIR, output_filename)
+            output_path = storage_manager.path_for("results", output_filename)
 
         # Get frame dimensions from the first frame
         height, width = frames[0].shape[:2]
@@ -106,43 +119,506 @@ class VideoProcessor:
         return output_path
 
     @staticmethod
-    def process_video(source_img_path, target_video_path, progress_callback=None):
+    def process_video(source_img_path, target_video_path, progress_callback=None, checkpoint=None,
+                      selection=None, stats=None, keyframe_interval=1):
         """Process a video by swapping faces in all frames
 
+        Frames are processed in segments of CHECKPOINT_SEGMENT_FRAMES that
+        are written to the checkpoint as they finish, so only one segment is
+        held in memory and a resumed job skips completed segments. With
+        FRAME_STORE_ENABLED, frames are decoded into a memory-mapped
+        FrameStore with room for the frames in flight, whose slots the
+        parallel frame workers swap in place.
+
         Args:
             source_img_path: Path to the source image (face to use)
             target_video_path: Path to the target video
             progress_callback: Function to report progress (0-100%)
+            checkpoint: JobCheckpoint to resume from and record into
+                (a temporary one is used if omitted)
+            selection: Target selection options (see TargetSelector.from_options)
+            stats: Dict that receives frame reuse counts (see _swap_frames)
+                for the segments processed by this call
+            keyframe_interval: Fast mode when above 1 (see _swap_frames);
+                each segment starts with a keyframe
 
         Returns:
             Path to the processed video
         """
-        # Extract frames from the target video
-        frames, fps = VideoProcessor.extract_frames(target_video_path)
-        total_frames = len(frames)
+        cap = cv2.VideoCapture(target_video_path)
+        if not cap.isOpened():
+            raise ValueError(f"Could not open video file {target_video_path}")
+
+        fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
+        total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+        height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+        segment_frames = settings.CHECKPOINT_SEGMENT_FRAMES
+
+        own_checkpoint = checkpoint is None
+        if own_checkpoint:
+            checkpoint = JobCheckpoint(uuid.uuid4().hex)
+        completed = checkpoint.load({
+            "fps": fps, "width": width, "height": height,
+            "frame_count": total_frames, "segment_frames": segment_frames
+        })
+        if completed:
+            print(f"Resuming {target_video_path} with {len(completed)} completed segments")
 
         # Process the frames in batches for better memory management
         batch_size = settings.BATCH_SIZE
-        processed_frames = []
+        source_face = None
+        segment_paths = []
+        position = 0
+
+        def report_progress(segment_done):
+            if progress_callback and total_frames > 0:
+                progress_callback(min(100, (position + segment_done) / total_frames * 100))
+
+        frame_store = None
+        if settings.FRAME_STORE_ENABLED and width > 0 and height > 0:
+            # The frames in flight, one held by the caller and one decoding
+            in_flight = 1
+            if parallel_swapper.enabled and keyframe_interval <= 1:
+                in_flight = parallel_swapper.batch_size((height, width, 3))
+            frame_store = FrameStore.for_video(width, height, capacity=in_flight + 2)
 
-        # Process each batch
-        for i in range(0, total_frames, batch_size):
-            batch = frames[i:i + batch_size]
+        try:
+            index = 0
+            while True:
+                if index in completed:
+                    # Decode past the segment without swapping; grab() stays
+                    # frame-accurate where seeking may not for some codecs
+                    skipped = 0
+                    while skipped < segment_frames and cap.grab():
+                        skipped += 1
+                    if skipped == 0:
+                        break
+                    position += skipped
+                    segment_paths.append(checkpoint.segment_path(index))
+                    report_progress(0)
+                else:
+                    if source_face is None:
+                        source_face = face_swap_engine.get_source_face(source_img_path)
+                    written = VideoProcessor._process_segment(
+                        cap, source_face, checkpoint.segment_path(index), segment_frames,
+                        batch_size, fps, (width, height), report_progress, frame_store, source_img_path,
+                        selection, stats, keyframe_interval
+                    )
+                    if written == 0:
+                        break
+                    checkpoint.mark_segment_done(index)
+                    position += written
+                    segment_paths.append(checkpoint.segment_path(index))
+                index += 1
+        finally:
+            cap.release()
+            if frame_store is not None:
+                frame_store.close()
+
+        if not segment_paths:
+            raise ValueError(f"No frames could be read from {target_video_path}")
+
+        output_path = storage_manager.path_for("results", f"deepfake_{uuid.uuid4()}.mp4")
+        VideoProcessor.concat_segments(segment_paths, output_path, fps)
+        if own_checkpoint:
+            checkpoint.discard()
 
-            # Process batch
-            processed_batch = face_swap_engine.batch_process_video(source_img_path, batch)
-            processed_frames.extend(processed_batch)
+        return output_path
 
-            # Report progress
-            if progress_callback:
-                progress = min(100, (i + len(batch)) / total_frames * 100)
-                progress_callback(progress)
+    @staticmethod
+    def _process_segment(cap, source_face, segment_path, segment_frames, batch_size, fps, size,
+                         progress_callback=None, frame_store=None, source_img_path=None, selection=None,
+                         stats=None, keyframe_interval=1):
+        """Swap and watermark the next segment of frames into its own file
+
+        Args:
+            frame_store: FrameStore to decode into (frames are read from
+                its slots without copying and released once swapped)
+            source_img_path: Source image path, for the parallel frame
+                workers (see _swap_frames)
+            selection: Target selection options
+            stats: Frame reuse counts to add to (see _swap_frames)
+            keyframe_interval: Fast mode keyframe interval (see _swap_frames)
+
+        Returns:
+            Number of frames written (0 at the end of the video)
+        """
+        # Written under a temporary name so a crash never leaves a partial segment
+        temp_path = segment_path.replace(".mp4", ".tmp.mp4")
+        out = None
+        written = 0
+        frames = VideoProcessor._iter_frames(cap, segment_frames, frame_store)
+        frames = VideoProcessor._swap_frames(
+            source_face, frames, source_img_path, selection=selection, stats=stats, keyframe_interval=keyframe_interval,
+            frame_store=frame_store
+        )
+        for frame in frames:
+            if out is None:
+                out = cv2.VideoWriter(temp_path, cv2.VideoWriter_fourcc(*'mp4v'), fps, size)
+            out.write(frame)
+            written += 1
+            if progress_callback and written % batch_size == 0:
+                progress_callback(written)
+
+        if out is not None:
+            out.release()
+            os.replace(temp_path, segment_path)
+            if progress_callback and written % batch_size:
+                progress_callback(written)
+        return written
+
+    @staticmethod
+    def _iter_frames(cap, count=None, frame_store=None):
+        """Decode up to `count` frames (all remaining frames if None)
+
+        With a frame store the frames are decoded into its slots, and each
+        slot is released once the consumer asks for the next frame. Without
+        one, every frame is decoded into the same array, which is reused as
+        soon as the consumer asks for the next frame.
+        """
+        frame = None
+        for _ in (range(count) if count is not None else itertools.count()):
+            if frame_store is None:
+                ret, frame = cap.read(frame)
+                if not ret:
+                    return
+                yield frame
+            else:
+                index = frame_store.read_from(cap)
+                if index is None:
+                    return
+                yield frame_store.get(index)
+                frame_store.release(index)
 
-        # Reconstruct video from processed frames
-        output_path = VideoProcessor.reconstruct_video(processed_frames, fps=fps)
+    @staticmethod
+    def _swap_frames(source_face, frames, source_img_path=None, add_watermark=True, selection=None, stats=None,
+                     keyframe_interval=1, frame_store=None):
+        """Swap (and watermark) a stream of frames, in order
+
+        With PARALLEL_FRAME_WORKERS set and a source image path, frames are
+        processed by the parallel frame workers through shared memory;
+        otherwise they are processed one by one in this process, into a
+        pooled buffer that is reused for the next frame (so each yielded
+        frame must be consumed before asking for the next). `selection`
+        picks the target faces (see TargetSelector.from_options).
+
+        With FRAME_REUSE_ENABLED, the serial path skips work on unchanged
+        frames (see FrameChangeDetector): duplicates reuse the previous
+        output and static frames reuse the previous detection (except fast
+        mode keyframes, which always detect). With ADAPTIVE_DETECTION_ENABLED,
+        it detects at an input size that follows the face sizes of the video
+        (see FaceSizeTracker).
 
+        Args:
+            stats: Dict whose "frames", "duplicate_frames" and
+                "reused_detections" counts are increased (plus keyframe
+                counters in fast mode, see keyframes.frame_stats_report);
+                also receives the frames' "resolution_class" and the
+                "batch_size" used (frames in flight, 1 when serial)
+            keyframe_interval: Fast mode when above 1: only every Nth frame
+                is swapped in full, and the frames in between get the
+                keyframe's swapped faces moved along the tracked face
+                motion (see KeyframeInterpolator). Always serial.
+            frame_store: FrameStore the frames were decoded into, whose
+                slots the parallel frame workers then swap in place
+        """
+        if stats is None:
+            stats = {}
+        for key in ("frames", "duplicate_frames", "reused_detections"):
+            stats.setdefault(key, 0)
+        interpolator = None
+        if keyframe_interval and keyframe_interval > 1:
+            interpolator = KeyframeInterpolator()
+            for key in ("keyframes", "interpolated_frames", "psnr_samples"):
+                stats.setdefault(key, 0)
+            for key in ("keyframe_seconds", "interpolated_seconds", "psnr_sum"):
+                stats.setdefault(key, 0.0)
+
+        if source_img_path is not None and parallel_swapper.enabled and interpolator is None:
+            for frame in parallel_swapper.map(source_img_path, frames, add_watermark, selection, stats, frame_store):
+                stats["frames"] += 1
+                yield frame
+            return
+
+        selector = selector_for(selection)
+        change_detector = FrameChangeDetector() if settings.FRAME_REUSE_ENABLED else None
+        face_sizes = FaceSizeTracker() if settings.ADAPTIVE_DETECTION_ENABLED else None
+        buffer = None
+        faces = None
+        output_in_buffer = None  # Where the last output is (None before the first)
+        since_keyframe = 0
+        try:
+            for frame in frames:
+                if not stats["frames"]:
+                    stats.update(batch_size=1, resolution_class=resolution_class(frame.shape))
+                stats["frames"] += 1
+                kind = change_detector.classify(frame, faces) if change_detector else NEW_FRAME
+
+                if kind == DUPLICATE_FRAME and output_in_buffer is not None:
+                    stats["duplicate_frames"] += 1
+                    # An output that isn't in the buffer is the (identical)
+                    # input frame itself
+                    yield buffer if output_in_buffer else frame
+                    continue
+
+                if buffer is None or buffer.shape != frame.shape:
+                    frame_buffers.release(buffer)
+                    buffer = frame_buffers.acquire(frame.shape, frame.dtype)
+                    if interpolator is not None:
+                        interpolator.reset()
+
+                result = None
+                if interpolator is not None and interpolator.has_keyframe and since_keyframe < keyframe_interval - 1:
+                    started = time.perf_counter()
+                    result = interpolator.interpolate(frame, buffer)
+                    if result is not None:
+                        since_keyframe += 1
+                        stats["interpolated_frames"] += 1
+                        stats["interpolated_seconds"] += time.perf_counter() - started
+
+                if result is None:
+                    # Keyframe (or a frame whose faces couldn't be tracked)
+                    started = time.perf_counter()
+                    # In fast mode the change detector also takes interpolated
+                    # frames as its reference, so `faces` may be from several
+                    # frames back: keyframes always detect
+                    if kind == STATIC_FRAME and faces is not None and interpolator is None:
+                        stats["reused_detections"] += 1
+                    else:
+                        faces = face_swap_engine.detect_faces(frame, min_face=face_sizes and face_sizes.min_face())
+                        if face_sizes is not None:
+                            face_sizes.observe(faces)
+                    result = face_swap_engine.swap_face_video_frame(
+                        source_face, frame, target_faces=faces, out=buffer, selector=selector
+                    )
+                    if interpolator is not None:
+                        VideoProcessor._next_keyframe(interpolator, frame, result, faces, stats, started)
+                        since_keyframe = 0
+
+                if add_watermark:
+                    # In place when the swap wrote to the buffer; a copy of an
+                    # untouched frame otherwise, so decoded frames stay intact
+                    result = face_swap_engine.add_watermark(result, "DeepFaceSwap AI", out=buffer)
+                output_in_buffer = result is buffer
+                yield result
+        finally:
+            frame_buffers.release(buffer)
+
+    @staticmethod
+    def _next_keyframe(interpolator, frame, result, faces, stats, started):
+        """Sample the interpolation quality on a fresh keyframe, then store it
+
+        `keyframe_seconds` counts detection and swapping only, the cost of a
+        frame without fast mode; storing the keyframe is fast mode overhead.
+        """
+        stats["keyframe_seconds"] += time.perf_counter() - started
+        stats["keyframes"] += 1
+        if interpolator.has_keyframe and faces is not None and len(faces):
+            # What interpolation would have produced, against the full swap
+            with frame_buffers.borrow(frame.shape, frame.dtype) as estimate:
+                if interpolator.interpolate(frame, estimate) is not None:
+                    psnr = face_psnr(estimate, result, faces)
+                    if psnr is not None:
+                        stats["psnr_sum"] += psnr
+                        stats["psnr_samples"] += 1
+        started = time.perf_counter()
+        interpolator.set_keyframe(frame, result, faces)
+        stats["interpolated_seconds"] += time.perf_counter() - started
+
+    @staticmethod
+    def concat_segments(segment_paths, output_path, fps=30):
+        """Join segment files into one H.264 video
+
+        Uses a single ffmpeg concat + encode pass, falling back to
+        rewriting the frames with OpenCV if ffmpeg fails.
+
+        Returns:
+            Path to the output video file
+        """
+        list_path = output_path + ".segments.txt"
+        try:
+            with open(list_path, "w") as f:
+                for path in segment_paths:
+                    f.write(f"file '{os.path.abspath(path)}'\n")
+            (
+                ffmpeg
+                .input(list_path, format='concat', safe=0)
+                .output(output_path, vcodec='libx264', crf=23, preset='medium')
+                .run(quiet=True, overwrite_output=True)
+            )
+            return output_path
+        except Exception as e:
+            print(f"Error joining segments with ffmpeg, rewriting with OpenCV: {str(e)}")
+        finally:
+            if os.path.exists(list_path):
+                os.remove(list_path)
+
+        out = None
+        for path in segment_paths:
+            cap = cv2.VideoCapture(path)
+            while True:
+                ret, frame = cap.read()
+                if not ret:
+                    break
+                if out is None:
+                    out = cv2.VideoWriter(output_path, cv2.VideoWriter_fourcc(*'mp4v'), fps, (frame.shape[1], frame.shape[0]))
+                out.write(frame)
+            cap.release()
+        if out is not None:
+            out.release()
         return output_path
 
+    @staticmethod
+    def extract_preview_frames(video_path, mode="head"):
+        """Extract a small, downscaled set of frames for a preview render
+
+        Args:
+            video_path: Path to the input video file
+            mode: "head" for the first PREVIEW_SECONDS at PREVIEW_FPS, or
+                "sample" for PREVIEW_SAMPLE_FRAMES spread over the video
+
+        Returns:
+            (frames, fps) with frames no taller than PREVIEW_MAX_HEIGHT
+        """
+        cap = cv2.VideoCapture(video_path)
+        if not cap.isOpened():
+            raise ValueError(f"Could not open video file {video_path}")
+
+        frames = []
+        try:
+            source_fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
+            frame_count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+
+            if mode == "sample":
+                # Seek to evenly spaced frames across the whole video
+                fps = settings.PREVIEW_FPS
+                count = min(settings.PREVIEW_SAMPLE_FRAMES, max(frame_count, 1))
+                for index in np.linspace(0, max(frame_count - 1, 0), num=count, dtype=int):
+                    cap.set(cv2.CAP_PROP_POS_FRAMES, int(index))
+                    ret, frame = cap.read()
+                    if ret:
+                        frames.append(frame)
+            else:
+                # Read sequentially from the start, keeping every step-th frame
+                step = max(1, int(round(source_fps / settings.PREVIEW_FPS)))
+                fps = source_fps / step
+                for index in range(int(settings.PREVIEW_SECONDS * source_fps)):
+                    ret, frame = cap.read()
+                    if not ret:
+                        break
+                    if index % step == 0:
+                        frames.append(frame)
+        finally:
+            cap.release()
+
+        if not frames:
+            raise ValueError(f"No frames could be read from {video_path}")
+
+        height, width = frames[0].shape[:2]
+        if height > settings.PREVIEW_MAX_HEIGHT:
+            # Even dimensions for the H.264 conversion
+            new_height = settings.PREVIEW_MAX_HEIGHT - settings.PREVIEW_MAX_HEIGHT % 2
+            new_width = int(round(width * new_height / height / 2)) * 2
+            frames = [cv2.resize(frame, (new_width, new_height), interpolation=cv2.INTER_AREA) for frame in frames]
+
+        return frames, fps
+
+    @staticmethod
+    def process_preview(source_img_path, target_video_path, mode="head", progress_callback=None, selection=None,
+                        stats=None):
+        """Render a short, low-resolution preview of a face swap
+
+        Args:
+            source_img_path: Path to the source image (face to use)
+            target_video_path: Path to the target video
+            mode: "head" or "sample" (see extract_preview_frames)
+            progress_callback: Function to report progress (0-100%)
+            selection: Target selection options (see TargetSelector.from_options)
+            stats: Dict that receives frame reuse counts (see _swap_frames)
+
+        Returns:
+            Path to the preview video
+        """
+        frames, fps = VideoProcessor.extract_preview_frames(target_video_path, mode)
+        source_face = face_swap_engine.get_source_face(source_img_path)
+        # Sampled frames are too far apart to interpolate between
+        keyframe_interval = settings.PREVIEW_KEYFRAME_INTERVAL if mode == "head" else 1
+
+        processed_frames = []
+        swapped = VideoProcessor._swap_frames(
+            source_face, iter(frames), add_watermark=False, selection=selection, stats=stats,
+            keyframe_interval=keyframe_interval
+        )
+        for i, frame in enumerate(swapped):
+            # Outputs share a reused buffer
+            processed_frames.append(frame.copy())
+            if progress_callback:
+                progress_callback((i + 1) / len(frames) * 100)
+
+        output_path = storage_manager.path_for("results", f"preview_{uuid.uuid4()}.mp4")
+        return VideoProcessor.reconstruct_video(processed_frames, output_path=output_path, fps=fps)
+
+    @staticmethod
+    def process_video_hls(source_img_path, target_video_path, output_dir, progress_callback=None, add_watermark=True,
+                          selection=None, stats=None, keyframe_interval=1):
+        """Process a video into HLS renditions while frames are swapped
+
+        Frames are decoded, swapped and handed to the encoder one batch at a
+        time, so segments appear in `output_dir` while the job is running
+        instead of after the last frame.
+
+        Args:
+            source_img_path: Path to the source image (face to use)
+            target_video_path: Path to the target video
+            output_dir: Directory for the playlists and segments
+            progress_callback: Function to report progress (0-100%)
+            add_watermark: Whether to add a watermark to each frame
+            selection: Target selection options (see TargetSelector.from_options)
+            stats: Dict that receives frame reuse counts (see _swap_frames)
+            keyframe_interval: Fast mode when above 1 (see _swap_frames)
+
+        Returns:
+            The finished HLSWriter (output_dir, ladder, master playlist)
+        """
+        cap = cv2.VideoCapture(target_video_path)
+        if not cap.isOpened():
+            raise ValueError(f"Could not open video file {target_video_path}")
+
+        fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
+        total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+        height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+
+        # Detect the source face once for the whole video
+        source_face = face_swap_engine.get_source_face(source_img_path)
+
+        writer = HLSWriter(output_dir, width, height, fps).start()
+        batch_size = settings.BATCH_SIZE
+        processed = 0
+        try:
+            frames = VideoProcessor._iter_frames(cap)
+            frames = VideoProcessor._swap_frames(
+                source_face, frames, source_img_path, add_watermark, selection, stats, keyframe_interval
+            )
+            for frame in frames:
+                writer.write(frame)
+                processed += 1
+                if progress_callback and total_frames > 0 and processed % batch_size == 0:
+                    progress_callback(min(100, processed / total_frames * 100))
+        except Exception:
+            writer.abort()
+            raise
+        finally:
+            cap.release()
+
+        if processed == 0:
+            writer.abort()
+            raise ValueError(f"No frames could be read from {target_video_path}")
+
+        writer.close()
+        return writer
+
     @staticmethod
     def compress_for_streaming(video_path):
         """Compress a video for streaming
@@ -153,7 +629,9 @@ class VideoProcessor:
         Returns:
             Path to the compressed video
         """
-        output_path = video_path.replace('.mp4', '_stream.mp4')
+        output_path = storage_manager.path_for(
+            "results", os.path.basename(video_path).replace('.mp4', '_stream.mp4')
+        )
 
         try:
             # Use FFmpeg for conversion to a streaming-friendly format
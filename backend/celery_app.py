@@ -1,6 +1,8 @@
 from celery import Celery
+from celery.signals import worker_init, worker_process_init
 import os
 from app.config import settings
+from app.utils.job_routing import configure_queues
 
 celery_app = Celery(
     "tasks",
@@ -20,11 +22,40 @@ celery_app.conf.update(
     task_track_started=True,
 )
 
+# Short, long and bulk video queues with Redis priorities
+configure_queues(celery_app)
+
+# Model loading: only worker processes load models (beat never does)
+@worker_init.connect
+def preload_models_before_fork(**kwargs):
+    """Load models in the worker parent so prefork children share them"""
+    if settings.CELERY_MODEL_PRELOAD == "parent":
+        from app.models.lifecycle import preload_models
+        preload_models(before_fork=True)
+
+@worker_process_init.connect
+def preload_models_in_child(**kwargs):
+    """Load models once in each worker child process, then calibrate
+
+    Loading and the calibration benchmark take longer than
+    worker_proc_alive_timeout, after which the pool kills a child that
+    hasn't finished this signal, so they run in a background thread that
+    tasks wait for.
+    """
+    from app.models.lifecycle import preload_models_in_background
+    calibrate = None
+    if settings.CELERY_MODEL_PRELOAD != "none" and settings.CALIBRATE_ON_WORKER_START:
+        from app.utils.throughput_profile import throughput_profile
+        calibrate = throughput_profile.ensure_calibrated
+    if settings.CELERY_MODEL_PRELOAD == "child" or calibrate is not None:
+        # With "parent" preloading the models are already loaded here
+        preload_models_in_background(then=calibrate)
+
 # Schedule periodic tasks
 celery_app.conf.beat_schedule = {
     "cleanup-old-files": {
         "task": "app.utils.celery_tasks.cleanup_old_files",
-        "schedule": 3600.0 * 12,  # Run twice daily
+        "schedule": 600.0,  # Indexed cleanup is cheap enough to run every 10 minutes
         "args": (24,)  # Keep files for 24 hours
     }
 }
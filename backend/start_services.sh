@@ -40,10 +40,14 @@ source venv/bin/activate && python run.py > fastapi.log 2>&1 &
 FASTAPI_PID=$!
 echo "FastAPI server started with PID: $FASTAPI_PID"
 
-echo "Starting Celery worker..."
-source venv/bin/activate && celery -A celery_app worker --loglevel=info > celery_worker.log 2>&1 &
+echo "Starting Celery workers..."
+source venv/bin/activate && celery -A celery_app worker -Q video_short,celery -n short@%h --loglevel=info > celery_worker.log 2>&1 &
 CELERY_WORKER_PID=$!
-echo "Celery worker started with PID: $CELERY_WORKER_PID"
+echo "Celery short-job worker started with PID: $CELERY_WORKER_PID"
+
+source venv/bin/activate && celery -A celery_app worker -Q video_long,video_bulk -n long@%h --loglevel=info > celery_worker_long.log 2>&1 &
+CELERY_LONG_WORKER_PID=$!
+echo "Celery long/bulk-job worker started with PID: $CELERY_LONG_WORKER_PID"
 
 echo "Starting Celery beat (scheduler)..."
 source venv/bin/activate && celery -A celery_app beat --loglevel=info > celery_beat.log 2>&1 &
@@ -56,6 +60,7 @@ echo
 echo "Services are running in the background. Check log files for details:"
 echo "- FastAPI: fastapi.log"
 echo "- Celery worker: celery_worker.log"
+echo "- Celery long/bulk worker: celery_worker_long.log"
 echo "- Celery beat: celery_beat.log"
 echo
-echo "To stop services, use: kill $FASTAPI_PID $CELERY_WORKER_PID $CELERY_BEAT_PID"
+echo "To stop services, use: kill $FASTAPI_PID $CELERY_WORKER_PID $CELERY_LONG_WORKER_PID $CELERY_BEAT_PID"
@@ -1,35 +1,91 @@
 import os
 import sys
+import cv2
+import numpy as np
 import pytest
 from fastapi.testclient import TestClient
 
 # Add the app directory to the Python path
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from app.main import app
-
 @pytest.fixture
 def client():
     """Create a test client for the FastAPI app."""
+    from app.main import app
     with TestClient(app) as test_client:
         yield test_client
 
+class MockFaceDetector:
+    """Stub face detector that avoids actual ML model loading."""
+    def __init__(self):
+        self.initialized = False
+    
+    def initialize(self):
+        self.initialized = True
+        return True
+    
+    def get_faces(self, image, tiled=None, min_face=None):
+        # No faces found (mock detection)
+        return []
+    
+    def get_largest_face(self, image, with_embedding=False):
+        # Return a mock face embedding
+        return np.zeros((512,), dtype=np.float32)
+
+class MockFaceSwap:
+    """Stub face swap engine that avoids actual ML model loading.
+
+    Args:
+        swap: Optional function (frame, target_faces) -> swapped frame;
+            frames are returned as is without it
+        detect: Optional function (frame) -> faces; no faces without it
+        fail_after: Raise after swapping this many frames, like a worker
+            that died mid-job
+    """
+    def __init__(self, swap=None, detect=None, fail_after=None):
+        self.initialized = False
+        self.swap = swap
+        self.detect = detect
+        self.fail_after = fail_after
+        self.detections = 0
+        self.swaps = 0
+    
+    def initialize(self):
+        self.initialized = True
+        return True
+    
+    def get_source_face(self, path):
+        return path
+
+    def swap_face(self, source_face, target_image):
+        # Return the target image as is (mock swap)
+        return target_image
+    
+    def detect_faces(self, frame, min_face=None):
+        self.detections += 1
+        return self.detect(frame) if self.detect else []
+
+    def swap_face_video_frame(self, source_face, frame, target_faces=None, out=None, selector=None):
+        if self.fail_after is not None and self.swaps >= self.fail_after:
+            raise RuntimeError("worker died")
+        self.swaps += 1
+        result = self.swap(frame, target_faces) if self.swap else frame
+        if out is None:
+            return result
+        if result is not out:
+            np.copyto(out, result)
+        return out
+
+    def add_watermark(self, frame, text, out=None):
+        if out is None:
+            return frame
+        if frame is not out:
+            np.copyto(out, frame)
+        return out
+
 @pytest.fixture
 def mock_face_detector(monkeypatch):
     """Mock the face detector to avoid actual ML model loading."""
-    class MockFaceDetector:
-        def __init__(self):
-            self.initialized = False
-        
-        def initialize(self):
-            self.initialized = True
-            return True
-        
-        def get_largest_face(self, image):
-            # Return a mock face embedding
-            import numpy as np
-            return np.zeros((512,), dtype=np.float32)
-    
     mock_detector = MockFaceDetector()
     from app.models import face_detection
     monkeypatch.setattr(face_detection, "face_detector", mock_detector)
@@ -38,23 +94,49 @@ def mock_face_detector(monkeypatch):
 @pytest.fixture
 def mock_face_swap(monkeypatch):
     """Mock the face swap engine to avoid actual ML model loading."""
-    class MockFaceSwap:
-        def __init__(self):
-            self.initialized = False
-        
-        def initialize(self):
-            self.initialized = True
-            return True
-        
-        def swap_face(self, source_face, target_image):
-            # Return the target image as is (mock swap)
-            return target_image
-        
-        def swap_face_video_frame(self, source_face, frame):
-            # Return the frame as is (mock swap)
-            return frame
-    
     mock_swap = MockFaceSwap()
     from app.models import face_swap
     monkeypatch.setattr(face_swap, "face_swap_engine", mock_swap)
-    return mock_swap
\ No newline at end of file
+    return mock_swap
+
+@pytest.fixture
+def video_engine(monkeypatch):
+    """Install a configurable MockFaceSwap as the video processor's engine.
+
+    Returns a function taking the MockFaceSwap arguments (and an optional
+    `target` to patch instead) that returns the installed engine.
+    """
+    def install(target="app.utils.video_processor.face_swap_engine", **kwargs):
+        engine = MockFaceSwap(**kwargs)
+        monkeypatch.setattr(target, engine)
+        return engine
+    return install
+
+def write_video(path, frames=12, width=320, height=240, fps=24):
+    """Write a small MP4 whose frames ramp in brightness (10 levels per frame)"""
+    out = cv2.VideoWriter(str(path), cv2.VideoWriter_fourcc(*'mp4v'), fps, (width, height))
+    for i in range(frames):
+        out.write(np.full((height, width, 3), i * 10, dtype=np.uint8))
+    out.release()
+
+class SquareDetector:
+    """Stand-in detector model: white squares are faces, scored by size"""
+    det_thresh = 0.5
+    nms_thresh = 0.4
+    use_kps = True
+
+    def __init__(self):
+        self.calls = 0
+
+    def forward(self, img, threshold):
+        self.calls += 1
+        count, _, stats, _ = cv2.connectedComponentsWithStats((img[..., 0] > 128).astype(np.uint8))
+        scores, boxes, kpss = [], [], []
+        for x, y, w, h, _ in stats[1:count]:
+            score = min(1.0, min(w, h) / 40)
+            if score >= threshold:
+                scores.append([score])
+                boxes.append([x, y, x + w, y + h])
+                kpss.append(np.tile([x + w / 2, y + h / 2], (5, 1)))
+        return ([np.array(scores, np.float32).reshape(-1, 1)], [np.array(boxes, np.float32).reshape(-1, 4)],
+                [np.array(kpss, np.float32).reshape(-1, 5, 2)])
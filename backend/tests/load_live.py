@@ -0,0 +1,278 @@
+"""Load generator for the /process/live WebSocket endpoint
+
+Simulates N webcam clients that each send frames at a fixed rate and
+reports achieved fps, dropped frames and end-to-end latency percentiles.
+
+Usage (from the backend directory):
+
+    # Against a running server with real engines
+    python -m tests.load_live --url ws://localhost:8000/api/v1/process/live \\
+        --clients 8 --fps 15 --duration 30 --video sample.mp4 --source face.jpg
+
+    # In-process server using the stub engines from conftest.py
+    python -m tests.load_live --in-process --clients 8 --fps 30
+"""
+import argparse
+import asyncio
+import base64
+import json
+import socket
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager, nullcontext
+import cv2
+import numpy as np
+import websockets
+
+LIVE_PATH = "/api/v1/process/live"
+
+def encode_data_url(img, quality=85):
+    """Encode a BGR image as a JPEG data URL like the frontend sends"""
+    _, buffer = cv2.imencode('.jpg', img, [cv2.IMWRITE_JPEG_QUALITY, quality])
+    return "data:image/jpeg;base64," + base64.b64encode(buffer).decode('utf-8')
+
+def synthetic_frames(count=30, width=640, height=480):
+    """Generate a looping sequence of frames with a moving face-like blob"""
+    frames = []
+    gradient = np.tile(np.linspace(40, 200, width, dtype=np.uint8), (height, 1))
+    for i in range(count):
+        frame = cv2.merge([gradient, np.flipud(gradient), gradient])
+        cx = int(width / 2 + width / 6 * np.sin(2 * np.pi * i / count))
+        cy = height // 2
+        cv2.ellipse(frame, (cx, cy), (width // 8, height // 5), 0, 0, 360, (150, 180, 220), -1)
+        cv2.circle(frame, (cx - width // 20, cy - height // 20), 6, (30, 30, 30), -1)
+        cv2.circle(frame, (cx + width // 20, cy - height // 20), 6, (30, 30, 30), -1)
+        frames.append(encode_data_url(frame))
+    return frames
+
+def recorded_frames(video_path, max_frames=300, width=None):
+    """Read and pre-encode frames from a recorded video"""
+    frames = []
+    cap = cv2.VideoCapture(video_path)
+    if not cap.isOpened():
+        raise ValueError(f"Could not open video file {video_path}")
+    while len(frames) < max_frames:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        if width and frame.shape[1] != width:
+            height = int(frame.shape[0] * width / frame.shape[1])
+            frame = cv2.resize(frame, (width, height))
+        frames.append(encode_data_url(frame))
+    cap.release()
+    if not frames:
+        raise ValueError(f"No frames read from {video_path}")
+    return frames
+
+def percentiles(values):
+    """p50/p95/p99 of a list of latencies in milliseconds"""
+    if not values:
+        return {"p50": None, "p95": None, "p99": None}
+    p50, p95, p99 = np.percentile(np.asarray(values, dtype=np.float64), [50, 95, 99])
+    return {"p50": round(float(p50), 2), "p95": round(float(p95), 2), "p99": round(float(p99), 2)}
+
+async def run_client(url, source_data, frames, fps, duration, max_in_flight=1, offset=0):
+    """Run one simulated webcam client
+
+    Frames are paced at `fps`. Like a browser client, a frame is dropped
+    instead of queued when `max_in_flight` frames are still awaiting a reply.
+
+    Returns:
+        Dict with sent, received, dropped, errors and latencies (ms)
+    """
+    stats = {"sent": 0, "received": 0, "dropped": 0, "errors": 0, "latencies": []}
+    pending = deque()
+
+    async with websockets.connect(url, max_size=None) as ws:
+        # Wait for the session and register the source face
+        await ws.recv()
+        await ws.send(json.dumps({"type": "source_image", "data": source_data}))
+        reply = json.loads(await ws.recv())
+        if reply.get("type") != "source_image_processed":
+            raise RuntimeError(f"Source image rejected: {reply.get('message')}")
+
+        async def receiver():
+            async for raw in ws:
+                message = json.loads(raw)
+                if message.get("type") not in ("processed_frame", "error"):
+                    continue
+                if pending:
+                    stats["latencies"].append((time.perf_counter() - pending.popleft()) * 1000)
+                if message.get("type") == "processed_frame":
+                    stats["received"] += 1
+                else:
+                    stats["errors"] += 1
+
+        receive_task = asyncio.create_task(receiver())
+        interval = 1.0 / fps
+        start = time.perf_counter()
+        tick = 0
+
+        while True:
+            next_tick = start + tick * interval
+            if next_tick - start >= duration:
+                break
+            await asyncio.sleep(max(0.0, next_tick - time.perf_counter()))
+
+            if len(pending) >= max_in_flight:
+                stats["dropped"] += 1
+            else:
+                pending.append(time.perf_counter())
+                await ws.send(json.dumps({
+                    "type": "video_frame",
+                    "data": frames[(offset + tick) % len(frames)]
+                }))
+                stats["sent"] += 1
+            tick += 1
+
+        # Give in-flight frames a moment to come back
+        drain_deadline = time.perf_counter() + 2.0
+        while pending and time.perf_counter() < drain_deadline:
+            await asyncio.sleep(0.01)
+        stats["lost"] = len(pending)
+        receive_task.cancel()
+
+    return stats
+
+async def run_load_test(url, clients, fps, duration, frames, source_data, max_in_flight=1):
+    """Run `clients` concurrent sessions and aggregate their results
+
+    Returns:
+        Report dict with per-client and aggregate figures
+    """
+    started = time.perf_counter()
+    results = await asyncio.gather(*[
+        run_client(url, source_data, frames, fps, duration, max_in_flight, offset=i)
+        for i in range(clients)
+    ], return_exceptions=True)
+    elapsed = time.perf_counter() - started
+
+    per_client = []
+    latencies = []
+    failed = 0
+    for result in results:
+        if isinstance(result, Exception):
+            failed += 1
+            per_client.append({"error": str(result)})
+            continue
+        latencies.extend(result["latencies"])
+        per_client.append({
+            "sent": result["sent"],
+            "received": result["received"],
+            "dropped": result["dropped"],
+            "errors": result["errors"],
+            "lost": result["lost"],
+            "achieved_fps": round(result["received"] / duration, 2),
+            "latency_ms": percentiles(result["latencies"])
+        })
+
+    ok_clients = [c for c in per_client if "error" not in c]
+    received = sum(c["received"] for c in ok_clients)
+    return {
+        "clients": clients,
+        "failed_clients": failed,
+        "target_fps": fps,
+        "duration": duration,
+        "elapsed": round(elapsed, 2),
+        "sent": sum(c["sent"] for c in ok_clients),
+        "received": received,
+        "dropped": sum(c["dropped"] for c in ok_clients),
+        "errors": sum(c["errors"] for c in ok_clients),
+        "achieved_fps_per_client": round(received / duration / max(1, len(ok_clients)), 2),
+        "achieved_fps_total": round(received / duration, 2),
+        "latency_ms": percentiles(latencies),
+        "per_client": per_client
+    }
+
+@contextmanager
+def stub_server():
+    """Run an in-process API server that uses the conftest stub engines
+
+    The live route's engines are swapped for the stubs only while the
+    server runs, so importing this harness leaves them untouched.
+
+    Yields:
+        WebSocket URL of the live endpoint
+    """
+    import uvicorn
+    from fastapi import FastAPI
+    from tests.conftest import MockFaceDetector, MockFaceSwap
+    from app.config import settings
+    from app.routes import live
+
+    originals = live.face_detector, live.face_swap_engine
+    live.face_detector = MockFaceDetector()
+    live.face_swap_engine = MockFaceSwap()
+    server = thread = None
+    try:
+        # Only the live router is needed, which keeps the database out of the way
+        app = FastAPI()
+        app.include_router(live.router, prefix=settings.API_V1_STR)
+
+        with socket.socket() as sock:
+            sock.bind(("127.0.0.1", 0))
+            port = sock.getsockname()[1]
+
+        config = uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning")
+        server = uvicorn.Server(config)
+        thread = threading.Thread(target=server.run, daemon=True)
+        thread.start()
+
+        deadline = time.time() + 10
+        while not server.started:
+            if time.time() > deadline or not thread.is_alive():
+                raise RuntimeError("In-process server did not start")
+            time.sleep(0.05)
+
+        yield f"ws://127.0.0.1:{port}{LIVE_PATH}"
+    finally:
+        if server is not None:
+            server.should_exit = True
+            thread.join(timeout=10)
+        live.face_detector, live.face_swap_engine = originals
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the live face swap WebSocket")
+    parser.add_argument("--url", default=f"ws://localhost:8000{LIVE_PATH}", help="WebSocket URL")
+    parser.add_argument("--in-process", action="store_true", help="Start a stub-engine server in-process")
+    parser.add_argument("--clients", type=int, default=4, help="Number of simulated clients")
+    parser.add_argument("--fps", type=float, default=15, help="Frames per second per client")
+    parser.add_argument("--duration", type=float, default=10, help="Seconds to run")
+    parser.add_argument("--max-in-flight", type=int, default=1, help="Unanswered frames before dropping")
+    parser.add_argument("--video", help="Recorded video to replay (synthetic frames if omitted)")
+    parser.add_argument("--source", help="Source face image (synthetic if omitted)")
+    parser.add_argument("--width", type=int, default=640, help="Frame width")
+    parser.add_argument("--json", action="store_true", help="Print the full report as JSON")
+    args = parser.parse_args()
+
+    if args.video:
+        frames = recorded_frames(args.video, width=args.width)
+    else:
+        frames = synthetic_frames(width=args.width, height=args.width * 3 // 4)
+
+    if args.source:
+        source_img = cv2.imread(args.source)
+        if source_img is None:
+            raise SystemExit(f"Could not read source image {args.source}")
+        source_data = encode_data_url(source_img)
+    else:
+        source_data = frames[0]
+
+    with (stub_server() if args.in_process else nullcontext(args.url)) as url:
+        report = asyncio.run(run_load_test(
+            url, args.clients, args.fps, args.duration, frames, source_data, args.max_in_flight
+        ))
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+
+    latency = report["latency_ms"]
+    print(f"Clients: {report['clients']} ({report['failed_clients']} failed) @ {report['target_fps']} fps for {report['duration']}s")
+    print(f"Frames: sent={report['sent']} received={report['received']} dropped={report['dropped']} errors={report['errors']}")
+    print(f"Achieved fps: {report['achieved_fps_per_client']} per client, {report['achieved_fps_total']} total")
+    print(f"Latency ms: p50={latency['p50']} p95={latency['p95']} p99={latency['p99']}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+import numpy as np
+
+from app.models.adaptive_detection import AdaptiveDetector, FaceSizeTracker, detection_input_size
+from app.models.face_results import FaceDetections
+from app.models.box_geometry import nms
+from tests.conftest import SquareDetector
+
+class DynamicSquareDetector(SquareDetector):
+    """SquareDetector with the detector model's nms() and input sizes seen"""
+
+    def __init__(self):
+        super().__init__()
+        self.input_shapes = []
+
+    def forward(self, img, threshold):
+        self.input_shapes.append(img.shape[:2])
+        return super().forward(img, threshold)
+
+    def nms(self, dets):
+        return nms(dets[:, :4], dets[:, 4], self.nms_thresh)
+
+def faces(*sides):
+    boxes = np.array([[0, 0, side, side] for side in sides], np.float32).reshape(-1, 4)
+    return FaceDetections.from_arrays(boxes, np.zeros((len(sides), 5, 2), np.float32))
+
+def test_input_size_follows_the_face_size():
+    # Close-up faces need far less than the fixed 640 input
+    assert detection_input_size((720, 1280), 200) == (160, 96)
+    assert detection_input_size((720, 1280), 48) == (544, 320)
+    # Clamped to the maximum input, and never upscaled past the frame
+    assert detection_input_size((720, 1280), 10) == (640, 384)
+    assert detection_input_size((100, 120), 10) == (128, 128)
+
+def test_tracker_follows_faces_and_refreshes():
+    tracker = FaceSizeTracker(default=48, margin=0.5, refresh_interval=3)
+    assert tracker.min_face() == 48
+    tracker.observe(faces(300, 200))
+    assert [tracker.min_face() for _ in range(4)] == [100, 100, 100, 48]
+    tracker.observe(faces())  # Nothing found: keep the last estimate
+    assert tracker.min_face() == 100
+    tracker.observe(faces(40))
+    assert tracker.min_face() == 20
+
+def test_detects_at_the_chosen_size_with_cached_buffers():
+    frame = np.zeros((720, 1280, 3), np.uint8)
+    frame[200:500, 400:700] = 255
+    model = DynamicSquareDetector()
+    detector = AdaptiveDetector(model)
+
+    for _ in range(2):
+        detections, kpss = detector.detect(frame, 200)
+        assert len(detections) == 1 and kpss.shape == (1, 5, 2)
+        assert np.allclose(detections[0, :4], [400, 200, 700, 500], atol=8)
+    assert model.input_shapes == [(96, 160), (96, 160)]
+    assert len(detector._local.inputs) == 1
+
+def test_min_face_takes_the_adaptive_path():
+    from app.models.face_detection import FaceDetector
+
+    class Input:
+        shape = [1, 3, "?", "?"]
+
+    class Session:
+        def get_inputs(self):
+            return [Input()]
+
+    class App:
+        det_model = DynamicSquareDetector()
+        det_model.session = Session()
+        det_size = (640, 640)
+        models = {"detection": det_model}
+
+        def get(self, img):
+            return []
+
+    detector = FaceDetector()
+    detector.app = App()
+    frame = np.zeros((720, 1280, 3), np.uint8)
+    frame[200:500, 400:700] = 255
+    assert len(detector.get_faces(frame, tiled=False)) == 0  # Fixed-size path
+    found = detector.get_faces(frame, tiled=False, min_face=150)
+    assert len(found) == 1 and App.det_model.input_shapes[-1] == (96, 192)
+
+    Input.shape = [1, 3, 640, 640]
+    detector._adaptive = None
+    assert detector.adaptive_detector is None
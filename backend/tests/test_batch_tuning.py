@@ -0,0 +1,43 @@
+from app.config import settings
+from app.utils import batch_tuning
+from app.utils.batch_tuning import BatchSizeController, resolution_class
+
+FRAME_1080P = (1080, 1920, 3)
+
+def test_resolution_classes():
+    assert resolution_class((360, 640, 3)) == "480p"
+    assert resolution_class((1920, 1080, 3)) == "1080p"  # Portrait
+    assert resolution_class((2160, 3840, 3)) == "2160p"
+
+def test_grows_while_throughput_improves_then_settles(tmp_path, monkeypatch):
+    monkeypatch.setattr(batch_tuning, "available_memory", lambda: 64 << 30)
+    # Throughput saturates at 8 frames in flight
+    fps = {4: 10.0, 8: 16.0, 16: 16.4, 32: 16.5}
+    controller = BatchSizeController(str(tmp_path / "batch.json"))
+
+    size = controller.batch_size(FRAME_1080P, initial=4)
+    sizes = [size]
+    for _ in range(4):
+        size = controller.record(FRAME_1080P, size, 60, 60 / fps[size])
+        sizes.append(size)
+    assert sizes == [4, 8, 16, 8, 8]
+    assert controller.summary(FRAME_1080P)["settled"]
+
+    # Later jobs (and other worker processes) start from the settled size
+    assert BatchSizeController(str(tmp_path / "batch.json")).batch_size(FRAME_1080P, initial=4) == 8
+    assert controller.batch_size((720, 1280, 3), initial=4) == 4
+
+def test_memory_caps_the_batch(tmp_path, monkeypatch):
+    frame_bytes = 1080 * 1920 * 3
+    budget = frame_bytes * settings.BATCH_FRAME_MEMORY_FACTOR * 6
+    monkeypatch.setattr(batch_tuning, "available_memory", lambda: budget / settings.BATCH_MEMORY_FRACTION)
+    controller = BatchSizeController(str(tmp_path / "batch.json"))
+    assert controller.batch_size(FRAME_1080P, initial=16, floor=8) == 6
+
+    # Growth stops at the cap, and settles there
+    assert controller.record(FRAME_1080P, 6, 60, 1.0) == 6
+    assert controller.summary(FRAME_1080P)["batch_size"] == 6
+
+    # Less memory later: the settled size is halved
+    monkeypatch.setattr(batch_tuning, "available_memory", lambda: budget / settings.BATCH_MEMORY_FRACTION / 2)
+    assert controller.record(FRAME_1080P, 6, 60, 1.0) == 3
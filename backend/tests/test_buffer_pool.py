@@ -0,0 +1,54 @@
+import numpy as np
+
+from app.models.face_swap import FaceSwapEngine
+from app.utils.buffer_pool import BufferPool
+from app.utils.video_processor import VideoProcessor
+
+def test_buffers_are_reused_by_shape_and_dtype():
+    pool = BufferPool(max_per_key=2)
+    first = pool.acquire((4, 4, 3))
+    pool.release(first)
+    assert pool.acquire((4, 4, 3)) is first
+    assert pool.acquire((4, 4, 3), np.float32) is not first
+    pool.release(first[1:])  # views are never pooled
+    assert pool.stats() == {"allocated": 2, "reused": 1, "idle": 0}
+
+def test_watermark_in_place_matches_a_copy():
+    """Blending only the corner gives the same pixels as the full-frame version."""
+    engine = FaceSwapEngine()
+    frame = np.random.default_rng(0).integers(0, 255, (360, 640, 3), dtype=np.uint8)
+    copy = engine.add_watermark(frame, "DeepFaceSwap AI")
+
+    in_place = frame.copy()
+    assert engine.add_watermark(in_place, "DeepFaceSwap AI", out=in_place) is in_place
+    assert np.array_equal(copy, in_place)
+    assert np.array_equal(copy[:200], frame[:200])
+
+class StubSwapper:
+    """Returns a flat grey face crop aligned by a fixed transform."""
+
+    def __init__(self, matrix):
+        self.matrix = matrix
+
+    def get(self, img, target_face, source_face, paste_back=True):
+        return np.full((128, 128, 3), 200, dtype=np.uint8), self.matrix
+
+def test_paste_face_only_touches_the_face_region():
+    engine = FaceSwapEngine()
+    engine.swapper = StubSwapper(np.array([[0.5, 0, -100], [0, 0.5, -50]], dtype=np.float64))
+    frame = np.zeros((240, 320, 3), dtype=np.uint8)
+    assert engine.paste_face(frame, None, None) is frame
+
+    # The crop maps to x 200..456 (clipped to 320), y 100..356 (clipped to 240)
+    assert frame[:90].max() == 0 and frame[:, :190].max() == 0
+    assert frame[170, 260, 0] == 200
+
+def test_serial_swap_reuses_one_output_buffer(monkeypatch, video_engine):
+    """Steady-state video swapping allocates no new frame buffers."""
+    video_engine()
+    pool = BufferPool()
+    monkeypatch.setattr("app.utils.video_processor.frame_buffers", pool)
+    frames = (np.full((8, 8, 3), i, dtype=np.uint8) for i in range(20))
+    values = [int(frame[0, 0, 0]) for frame in VideoProcessor._swap_frames(None, frames)]
+    assert values == list(range(20))
+    assert pool.stats() == {"allocated": 1, "reused": 0, "idle": 1}
@@ -0,0 +1,119 @@
+import os
+import multiprocessing
+
+import cv2
+import pytest
+
+from app.config import settings
+from app.utils.checkpoints import JobCheckpoint, cleanup_checkpoints
+from app.utils.video_processor import VideoProcessor
+from tests.conftest import write_video
+
+@pytest.fixture
+def video_env(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "CHECKPOINT_SEGMENT_FRAMES", 5)
+    monkeypatch.setattr(settings, "CHECKPOINT_DIR", str(tmp_path / "checkpoints"))
+    monkeypatch.setattr(
+        "app.utils.video_processor.storage_manager.path_for",
+        lambda kind, name: str(tmp_path / name)
+    )
+    video_path = tmp_path / "clip.mp4"
+    write_video(video_path, frames=23)
+    return str(video_path)
+
+def run(video_path, checkpoint):
+    return VideoProcessor.process_video("source.jpg", video_path, checkpoint=checkpoint)
+
+def test_resumed_job_skips_completed_segments(video_env, video_engine):
+    """A retry after a crash only processes the segments that weren't finished."""
+    key = JobCheckpoint.key_for("source.jpg", video_env)
+    checkpoint = JobCheckpoint(key)
+    video_engine(fail_after=12)
+    with pytest.raises(RuntimeError):
+        run(video_env, checkpoint)
+    assert checkpoint.load(checkpoint.manifest["params"]) == {0, 1}
+
+    engine = video_engine()
+    output_path = run(video_env, JobCheckpoint(key))
+    assert engine.swaps == 13
+
+    cap = cv2.VideoCapture(output_path)
+    assert int(cap.get(cv2.CAP_PROP_FRAME_COUNT)) == 23
+    cap.release()
+
+def test_changed_parameters_start_over(video_env, video_engine, monkeypatch):
+    """Segments cut with a different segment length are not reused."""
+    checkpoint = JobCheckpoint("job")
+    video_engine(fail_after=12)
+    with pytest.raises(RuntimeError):
+        run(video_env, checkpoint)
+
+    monkeypatch.setattr(settings, "CHECKPOINT_SEGMENT_FRAMES", 10)
+    engine = video_engine()
+    run(video_env, JobCheckpoint("job"))
+    assert engine.swaps == 23
+
+def test_lock_blocks_live_holder_and_recovers_from_dead_one(tmp_path, monkeypatch):
+    """A duplicate delivery waits, but a lock left by a dead process is taken over."""
+    monkeypatch.setattr(settings, "CHECKPOINT_DIR", str(tmp_path))
+    first = JobCheckpoint("job")
+    assert first.acquire()
+    assert not JobCheckpoint("job").acquire()
+    first.release()
+    assert not os.path.exists(first.lock_path)
+
+    def die_holding_the_lock():
+        JobCheckpoint("job").acquire()
+        os._exit(0)
+
+    child = multiprocessing.get_context("fork").Process(target=die_holding_the_lock)
+    child.start()
+    child.join()
+    assert os.path.exists(first.lock_path)
+    assert JobCheckpoint("job").acquire()
+
+def test_lock_of_a_reused_pid_is_not_live(tmp_path, monkeypatch):
+    """After a restart, a lock naming a pid that now belongs to a live process is stale."""
+    monkeypatch.setattr(settings, "CHECKPOINT_DIR", str(tmp_path))
+    checkpoint = JobCheckpoint("job")
+    os.makedirs(checkpoint.directory)
+    with open(checkpoint.lock_path, "w") as f:
+        f.write(checkpoint._owner())  # Our own pid, as for pid 1 in a container
+    assert checkpoint._lock_is_stale()
+    assert checkpoint.acquire()
+    checkpoint.release()
+
+def test_lock_of_another_host_expires_without_heartbeat(tmp_path, monkeypatch):
+    """A holder on another host is live while it heartbeats; a late release leaves its lock alone."""
+    monkeypatch.setattr(settings, "CHECKPOINT_DIR", str(tmp_path))
+    first = JobCheckpoint("job")
+    assert first.acquire()
+    with open(first.lock_path, "w") as f:
+        f.write("other-host:1")  # Taken over by another host
+    first.release()
+    assert not JobCheckpoint("job").acquire()
+
+    os.utime(first.lock_path, (0, 0))
+    assert JobCheckpoint("job").acquire()
+
+def test_live_lock_on_this_host_is_not_stale_without_heartbeat(tmp_path, monkeypatch):
+    """A long segment on a live process doesn't let a duplicate take over."""
+    monkeypatch.setattr(settings, "CHECKPOINT_DIR", str(tmp_path))
+    monkeypatch.setattr(settings, "CHECKPOINT_LOCK_STALE_SECONDS", 1)
+    holder = JobCheckpoint("job")
+    assert holder.acquire()
+    os.utime(holder.lock_path, (0, 0))
+    assert not JobCheckpoint("job").acquire()
+    holder.release()
+
+def test_finished_jobs_return_stored_result_and_expire(tmp_path, monkeypatch):
+    """Completed checkpoints keep only the result and are cleaned up later."""
+    monkeypatch.setattr(settings, "CHECKPOINT_DIR", str(tmp_path))
+    checkpoint = JobCheckpoint("job")
+    checkpoint.load({"fps": 24})
+    checkpoint.mark_completed({"download_url": "/api/v1/results/x.mp4"})
+    assert JobCheckpoint("job").finished_result() == {"download_url": "/api/v1/results/x.mp4"}
+
+    assert cleanup_checkpoints(max_age_hours=1) == 0
+    assert cleanup_checkpoints(max_age_hours=-1) == 1
+    assert not os.path.exists(checkpoint.directory)
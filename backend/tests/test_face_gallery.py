@@ -0,0 +1,70 @@
+import numpy as np
+import pytest
+
+from app.models.face_gallery import FaceGallery, TargetSelector
+from app.models.face_results import FaceDetections
+
+def make_detections():
+    # Widths 10, 40, 20; faces 1 and 2 look like identity A, face 0 like B
+    bboxes = np.array([[0, 0, 10, 10], [0, 0, 40, 40], [50, 50, 70, 70]], dtype=np.float32)
+    return FaceDetections.from_arrays(bboxes, np.zeros((3, 5, 2), np.float32))
+
+EMBEDDINGS = np.array([[0, 1, 0], [1, 0.1, 0], [1, 0.3, 0]], dtype=np.float32)
+
+@pytest.fixture
+def stub_recognition(monkeypatch):
+    calls = []
+
+    def compute_embeddings(img, detections):
+        calls.append(len(detections))
+        # Embeddings follow the face's width so filtered subsets line up
+        rows = [{10: 0, 40: 1, 20: 2}[int(face.bbox[2] - face.bbox[0])] for face in detections]
+        return detections.with_embeddings(EMBEDDINGS[rows])
+
+    monkeypatch.setattr("app.models.face_gallery.face_detector.compute_embeddings", compute_embeddings)
+    return calls
+
+def test_gallery_matches_by_cosine_similarity():
+    gallery = FaceGallery()
+    gallery.add([2, 0, 0], name="a")
+    gallery.add([0, 3, 0], name="b")
+    faces = make_detections().with_embeddings(EMBEDDINGS)
+    matches, similarity = gallery.match(faces.normed_embeddings(), threshold=0.5)
+    assert matches.tolist() == [1, 0, 0]
+    assert similarity[0] == pytest.approx(1.0)
+
+    # Nothing is similar enough
+    matches, _ = gallery.match(faces.normed_embeddings(), threshold=1.01)
+    assert matches.tolist() == [-1, -1, -1]
+
+def test_size_policies():
+    detections = make_detections()
+    widths = lambda pairs: [int(face.bbox[2] - face.bbox[0]) for _, face in pairs]
+    assert widths(TargetSelector().assign(None, detections, "src")) == [10, 40, 20]
+    assert widths(TargetSelector("largest").assign(None, detections, "src")) == [40]
+    assert widths(TargetSelector("top_k", top_k=2).assign(None, detections, "src")) == [40, 20]
+    assert widths(TargetSelector("min_size", min_size=15).assign(None, detections, "src")) == [40, 20]
+    assert TargetSelector("largest", min_size=100).assign(None, detections, "src") == []
+    with pytest.raises(ValueError):
+        TargetSelector("nearest")
+
+def test_identity_policy_maps_each_identity_to_its_source(stub_recognition):
+    gallery = FaceGallery()
+    gallery.add([1, 0, 0], source_face="face_for_a")
+    gallery.add([0, 1, 0])
+    selector = TargetSelector("identity", gallery=gallery, threshold=0.5)
+
+    pairs = selector.assign(None, make_detections(), "main")
+    # Identity A goes to its most similar face (the 40px one) only
+    assert [(source, int(face.bbox[2] - face.bbox[0])) for source, face in pairs] == [("face_for_a", 40), ("main", 10)]
+    assert stub_recognition == [3]
+
+    # Faces filtered out by size never reach recognition
+    TargetSelector("identity", min_size=15, gallery=gallery).assign(None, make_detections(), "main")
+    assert stub_recognition == [3, 2]
+
+def test_from_options_defaults_to_every_face():
+    assert TargetSelector.from_options(None) is None
+    assert TargetSelector.from_options({"policy": "all"}) is None
+    selector = TargetSelector.from_options({"policy": "top_k", "top_k": 3, "min_size": 8})
+    assert (selector.policy, selector.top_k, selector.min_size) == ("top_k", 3, 8.0)
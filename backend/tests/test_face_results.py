@@ -0,0 +1,53 @@
+import pickle
+
+import numpy as np
+import pytest
+from insightface.app.common import Face
+
+from app.models.face_results import FaceDetections
+from app.models.face_swap import FaceSwapEngine
+
+def make_faces():
+    boxes = [[0, 0, 10, 10], [0, 0, 40, 30], [5, 5, 25, 25]]
+    return [
+        Face(bbox=np.array(box, dtype=np.float32), kps=np.full((5, 2), i, dtype=np.float32),
+             det_score=score, embedding=np.full(8, i + 1, dtype=np.float32))
+        for i, (box, score) in enumerate(zip(boxes, [0.9, 0.5, 0.7]))
+    ]
+
+def test_views_expose_face_attributes():
+    detections = FaceDetections.from_faces(make_faces())
+    assert len(detections) == 3 and detections
+    face = detections[1]
+    assert face.bbox.tolist() == [0, 0, 40, 30]
+    assert face.kps[0, 0] == 1 and face.det_score == pytest.approx(0.5)
+    assert face.landmark_2d_106 is None
+    assert np.isclose(np.linalg.norm(face.normed_embedding), 1.0)
+    assert face["det_score"] == pytest.approx(0.5) and face.get("missing") is None
+    assert not FaceDetections.empty()
+
+def test_vectorized_selection():
+    detections = FaceDetections.from_faces(make_faces())
+    assert detections.largest().bbox.tolist() == [0, 0, 40, 30]
+    assert [face.det_score for face in detections.top_k(2)] == pytest.approx([0.9, 0.7])
+    assert [face.area for face in detections.top_k(1, by="area")] == [1200.0]
+    assert len(detections.min_size(15)) == 2
+    assert FaceDetections.empty().largest() is None
+
+def test_serialization_round_trips():
+    detections = FaceDetections.from_faces(make_faces())
+    restored = FaceDetections.from_bytes(detections.to_bytes())
+    assert np.array_equal(restored.records, detections.records)
+    assert pickle.loads(pickle.dumps(detections[2])).bbox.tolist() == [5, 5, 25, 25]
+    assert detections.to_faces()[0].det_score == np.float32(0.9)
+
+def test_detected_source_face_is_saved_as_a_record(tmp_path, monkeypatch):
+    source_path = str(tmp_path / "source.jpg")
+    face = FaceDetections.from_faces(make_faces()).largest()
+    monkeypatch.setattr("app.models.face_swap.cv2.imread", lambda path: np.zeros((8, 8, 3), np.uint8))
+    monkeypatch.setattr("app.models.face_swap.face_detector.get_largest_face", lambda img, **kwargs: face)
+    FaceSwapEngine().get_source_face(source_path)
+
+    loaded = FaceSwapEngine()._load_face_file(source_path)
+    assert np.array_equal(loaded.embedding, face.embedding)
+    assert loaded.bbox.tolist() == face.bbox.tolist()
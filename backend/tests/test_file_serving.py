@@ -0,0 +1,58 @@
+import pytest
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+
+from app.utils.file_serving import RangeFileResponse, parse_range_header
+
+CONTENT = bytes(range(256)) * 1024
+
+@pytest.fixture
+def file_client(tmp_path):
+    """Client for a tiny app that serves one file with RangeFileResponse."""
+    path = tmp_path / "video.mp4"
+    path.write_bytes(CONTENT)
+    app = FastAPI()
+
+    @app.get("/file")
+    async def serve(request: Request):
+        return RangeFileResponse(str(path), request, media_type="video/mp4")
+
+    return TestClient(app)
+
+def test_parse_range_header():
+    """Open, closed, suffix and invalid ranges are parsed correctly."""
+    assert parse_range_header("bytes=0-99", 1000) == (0, 99)
+    assert parse_range_header("bytes=900-", 1000) == (900, 999)
+    assert parse_range_header("bytes=-100", 1000) == (900, 999)
+    assert parse_range_header("bytes=0-5000", 1000) == (0, 999)
+    assert parse_range_header("bytes=2000-", 1000) == "unsatisfiable"
+    assert parse_range_header("bytes=0-1,5-6", 1000) is None
+    assert parse_range_header(None, 1000) is None
+
+def test_full_and_partial_responses(file_client):
+    """Whole-file requests get 200 and ranges get 206 with the right bytes."""
+    response = file_client.get("/file")
+    assert response.status_code == 200
+    assert response.content == CONTENT
+    assert response.headers["accept-ranges"] == "bytes"
+    assert "immutable" in response.headers["cache-control"]
+
+    response = file_client.get("/file", headers={"Range": "bytes=1000-200999"})
+    assert response.status_code == 206
+    assert response.content == CONTENT[1000:201000]
+    assert response.headers["content-range"] == f"bytes 1000-200999/{len(CONTENT)}"
+
+    response = file_client.get("/file", headers={"Range": f"bytes={len(CONTENT)}-"})
+    assert response.status_code == 416
+
+def test_conditional_requests(file_client):
+    """A matching ETag gets 304 and a stale If-Range gets the full file."""
+    etag = file_client.get("/file").headers["etag"]
+
+    response = file_client.get("/file", headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.content == b""
+
+    response = file_client.get("/file", headers={"Range": "bytes=0-9", "If-Range": '"stale"'})
+    assert response.status_code == 200
+    assert len(response.content) == len(CONTENT)
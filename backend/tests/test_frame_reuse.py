@@ -0,0 +1,65 @@
+import numpy as np
+
+from app.models.face_results import FaceDetections
+from app.utils.frame_reuse import FrameChangeDetector, NEW_FRAME, STATIC_FRAME, DUPLICATE_FRAME
+from app.utils.video_processor import VideoProcessor
+
+def make_frame(seed=0, size=(128, 128)):
+    return np.random.default_rng(seed).integers(0, 255, size + (3,), dtype=np.uint8)
+
+def test_classifies_duplicate_static_and_new_frames():
+    detector = FrameChangeDetector(face_threshold=3.0, block_threshold=12.0, max_run=2)
+    frame = make_frame()
+    face = FaceDetections.from_arrays(np.array([[64, 64, 128, 128]], np.float32), np.zeros((1, 5, 2), np.float32))
+
+    assert detector.classify(frame) == NEW_FRAME
+    assert detector.classify(frame.copy()) == DUPLICATE_FRAME
+
+    # Sensor noise on the frame keeps the last detection
+    noisy = frame.copy()
+    noisy[::2, ::2] ^= 1
+    assert detector.classify(noisy, face) == STATIC_FRAME
+
+    # A change inside the face needs a new detection...
+    moved = frame.copy()
+    moved[64:, 64:] = 255
+    assert detector.classify(moved, face) == NEW_FRAME
+
+    # ...and so does a new object elsewhere, which the face check can't see
+    detector.classify(frame)
+    entered = frame.copy()
+    entered[:16, :16] = 0
+    assert detector.classify(entered, face) == NEW_FRAME
+
+def test_static_runs_are_capped():
+    detector = FrameChangeDetector(max_run=2)
+    frames = [make_frame()] * 4
+    kinds = []
+    for i, frame in enumerate(frames):
+        frame = frame.copy()
+        frame[0, 0, 0] = i  # Not an exact duplicate
+        kinds.append(detector.classify(frame))
+    assert kinds == [NEW_FRAME, STATIC_FRAME, STATIC_FRAME, NEW_FRAME]
+
+def test_swap_frames_skips_unchanged_frames(video_engine):
+    def stamp(frame, target_faces):
+        # Mark each swapped frame with its swap count
+        frame = frame.copy()
+        frame[0, 0] = engine.swaps
+        return frame
+
+    engine = video_engine(swap=stamp)
+    a, b = make_frame(1), make_frame(2)
+    near_b = b.copy()
+    near_b[5, 5] ^= 1
+    stats = {}
+    outputs = [
+        frame.copy() for frame in VideoProcessor._swap_frames(None, iter([a, a, a, b, near_b]), stats=stats)
+    ]
+
+    assert stats == {
+        "frames": 5, "duplicate_frames": 2, "reused_detections": 1, "batch_size": 1, "resolution_class": "480p"
+    }
+    assert (engine.detections, engine.swaps) == (2, 3)
+    assert np.array_equal(outputs[1], outputs[0]) and np.array_equal(outputs[2], outputs[0])
+    assert outputs[3][0, 0, 0] == 2 and outputs[4][0, 0, 0] == 3
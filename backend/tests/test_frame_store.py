@@ -0,0 +1,111 @@
+import os
+import multiprocessing
+
+import cv2
+import numpy as np
+import pytest
+
+from app.config import settings
+from app.utils.frame_store import FrameStore, FrameStoreFullError
+from app.utils.video_processor import VideoProcessor
+from tests.conftest import write_video
+
+def frame(value, shape=(4, 6, 3)):
+    return np.full(shape, value, dtype=np.uint8)
+
+def test_ring_evicts_oldest_frames(tmp_path):
+    """Frames are addressed by index; the oldest is overwritten when full."""
+    with FrameStore(3, (4, 6, 3), path=None, eviction="oldest") as store:
+        for value in range(5):
+            assert store.put(frame(value)) == value
+        assert 1 not in store and 2 in store and len(store) == 3
+        assert store.get(4)[0, 0, 0] == 4
+        with pytest.raises(KeyError):
+            store.get(1)
+
+def test_released_policy_waits_for_the_consumer():
+    """With "released" eviction a full store only reuses released slots."""
+    with FrameStore(2, (4, 6, 3), eviction="released") as store:
+        store.put(frame(0))
+        store.put(frame(1))
+        with pytest.raises(FrameStoreFullError):
+            store.put(frame(2), timeout=0.01)
+        store.release(0)
+        assert store.put(frame(2), timeout=0.01) == 2
+        assert 0 not in store
+
+def test_attached_store_shares_slots_without_copying():
+    """Another handle on the same file sees frames written by the owner."""
+    store = FrameStore(2, (4, 6, 3))
+    try:
+        index = store.put(frame(7))
+        other = FrameStore.attach(store.path, 2, (4, 6, 3))
+        assert other.slot_for(index)[0, 0, 0] == 7
+        view = store.get(index)
+        view[0, 0, 0] = 9
+        assert other.slot_for(index)[0, 0, 0] == 9
+    finally:
+        store.close()
+    assert not os.path.exists(store.path)
+
+def test_decoder_fills_slots_directly(tmp_path):
+    """read_from decodes into the store and stops at the end of the video."""
+    video_path = tmp_path / "clip.mp4"
+    write_video(video_path, frames=6)
+    cap = cv2.VideoCapture(str(video_path))
+    height, width = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)), int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+    with FrameStore.for_video(width, height, capacity=4) as store:
+        indices = []
+        while (index := store.read_from(cap)) is not None:
+            indices.append(index)
+        assert indices == list(range(6))
+        assert store.get(5).shape == (height, width, 3)
+    cap.release()
+
+def test_process_video_with_frame_store(tmp_path, monkeypatch, video_engine):
+    """MP4 jobs produce the same output when decoding into the frame store."""
+    monkeypatch.setattr(settings, "FRAME_STORE_ENABLED", True)
+    monkeypatch.setattr(settings, "FRAME_STORE_DIR", str(tmp_path / "frames"))
+    monkeypatch.setattr(settings, "CHECKPOINT_SEGMENT_FRAMES", 5)
+    monkeypatch.setattr(settings, "CHECKPOINT_DIR", str(tmp_path / "checkpoints"))
+    monkeypatch.setattr(
+        "app.utils.video_processor.storage_manager.path_for",
+        lambda kind, name: str(tmp_path / name)
+    )
+    engine = video_engine()
+    video_path = tmp_path / "clip.mp4"
+    write_video(video_path, frames=12)
+
+    output_path = VideoProcessor.process_video("source.jpg", str(video_path))
+    assert engine.swaps == 12
+    cap = cv2.VideoCapture(output_path)
+    assert int(cap.get(cv2.CAP_PROP_FRAME_COUNT)) == 12
+    cap.release()
+    assert os.listdir(tmp_path / "frames") == []
+
+def test_orphaned_backing_files_are_swept(tmp_path, monkeypatch):
+    """Files of dead jobs are deleted; those of running jobs are kept."""
+    import socket
+    from app.utils.frame_store import sweep_stale_frame_stores
+
+    monkeypatch.setattr(settings, "FRAME_STORE_DIR", str(tmp_path))
+    live = FrameStore(2, (4, 6, 3))
+    # Not locked, though its name is from this host
+    orphan = tmp_path / f"frames_{socket.gethostname()}_abc.mmap"
+    orphan.write_bytes(b"x")
+    legacy = tmp_path / "frames_0123abcd.mmap"
+    legacy.write_bytes(b"x")
+    os.utime(legacy, (0, 0))
+
+    def die_without_close():
+        FrameStore(2, (4, 6, 3))
+        os._exit(0)
+
+    child = multiprocessing.get_context("fork").Process(target=die_without_close)
+    child.start()
+    child.join()
+    assert len(os.listdir(tmp_path)) == 4
+
+    assert sweep_stale_frame_stores() == 3
+    assert os.listdir(tmp_path) == [os.path.basename(live.path)]
+    live.close()
@@ -0,0 +1,100 @@
+import os
+import shutil
+import sys
+
+import numpy as np
+import pytest
+
+from app.config import settings
+from app.utils.hls_writer import HLSWriter, build_ladder
+from app.utils.storage import StorageManager
+
+@pytest.fixture
+def storage(tmp_path, monkeypatch):
+    """Storage manager rooted in a temporary directory."""
+    monkeypatch.setattr(settings, "STORAGE_QUOTA_BYTES", 0)
+    manager = StorageManager(index_path=str(tmp_path / "index.db"))
+    manager.base_dirs = {"uploads": str(tmp_path / "uploads"), "results": str(tmp_path / "results")}
+    return manager
+
+def test_ladder_skips_rungs_above_source():
+    """Only renditions at or below the source height are encoded."""
+    ladder = build_ladder(1280, 720, 30, heights=[1080, 720, 360])
+    assert [rung["height"] for rung in ladder] == [720, 360]
+    assert ladder[1]["width"] == 640
+    assert ladder[0]["bitrate"] > ladder[1]["bitrate"]
+
+def test_small_source_gets_single_rendition():
+    """A source below every rung is encoded at its own size."""
+    ladder = build_ladder(321, 241, 25, heights=[720, 360])
+    assert len(ladder) == 1
+    assert ladder[0]["height"] % 2 == 0 and ladder[0]["width"] % 2 == 0
+
+def test_command_maps_every_rendition(tmp_path):
+    """One encoder process writes all renditions with a master playlist."""
+    writer = HLSWriter(str(tmp_path), 1280, 720, 30, ladder=build_ladder(1280, 720, 30, heights=[720, 360]))
+    command = writer.build_command()
+    assert command[command.index("-s") + 1] == "1280x720"
+    assert command.count("-map") == 2
+    assert command[command.index("-var_stream_map") + 1] == "v:0 v:1"
+    assert command[command.index("-hls_segment_type") + 1] == "fmp4"
+    assert command[-1] == os.path.join(str(tmp_path), "%v", "playlist.m3u8")
+
+def test_chatty_encoder_does_not_stall_writes(tmp_path, monkeypatch):
+    """An encoder logging more than a pipe holds keeps reading frames."""
+    # Logs 1 MB to stderr before reading stdin, then fails
+    chatty = "import sys; sys.stderr.write('x' * (1 << 20) + 'done'); sys.stdin.buffer.read(); sys.exit(3)"
+    writer = HLSWriter(str(tmp_path), 320, 240, 24, ladder=build_ladder(320, 240, 24))
+    monkeypatch.setattr(writer, "build_command", lambda: [sys.executable, "-c", chatty])
+    writer.start()
+    frame = np.zeros((240, 320, 3), np.uint8)
+    for _ in range(10):  # ~2.3 MB, well past a pipe buffer
+        writer.write(frame)
+    with pytest.raises(RuntimeError, match=r"\(3\).*done$"):
+        writer.close()
+
+@pytest.mark.skipif(shutil.which("ffmpeg") is None, reason="ffmpeg not installed")
+def test_encoder_writes_a_playable_ladder(tmp_path):
+    """Frames written to a real encoder come out as closed HLS playlists."""
+    writer = HLSWriter(str(tmp_path), 320, 240, 24, ladder=build_ladder(320, 240, 24, heights=[240, 120])).start()
+    for i in range(48):
+        frame = np.full((480, 320, 3), i * 5, np.uint8)[::2]  # Non-contiguous view
+        writer.write(frame)
+    master = writer.close()
+
+    assert os.path.exists(master)
+    for i in range(2):
+        with open(os.path.join(str(tmp_path), str(i), "playlist.m3u8")) as f:
+            playlist = f.read()
+        assert "#EXT-X-ENDLIST" in playlist and ".m4s" in playlist
+
+def test_directory_artifacts_are_indexed_and_removed(storage):
+    """HLS output directories count toward the quota and expire as a unit."""
+    directory = storage.path_for("results", "hls_abc")
+    os.makedirs(os.path.join(directory, "0"))
+    for name in ("0/playlist.m3u8", "0/segment_00000.m4s"):
+        with open(os.path.join(directory, name), "wb") as f:
+            f.write(b"x" * 50)
+
+    storage.register(directory, "results", ttl_hours=-1)
+    assert storage.resolve_dir("results", "hls_abc") == directory
+    assert storage.total_bytes() == 100
+
+    assert storage.cleanup()["expired"] == 1
+    assert not os.path.exists(directory)
+    assert storage.total_bytes() == 0
+
+def test_failed_jobs_leave_an_indexed_directory(storage, monkeypatch):
+    """A partial ladder from a failed job is still covered by TTL and quota."""
+    from app.utils import celery_tasks
+
+    def fail_midway(source, target, output_dir, *args, **kwargs):
+        with open(os.path.join(output_dir, "segment_00000.m4s"), "wb") as f:
+            f.write(b"x" * 50)
+        raise RuntimeError("encoder died")
+
+    monkeypatch.setattr(celery_tasks, "storage_manager", storage)
+    monkeypatch.setattr(celery_tasks.video_processor, "process_video_hls", fail_midway)
+    with pytest.raises(RuntimeError):
+        celery_tasks._process_hls("source.jpg", "target.mp4", "hls_failed", lambda progress: None)
+    assert storage.total_bytes() == 50
@@ -0,0 +1,32 @@
+from app.config import settings
+from app.utils.job_routing import estimate_cost, route_job
+
+def make_probe(frame_count, width=1280, height=720, avg_faces=1.0):
+    return {"frame_count": frame_count, "width": width, "height": height, "avg_faces": avg_faces}
+
+def test_estimate_cost_scales_with_frames_pixels_and_faces():
+    """Cost is megapixel-frames weighted by faces per frame."""
+    base = estimate_cost(make_probe(100))
+    assert estimate_cost(make_probe(200)) == 2 * base
+    assert estimate_cost(make_probe(100, avg_faces=3.0)) == 3 * base
+    # Frames without faces still cost at least the detection pass
+    assert estimate_cost(make_probe(100, avg_faces=0.0)) == base
+
+def test_route_job_picks_queue_by_cost():
+    """Short clips, long videos and huge jobs land on separate queues."""
+    short = route_job(make_probe(300))
+    assert short["queue"] == "video_short"
+
+    long_frames = int(settings.ROUTING_SHORT_MAX_COST / 0.9216) + 100
+    long = route_job(make_probe(long_frames))
+    assert long["queue"] == "video_long"
+    assert long["priority"] > short["priority"]
+
+    bulk = route_job(make_probe(100000))
+    assert bulk["job_class"] == "bulk"
+
+def test_route_job_without_probe_avoids_short_queue():
+    """Jobs that couldn't be probed go to the long queue."""
+    route = route_job(None)
+    assert route["queue"] == "video_long"
+    assert route["estimated_cost"] is None
@@ -0,0 +1,101 @@
+import cv2
+import numpy as np
+
+from app.models.face_results import FaceDetections
+from app.utils.keyframes import KeyframeInterpolator, face_psnr, frame_stats_report
+from app.utils.video_processor import VideoProcessor
+
+BOX = (60, 50, 140, 150)
+
+def make_scene():
+    rng = np.random.default_rng(0)
+    # Smooth texture so optical flow has something to follow
+    noise = rng.integers(0, 255, (60, 80, 3), dtype=np.uint8)
+    return cv2.resize(noise, (320, 240), interpolation=cv2.INTER_CUBIC)
+
+def shift(img, dx, dy):
+    return np.roll(img, (dy, dx), axis=(0, 1))
+
+def faces_at(dx=0, dy=0):
+    x1, y1, x2, y2 = BOX
+    kps = np.array([[85, 85], [115, 85], [100, 105], [88, 125], [112, 125]], np.float32) + (dx, dy)
+    return FaceDetections.from_arrays(np.array([[x1 + dx, y1 + dy, x2 + dx, y2 + dy]], np.float32), kps[None])
+
+def centre(dx=0, dy=0):
+    """Inner part of the face box, which the feathered mask fully covers"""
+    x1, y1, x2, y2 = BOX
+    return FaceDetections.from_arrays(
+        np.array([[x1 + 20 + dx, y1 + 20 + dy, x2 - 20 + dx, y2 - 20 + dy]], np.float32), np.zeros((1, 5, 2), np.float32)
+    )
+
+def swap(frame, faces):
+    """Stand-in swap: invert the face box"""
+    out = frame.copy()
+    for face in faces:
+        x1, y1, x2, y2 = face.bbox.astype(int)
+        out[y1:y2, x1:x2] = 255 - out[y1:y2, x1:x2]
+    return out
+
+def test_swapped_face_follows_the_motion():
+    scene = make_scene()
+    interpolator = KeyframeInterpolator()
+    interpolator.set_keyframe(scene, swap(scene, faces_at()), faces_at())
+
+    moved = shift(scene, 4, 3)
+    result = interpolator.interpolate(moved, np.empty_like(moved))
+    expected = swap(moved, faces_at(4, 3))
+    # Matches a full swap of the moved frame, unlike leaving it unswapped
+    assert face_psnr(result, expected, centre(4, 3)) > 40
+    assert face_psnr(moved, expected, centre(4, 3)) < 15
+
+def test_fast_mode_swaps_keyframes_only(video_engine):
+    offset = [(0, 0)]
+    engine = video_engine(swap=swap, detect=lambda frame: faces_at(*offset[0]))
+    scene = make_scene()
+    frames = [shift(scene, i, 0) for i in range(7)]
+
+    def moving_frames():
+        for i, frame in enumerate(frames):
+            offset[0] = (i, 0)
+            yield frame
+
+    stats = {}
+    outputs = [
+        frame.copy() for frame in VideoProcessor._swap_frames(
+            None, moving_frames(), add_watermark=False, stats=stats, keyframe_interval=3
+        )
+    ]
+    assert engine.swaps == 3  # Frames 0, 3 and 6
+    assert stats["keyframes"] == 3 and stats["interpolated_frames"] == 4
+    assert face_psnr(outputs[2], swap(frames[2], faces_at(2, 0)), centre(2, 0)) > 40
+
+    report = frame_stats_report(stats)
+    assert report["interpolation_psnr"] > 10 and report["speedup"] > 0
+    assert "keyframe_seconds" not in report and "psnr_sum" not in report
+
+def test_fast_mode_detects_on_every_keyframe(video_engine, monkeypatch):
+    """Keyframes after interpolated frames aren't swapped with a stale detection."""
+    from app.config import settings
+    monkeypatch.setattr(settings, "FRAME_REUSE_ENABLED", True)
+    offset = [(0, 0)]
+    swapped_at = []
+
+    def record(frame, faces):
+        swapped_at.append(int(faces[0].bbox[0]))
+        return swap(frame, faces)
+
+    engine = video_engine(swap=record, detect=lambda frame: faces_at(*offset[0]))
+    scene = make_scene()
+
+    def moving_frames():
+        # The face moves right after the first keyframe, then holds still,
+        # so the next keyframe matches its (interpolated) neighbour
+        for i in range(7):
+            offset[0] = (0 if i == 0 else 10, 0)
+            frame = shift(scene, *offset[0])
+            frame[0, 0, 0] = i  # Not an exact duplicate
+            yield frame
+
+    list(VideoProcessor._swap_frames(None, moving_frames(), add_watermark=False, keyframe_interval=3))
+    assert engine.detections == 3
+    assert swapped_at == [BOX[0], BOX[0] + 10, BOX[0] + 10]
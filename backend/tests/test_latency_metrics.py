@@ -0,0 +1,30 @@
+import time
+
+from app.utils.latency_metrics import StageTimer, LatencyMetrics
+
+def test_stage_timer_records_stages_and_total():
+    """Each timed stage and the overall total are recorded in milliseconds."""
+    timer = StageTimer()
+    with timer.stage("decode"):
+        time.sleep(0.002)
+    timings = timer.finish()
+    assert set(timings) == {"decode", "total"}
+    assert timings["decode"] >= 1.0
+    assert timings["total"] >= timings["decode"]
+
+def test_latency_metrics_percentiles_per_session_and_worker():
+    """Percentiles are aggregated per session and for the whole worker."""
+    metrics = LatencyMetrics(window_size=100)
+    for value in range(1, 101):
+        metrics.record("a", {"swap": float(value)})
+    metrics.record("b", {"swap": 1000.0})
+
+    summary = metrics.summary()
+    session_a = summary["sessions"]["a"]["stages"]["swap"]
+    assert session_a["p50"] == 50.5
+    assert session_a["p99"] < 100.0
+    assert summary["worker"]["frames"] == 101
+    assert summary["worker"]["stages"]["swap"]["p99"] > 100.0
+
+    metrics.drop_session("a")
+    assert "a" not in metrics.summary()["sessions"]
@@ -0,0 +1,20 @@
+import threading
+
+from app.models import lifecycle
+
+def test_background_preload_returns_before_models_load(monkeypatch):
+    release = threading.Event()
+    loaded, after = [], []
+
+    def slow_preload(before_fork=False):
+        release.wait(5)
+        loaded.append(before_fork)
+
+    monkeypatch.setattr(lifecycle, "preload_models", slow_preload)
+    thread = lifecycle.preload_models_in_background(then=lambda: after.append(True))
+    # The init hook is not blocked by the load
+    assert thread.is_alive() and not loaded
+
+    release.set()
+    lifecycle.wait_for_preload()
+    assert loaded == [False] and after == [True]
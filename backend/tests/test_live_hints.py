@@ -0,0 +1,45 @@
+import numpy as np
+
+from app.models.box_geometry import bbox_iou
+from app.utils.face_hints import parse_face_hints, hints_match_detection
+
+FRAME_SHAPE = (480, 640, 3)
+
+def test_parse_bbox_hint_estimates_keypoints():
+    """A bbox-only hint gets five estimated keypoints inside the box."""
+    faces = parse_face_hints([{"bbox": [100, 100, 300, 340]}], FRAME_SHAPE)
+    assert faces is not None and len(faces) == 1
+    kps = faces[0].kps
+    assert kps.shape == (5, 2)
+    assert (kps[:, 0] > 100).all() and (kps[:, 0] < 300).all()
+    assert (kps[:, 1] > 100).all() and (kps[:, 1] < 340).all()
+
+def test_parse_keypoint_hint_derives_bbox():
+    """A keypoint-only hint gets a bbox covering the keypoints."""
+    kps = [[200, 200], [260, 200], [230, 240], [205, 270], [255, 270]]
+    faces = parse_face_hints([{"kps": kps}], FRAME_SHAPE)
+    assert faces is not None
+    x1, y1, x2, y2 = faces[0].bbox
+    assert x1 < 200 and y1 < 200 and x2 > 260 and y2 > 270
+
+def test_parse_rejects_invalid_hints():
+    """Malformed, tiny or inconsistent hints are rejected."""
+    assert parse_face_hints(None, FRAME_SHAPE) is None
+    assert parse_face_hints([{"bbox": [1, 2, 3]}], FRAME_SHAPE) is None
+    assert parse_face_hints([{"bbox": [10, 10, 15, 15]}], FRAME_SHAPE) is None
+    assert parse_face_hints([{"bbox": ["a", 0, 100, 100]}], FRAME_SHAPE) is None
+    far_kps = [[600, 450]] * 5
+    assert parse_face_hints([{"bbox": [0, 0, 100, 100], "kps": far_kps}], FRAME_SHAPE) is None
+
+def test_hints_match_detection():
+    """Hints are confirmed only when they overlap a detected face."""
+    hint_faces = parse_face_hints([{"bbox": [100, 100, 300, 340]}], FRAME_SHAPE)
+
+    class Detected:
+        def __init__(self, bbox):
+            self.bbox = np.array(bbox, dtype=np.float32)
+
+    assert hints_match_detection(hint_faces, [Detected([110, 105, 305, 345])])
+    assert not hints_match_detection(hint_faces, [Detected([400, 100, 600, 340])])
+    assert not hints_match_detection(hint_faces, [])
+    assert bbox_iou([0, 0, 10, 10], [0, 0, 10, 10]) == 1.0
@@ -0,0 +1,18 @@
+import asyncio
+
+from app.routes import live
+from tests.load_live import stub_server, synthetic_frames, run_load_test
+
+def test_live_load_harness_with_stub_engines():
+    """The load harness drives the live endpoint and reports throughput."""
+    detector, engine = live.face_detector, live.face_swap_engine
+    with stub_server() as url:
+        frames = synthetic_frames(count=3, width=160, height=120)
+        report = asyncio.run(run_load_test(url, clients=2, fps=10, duration=1, frames=frames, source_data=frames[0]))
+    # The stubs don't leak into later tests
+    assert (live.face_detector, live.face_swap_engine) == (detector, engine)
+
+    assert report["failed_clients"] == 0
+    assert report["received"] > 0
+    assert report["sent"] + report["dropped"] >= 2 * 10
+    assert report["latency_ms"]["p50"] is not None
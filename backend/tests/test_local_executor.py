@@ -0,0 +1,122 @@
+import time
+import asyncio
+import multiprocessing
+
+from app.utils import job_executor as job_executor_module
+from app.utils.local_store import LocalStore, ForwardingClient
+from app.utils.progress_store import ProgressStore, progress_store
+
+def test_local_store_set_nx_and_expiry():
+    """nx refuses live keys but not expired ones; pipelines run in order."""
+    store = LocalStore()
+    assert store.set("k", "a", nx=True)
+    assert store.set("k", "b", nx=True) is None
+    assert store.get("k") == "a"
+
+    store.set("short", "x", ex=0.05)
+    time.sleep(0.1)
+    assert store.get("short") is None
+    assert store.set("short", "y", nx=True)
+
+    pipe = store.pipeline()
+    pipe.set("p", "1")
+    pipe.delete("k")
+    assert pipe.execute() == [True, 1]
+    assert store.get("p") == "1" and store.get("k") is None
+
+def test_forwarded_writes_reach_local_subscribers():
+    """Writes from a job process's client show up in the API's subscribe()."""
+    queue = multiprocessing.get_context("fork").Queue()
+    local = LocalStore()
+    store = ProgressStore()
+    store.use_local(local)
+    worker = ProgressStore()
+    worker.use_local(ForwardingClient(queue))
+
+    async def run():
+        records = []
+
+        async def consume():
+            async for record in store.subscribe("t1", keepalive=0.05):
+                if record is not None:
+                    records.append(record)
+
+        consumer = asyncio.create_task(consume())
+        await asyncio.sleep(0.05)
+        worker.update("t1", "processing", 10)
+        worker.update("t1", "completed", 100, result={"download_url": "/x"})
+        for _ in range(4):
+            local.apply(*queue.get(timeout=1))
+        await asyncio.wait_for(consumer, 1)
+        return records
+
+    records = asyncio.run(run())
+    assert [r["status"] for r in records] == ["processing", "completed"]
+    assert store.get("t1")["result"] == {"download_url": "/x"}
+
+def test_subscription_ends_without_records():
+    """A task whose worker died before a terminal record doesn't stream forever."""
+    store = ProgressStore()
+    store.use_local(LocalStore())
+
+    async def run():
+        return [record async for record in store.subscribe("gone", keepalive=0.02, idle_timeout=0.1)]
+
+    records = asyncio.run(asyncio.wait_for(run(), 2))
+    assert records and all(record is None for record in records)
+
+def _fake_job(kind, task_id, args, kwargs):
+    if args and args[0] == "fail":
+        raise RuntimeError("boom")
+    progress_store.update(task_id, "completed", 100, result={"kind": kind})
+
+def _dies_once(kind, task_id, args, kwargs):
+    import os
+    marker = args[0]
+    if not os.path.exists(marker):
+        open(marker, "w").close()
+        os._exit(1)  # Like an OOM kill
+    progress_store.update(task_id, "completed", 100, result={"pid": os.getpid()})
+
+def test_dead_job_process_is_retried_on_a_new_pool(monkeypatch, tmp_path):
+    """The pool is replaced by the dispatcher and the job resubmitted once."""
+    monkeypatch.setattr(job_executor_module, "_run_job", _dies_once)
+    monkeypatch.setattr(progress_store, "_client", None)
+    monkeypatch.setattr(progress_store, "_local", False)
+
+    executor = job_executor_module.LocalExecutor(max_workers=1)
+    executor.start()
+    first_pool = executor._pool
+    try:
+        executor.submit("video", args=(str(tmp_path / "died"),), task_id="retried")
+        deadline = time.time() + 20
+        while time.time() < deadline and not progress_store.get("retried"):
+            time.sleep(0.05)
+        assert progress_store.get("retried")["status"] == "completed"
+        assert executor._pool is not first_pool
+    finally:
+        executor.shutdown()
+
+def test_local_executor_runs_jobs_in_child_processes(monkeypatch):
+    """Jobs run in forked processes; results and failures land in the store."""
+    monkeypatch.setattr(job_executor_module, "_run_job", _fake_job)
+    monkeypatch.setattr(progress_store, "_client", None)
+    monkeypatch.setattr(progress_store, "_local", False)
+
+    executor = job_executor_module.LocalExecutor(max_workers=1)
+    executor.start()
+    try:
+        executor.submit("preview", args=("ok",), task_id="good", priority=9)
+        executor.submit("video", args=("fail",), task_id="bad", priority=0)
+
+        deadline = time.time() + 20
+        while time.time() < deadline:
+            good, bad = progress_store.get("good"), progress_store.get("bad")
+            if good and bad:
+                break
+            time.sleep(0.05)
+
+        assert good == {**good, "status": "completed", "result": {"kind": "preview"}}
+        assert bad["status"] == "failed" and "boom" in bad["error"]
+    finally:
+        executor.shutdown()
@@ -0,0 +1,119 @@
+import random
+import time
+
+import numpy as np
+import pytest
+
+from app.config import settings
+from app.utils import parallel_frames
+from app.utils.batch_tuning import BatchSizeController
+from app.utils.parallel_frames import ParallelFrameSwapper
+
+def slow_swap(frame, target_faces):
+    """Adds one to every pixel after a random delay, so workers finish out of order."""
+    time.sleep(random.uniform(0, 0.02))
+    return frame + 1
+
+@pytest.fixture
+def swapper(monkeypatch, tmp_path, video_engine):
+    # fork so the workers inherit the stub engine
+    monkeypatch.setattr(settings, "PARALLEL_FRAME_START_METHOD", "fork")
+    video_engine(target="app.utils.parallel_frames.face_swap_engine", swap=slow_swap)
+    monkeypatch.setattr(parallel_frames, "preload_models", lambda before_fork=False: None)
+    monkeypatch.setattr(parallel_frames, "batch_controller", BatchSizeController(str(tmp_path / "batch_profile.json")))
+    swapper = ParallelFrameSwapper(workers=3)
+    yield swapper
+    swapper.shutdown()
+
+def test_frames_come_back_in_order(swapper):
+    """Out-of-order completion across workers still yields frames in input order."""
+    frames = (np.full((8, 8, 3), i, dtype=np.uint8) for i in range(40))
+    values = [int(frame[0, 0, 0]) for frame in swapper.map("source.jpg", frames)]
+    assert values == [i + 1 for i in range(40)]
+
+def test_batch_size_is_tuned_during_a_job(swapper, monkeypatch):
+    """Frames stay in order while the controller grows the batch."""
+    monkeypatch.setattr(settings, "BATCH_TUNING_WINDOW", 5)
+    # Grow on every window, whatever the (noisy) throughput
+    monkeypatch.setattr(parallel_frames.batch_controller, "record", lambda shape, size, frames, seconds: min(size * 2, 24))
+    frames = (np.full((8, 8, 3), i % 250, dtype=np.uint8) for i in range(60))
+    stats = {}
+    values = [int(frame[0, 0, 0]) for frame in swapper.map("source.jpg", frames, stats=stats)]
+    assert values == [i % 250 + 1 for i in range(60)]
+    assert stats == {"batch_size": 24, "resolution_class": "480p"}
+
+def test_worker_errors_are_raised(swapper, monkeypatch):
+    """A failing frame surfaces as an exception in the caller."""
+    frames = [np.zeros((8, 8, 3), dtype=np.uint8), np.zeros((4, 4, 3), dtype=np.uint8)]
+    with pytest.raises(ValueError):
+        list(swapper.map("source.jpg", frames))
+
+def test_frame_store_slots_are_swapped_in_place(swapper, tmp_path, monkeypatch):
+    """Frames decoded into a FrameStore go to the workers without a shared memory copy."""
+    from app.utils.frame_store import FrameStore
+
+    def no_shared_memory(*args, **kwargs):
+        raise AssertionError("frames were copied into shared memory")
+
+    monkeypatch.setattr(settings, "FRAME_STORE_DIR", str(tmp_path))
+    monkeypatch.setattr(parallel_frames.shared_memory, "SharedMemory", no_shared_memory)
+    with FrameStore(5, (8, 8, 3)) as store:
+        def decoded():
+            # As VideoProcessor._iter_frames hands them out
+            for i in range(40):
+                index = store.put(np.full((8, 8, 3), i, dtype=np.uint8))
+                yield store.get(index)
+                store.release(index)
+
+        stats = {}
+        values = [int(frame[0, 0, 0]) for frame in swapper.map("source.jpg", decoded(), stats=stats, frame_store=store)]
+    assert values == [i + 1 for i in range(40)]
+    assert stats["batch_size"] == 3  # Capped to fit the store
+
+def _map_in_daemon(swapper, results):
+    frames = (np.full((8, 8, 3), i, dtype=np.uint8) for i in range(10))
+    try:
+        values = [int(frame[0, 0, 0]) for frame in swapper.map("source.jpg", frames)]
+        results.put((swapper.enabled, values))
+    except Exception as e:
+        results.put(repr(e))
+
+def test_map_falls_back_to_serial_in_a_daemonic_process(swapper):
+    """A Celery prefork child is daemonic and may not start the frame workers."""
+    import multiprocessing
+    context = multiprocessing.get_context("fork")
+    results = context.Queue()
+    process = context.Process(target=_map_in_daemon, args=(swapper, results), daemon=True)
+    process.start()
+    result = results.get(timeout=30)
+    process.join(timeout=30)
+    assert result == (False, [i + 1 for i in range(10)])
+
+def test_disabled_for_a_single_worker():
+    assert not ParallelFrameSwapper(workers=1).enabled
+    assert ParallelFrameSwapper(workers=-1).workers >= 1
+
+@pytest.mark.parametrize("frame_store", [False, True])
+def test_process_video_uses_the_frame_workers(swapper, tmp_path, monkeypatch, video_engine, frame_store):
+    """MP4 jobs keep every frame, in order, when swapped by the frame workers."""
+    import cv2
+    from app.utils.video_processor import VideoProcessor
+    from tests.conftest import write_video
+
+    monkeypatch.setattr("app.utils.video_processor.parallel_swapper", swapper)
+    video_engine(swap=slow_swap)
+    monkeypatch.setattr(settings, "FRAME_STORE_ENABLED", frame_store)
+    monkeypatch.setattr(settings, "FRAME_STORE_DIR", str(tmp_path))
+    monkeypatch.setattr(settings, "CHECKPOINT_SEGMENT_FRAMES", 5)
+    monkeypatch.setattr(settings, "CHECKPOINT_DIR", str(tmp_path / "checkpoints"))
+    monkeypatch.setattr(
+        "app.utils.video_processor.storage_manager.path_for",
+        lambda kind, name: str(tmp_path / name)
+    )
+    video_path = tmp_path / "clip.mp4"
+    write_video(video_path, frames=12)
+
+    output_path = VideoProcessor.process_video("source.jpg", str(video_path))
+    cap = cv2.VideoCapture(output_path)
+    assert int(cap.get(cv2.CAP_PROP_FRAME_COUNT)) == 12
+    cap.release()
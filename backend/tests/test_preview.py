@@ -0,0 +1,68 @@
+import numpy as np
+from insightface.app.common import Face
+
+from app.config import settings
+from app.models.face_swap import FaceSwapEngine
+from app.utils.video_processor import VideoProcessor
+from tests.conftest import write_video
+
+def test_head_preview_is_short_downscaled_and_decimated(tmp_path, monkeypatch):
+    """Head previews keep the first seconds at the preview frame rate and height."""
+    monkeypatch.setattr(settings, "PREVIEW_SECONDS", 1.0)
+    monkeypatch.setattr(settings, "PREVIEW_FPS", 12.0)
+    monkeypatch.setattr(settings, "PREVIEW_MAX_HEIGHT", 120)
+    video_path = tmp_path / "clip.mp4"
+    write_video(video_path, frames=72, width=320, height=240, fps=24)
+
+    frames, fps = VideoProcessor.extract_preview_frames(str(video_path), "head")
+    assert len(frames) == 12
+    assert abs(fps - 12.0) < 0.1
+    assert frames[0].shape[:2] == (120, 160)
+
+def test_sample_preview_spans_the_video(tmp_path, monkeypatch):
+    """Sample previews take evenly spaced frames from the whole video."""
+    monkeypatch.setattr(settings, "PREVIEW_SAMPLE_FRAMES", 6)
+    video_path = tmp_path / "clip.mp4"
+    write_video(video_path, frames=24)
+
+    frames, _ = VideoProcessor.extract_preview_frames(str(video_path), "sample")
+    assert len(frames) == 6
+    # First and last frames differ in brightness (write_video ramps it)
+    assert frames[-1].mean() > frames[0].mean()
+
+def test_source_face_is_reused_from_disk(tmp_path, monkeypatch):
+    """A face detected for one job is loaded by another engine without detection."""
+    source_path = str(tmp_path / "source.jpg")
+    face = Face(bbox=np.array([1.0, 2.0, 3.0, 4.0]), embedding=np.arange(4, dtype=np.float32), det_score=0.9)
+
+    first = FaceSwapEngine()
+    monkeypatch.setattr("app.models.face_swap.cv2.imread", lambda path: np.zeros((8, 8, 3), np.uint8))
+    monkeypatch.setattr("app.models.face_swap.face_detector.get_largest_face", lambda img, **kwargs: face)
+    first.get_source_face(source_path)
+
+    def fail(img):
+        raise AssertionError("detection should not run")
+    monkeypatch.setattr("app.models.face_swap.face_detector.get_largest_face", fail)
+
+    loaded = FaceSwapEngine().get_source_face(source_path)
+    assert np.array_equal(loaded.embedding, face.embedding)
+    assert loaded.det_score == 0.9
+    assert first.get_source_face(source_path) is face
+
+def test_preview_store_survives_redis_errors(monkeypatch):
+    """A Redis outage is reported to the caller instead of raising."""
+    import redis
+    from app.utils.preview_store import PreviewStore
+    from app.utils.progress_store import progress_store
+
+    class DownRedis:
+        def set(self, *args, **kwargs):
+            raise redis.ConnectionError("Connection refused")
+
+        def pipeline(self):
+            raise redis.ConnectionError("Connection refused")
+
+    monkeypatch.setattr(progress_store, "_client", DownRedis())
+    store = PreviewStore()
+    assert store.save("preview", {"source_path": "source.jpg"}) is False
+    assert store.pop("preview") is None
@@ -0,0 +1,51 @@
+import json
+
+from app.utils.progress_store import ProgressStore
+
+class FakeRedis:
+    """Minimal stand-in for the Redis calls made by ProgressStore."""
+    def __init__(self):
+        self.data = {}
+        self.published = []
+
+    def pipeline(self, transaction=False):
+        return self
+
+    def set(self, key, value, ex=None):
+        self.data[key] = value
+
+    def publish(self, channel, message):
+        self.published.append((channel, message))
+
+    def execute(self):
+        pass
+
+    def get(self, key):
+        return self.data.get(key)
+
+def make_store():
+    store = ProgressStore()
+    store._client = FakeRedis()
+    return store
+
+def test_progress_updates_are_throttled():
+    """Small progress steps are dropped; big steps and status changes are written."""
+    store = make_store()
+    assert store.update("t1", "processing", 0)
+    assert not store.update("t1", "processing", 0.4)
+    assert store.update("t1", "processing", 5)
+    assert store.update("t1", "completed", 100, result={"download_url": "/x"})
+    assert len(store.client.published) == 3
+
+    record = store.get("t1")
+    assert record["status"] == "completed"
+    assert record["result"] == {"download_url": "/x"}
+
+def test_progress_records_are_compact_json():
+    """Records are published as compact JSON on the task channel."""
+    store = make_store()
+    store.update("t2", "failed", error="boom")
+    channel, payload = store.client.published[0]
+    assert channel == "progress:t2"
+    assert " " not in payload.replace("boom", "")
+    assert json.loads(payload)["error"] == "boom"
@@ -0,0 +1,96 @@
+import asyncio
+import os
+
+import pytest
+
+from app.config import settings
+from app.utils.local_store import LocalStore
+from app.utils.progress_store import progress_store
+from app.utils.result_cache import ResultCache
+from app.utils.storage import StorageManager
+
+@pytest.fixture
+def cache(tmp_path, monkeypatch):
+    monkeypatch.setattr(progress_store, "_client", LocalStore())
+    monkeypatch.setattr(settings, "STORAGE_QUOTA_BYTES", 0)
+    storage = StorageManager(index_path=str(tmp_path / "index.db"))
+    storage.base_dirs = {"uploads": str(tmp_path / "uploads"), "results": str(tmp_path / "results")}
+    monkeypatch.setattr("app.utils.result_cache.storage_manager", storage)
+    return ResultCache(), storage
+
+def test_key_depends_on_inputs_and_params(tmp_path):
+    """Same bytes and options give the same key; any change gives a new one."""
+    path = tmp_path / "a.jpg"
+    path.write_bytes(b"portrait")
+    digest = ResultCache.hash_file(str(path), chunk_size=3)
+    key = ResultCache.make_key("face", [digest, "t"], {"enhance_result": True, "add_watermark": True})
+    assert key == ResultCache.make_key("face", [digest, "t"], {"add_watermark": True, "enhance_result": True})
+    assert key != ResultCache.make_key("face", [digest, "t"], {"enhance_result": False, "add_watermark": True})
+    assert key != ResultCache.make_key("face", ["t", digest], {"enhance_result": True, "add_watermark": True})
+
+def test_duplicate_submissions_coalesce(cache):
+    """A second claim for the same key gets the first job's entry."""
+    result_cache, storage = cache
+    assert result_cache.claim("k", "task-1", playlist_url="/p") == (True, None)
+    claimed, entry = result_cache.claim("k", "task-2")
+    assert not claimed
+    assert entry["task_id"] == "task-1" and entry["playlist_url"] == "/p"
+
+    # A failed job releases its claim so the next submission runs
+    result_cache.release("k", "task-2")
+    assert result_cache.get("k") is not None
+    result_cache.release("k", "task-1")
+    assert result_cache.claim("k", "task-3") == (True, None)
+
+def test_completed_entry_is_a_miss_once_evicted(cache):
+    """Hits require the stored result files to still exist."""
+    result_cache, storage = cache
+    path = storage.path_for("results", "result_1.jpg")
+    with open(path, "wb") as f:
+        f.write(b"jpg")
+    result_cache.claim("k", "owner")
+    result_cache.complete("k", "owner", {"result_url": "/api/v1/results/result_1.jpg"})
+    assert result_cache.result_paths(result_cache.get("k")["result"]) == [path]
+
+    os.remove(path)
+    assert result_cache.get("k") is None
+    assert result_cache.claim("k", "owner-2") == (True, None)
+
+def test_stale_entry_is_taken_over_by_one_request(cache, monkeypatch):
+    """Two requests replacing the same stale entry don't both claim it."""
+    result_cache, storage = cache
+    result_cache.claim("k", "owner")
+    result_cache.complete("k", "owner", {"result_url": "/api/v1/results/evicted.jpg"})
+
+    usable = result_cache._usable
+    racing = []
+
+    def usable_with_a_racing_claim(payload):
+        entry = usable(payload)
+        if not racing:
+            # Another request takes the stale entry over between our read and write
+            racing.append(None)
+            racing[0] = result_cache.claim("k", "task-b")
+        return entry
+
+    monkeypatch.setattr(result_cache, "_usable", usable_with_a_racing_claim)
+    claimed, entry = result_cache.claim("k", "task-a")
+    assert racing == [(True, None)]
+    assert not claimed and entry["task_id"] == "task-b"
+
+def test_wait_returns_when_duplicate_finishes(cache):
+    """Waiting requests get the entry as soon as the running job completes."""
+    result_cache, storage = cache
+    path = storage.path_for("results", "result_2.jpg")
+    with open(path, "wb") as f:
+        f.write(b"jpg")
+    result_cache.claim("k", "owner")
+
+    async def scenario():
+        async def finish():
+            await asyncio.sleep(0.05)
+            result_cache.complete("k", "owner", {"result_url": "/api/v1/results/result_2.jpg"})
+        asyncio.get_running_loop().create_task(finish())
+        return await result_cache.wait("k", timeout=2, interval=0.01)
+
+    assert asyncio.run(scenario())["status"] == "completed"
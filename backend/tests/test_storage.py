@@ -0,0 +1,75 @@
+import os
+import time
+
+import pytest
+
+from app.config import settings
+from app.utils.storage import StorageManager
+
+@pytest.fixture
+def storage(tmp_path, monkeypatch):
+    """Storage manager rooted in a temporary directory."""
+    monkeypatch.setattr(settings, "STORAGE_QUOTA_BYTES", 0)
+    monkeypatch.setattr(settings, "STORAGE_MIN_RESIDENCY_SECONDS", 0)
+    manager = StorageManager(index_path=str(tmp_path / "index.db"))
+    manager.base_dirs = {"uploads": str(tmp_path / "uploads"), "results": str(tmp_path / "results")}
+    return manager
+
+def write_file(storage, kind, name, size=10, ttl_hours=None):
+    path = storage.path_for(kind, name)
+    with open(path, "wb") as f:
+        f.write(b"x" * size)
+    storage.register(path, kind, ttl_hours=ttl_hours)
+    return path
+
+def test_files_are_sharded_and_resolvable(storage):
+    """Artifacts go into hashed subdirectories and resolve by name."""
+    path = write_file(storage, "results", "result_a.mp4")
+    assert os.path.basename(os.path.dirname(path)) != "results"
+    assert storage.resolve("results", "result_a.mp4") == path
+    assert storage.resolve("results", "missing.mp4") is None
+    assert storage.total_bytes() == 10
+
+def test_expired_files_are_evicted(storage):
+    """Files past their TTL are deleted along with their index rows."""
+    expired = write_file(storage, "uploads", "old.jpg", ttl_hours=-1)
+    kept = write_file(storage, "uploads", "new.jpg")
+    assert storage.cleanup()["expired"] == 1
+    assert not os.path.exists(expired)
+    assert os.path.exists(kept)
+    assert storage.total_bytes() == 10
+
+def test_quota_evicts_least_recently_used(storage):
+    """Over quota, the least recently used files go first."""
+    first = write_file(storage, "results", "first.mp4", size=100)
+    time.sleep(0.01)
+    second = write_file(storage, "results", "second.mp4", size=100)
+    time.sleep(0.01)
+    storage.touch(first)
+
+    assert storage.enforce_quota(quota_bytes=150) == 1
+    assert os.path.exists(first)
+    assert not os.path.exists(second)
+    assert storage.total_bytes() == 100
+
+def test_pinned_uploads_survive_quota_eviction(storage, monkeypatch):
+    """Uploads of queued jobs are kept over quota until every job unpins them."""
+    upload = write_file(storage, "uploads", "queued.mp4", size=100)
+    time.sleep(0.01)
+    write_file(storage, "results", "newer.mp4", size=100)
+    storage.pin(upload)
+    storage.pin(upload)  # A preview and its confirmed render
+
+    assert storage.enforce_quota(quota_bytes=150) == 1
+    assert os.path.exists(upload)
+    storage.unpin(upload)
+    assert storage.enforce_quota(quota_bytes=50) == 0
+    storage.unpin(upload)
+    assert storage.enforce_quota(quota_bytes=50) == 1
+    assert not os.path.exists(upload)
+
+    # A pin left by a lost job lapses with the storage TTL
+    upload = write_file(storage, "uploads", "lost.mp4", size=100)
+    storage.pin(upload)
+    monkeypatch.setattr(settings, "STORAGE_TTL_HOURS", 0)
+    assert storage.enforce_quota(quota_bytes=50) == 1
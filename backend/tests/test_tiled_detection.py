@@ -0,0 +1,58 @@
+import numpy as np
+
+from app.models.box_geometry import nms
+from app.models.tiled_detection import TiledDetector, tile_origins
+from tests.conftest import SquareDetector
+
+def test_nms_keeps_the_best_of_overlapping_boxes():
+    boxes = np.array([[0, 0, 10, 10], [1, 1, 11, 11], [50, 50, 60, 60]], np.float32)
+    assert nms(boxes, np.array([0.8, 0.9, 0.7], np.float32), 0.4).tolist() == [1, 2]
+
+def test_tile_origins_cover_the_image():
+    assert tile_origins(500, 1024, 0.25) == [0]
+    origins = tile_origins(3000, 1024, 0.25)
+    assert origins[0] == 0 and origins[-1] == 3000 - 1024
+    assert all(b - a <= 768 for a, b in zip(origins, origins[1:]))
+
+def test_small_faces_in_large_images_are_found():
+    img = np.zeros((2000, 3000, 3), np.uint8)
+    img[800:1200, 1300:1700] = 255  # Large face, resolved by the coarse pass
+    img[300:340, 2500:2540] = 255  # 40px face: ~8px after a single 640 pass
+    detector = SquareDetector()
+    tiled = TiledDetector(detector)
+
+    single_boxes, single_scores, _ = tiled._forward(img, detector.det_thresh)
+    assert len(single_boxes) == 1
+
+    detections, kpss = tiled.detect(img)
+    boxes = detections[np.argsort(detections[:, 0])]
+    assert len(boxes) == 2
+    assert np.allclose(boxes[0, :4], [1300, 800, 1700, 1200], atol=6)
+    assert np.allclose(boxes[1, :4], [2500, 300, 2540, 340], atol=3)
+    assert kpss.shape == (2, 5, 2)
+    # Coarse tiles plus a single full-resolution tile for the candidate
+    coarse_tiles = len(tile_origins(1280, 640, 0.25)) * len(tile_origins(853, 640, 0.25))
+    assert detector.calls == 1 + coarse_tiles + 1
+
+def test_only_large_images_take_the_tiled_path():
+    from app.models.face_detection import FaceDetector
+
+    class App:
+        det_model = SquareDetector()
+        det_size = (640, 640)
+        models = {"detection": det_model}
+
+        def get(self, img):
+            return []
+
+    detector = FaceDetector()
+    detector.app = App()
+    frame = np.zeros((1080, 1920, 3), np.uint8)
+    frame[500:540, 900:940] = 255
+    assert len(detector.get_faces(frame)) == 0 and App.det_model.calls == 0
+
+    photo = np.zeros((2000, 3000, 3), np.uint8)
+    photo[300:340, 2500:2540] = 255
+    faces = detector.get_faces(photo)
+    assert len(faces) == 1 and np.allclose(faces[0].bbox, [2500, 300, 2540, 340], atol=3)
+    assert len(detector.get_faces(photo, tiled=False)) == 0
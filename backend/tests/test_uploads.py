@@ -0,0 +1,58 @@
+import asyncio
+import hashlib
+import io
+
+import pytest
+from fastapi import FastAPI, File, UploadFile
+from fastapi.testclient import TestClient
+
+from app.utils.uploads import RequestSizeLimitMiddleware, UploadTooLargeError, save_upload
+
+def make_upload(data):
+    return UploadFile(io.BytesIO(data), filename="clip.mp4")
+
+def test_upload_is_copied_in_chunks_and_hashed(tmp_path):
+    """The stored copy matches the upload and its hash is computed on the way."""
+    data = bytes(range(256)) * 100
+    path = tmp_path / "clip.mp4"
+    size, digest = asyncio.run(save_upload(make_upload(data), str(path), max_bytes=len(data), chunk_size=1000))
+    assert size == len(data)
+    assert digest == hashlib.sha256(data).hexdigest()
+    assert path.read_bytes() == data
+
+def test_oversized_upload_is_rejected_and_removed(tmp_path):
+    """Copying stops at the limit and leaves no partial file behind."""
+    path = tmp_path / "clip.mp4"
+    with pytest.raises(UploadTooLargeError):
+        asyncio.run(save_upload(make_upload(b"x" * 5000), str(path), max_bytes=4096, chunk_size=1024))
+    assert not path.exists()
+
+@pytest.fixture
+def limited_client():
+    app = FastAPI()
+    app.add_middleware(RequestSizeLimitMiddleware, max_bytes=1024)
+
+    @app.post("/upload")
+    async def upload(file: UploadFile = File(...)):
+        return {"size": len(await file.read())}
+
+    return TestClient(app)
+
+def test_declared_length_over_limit_is_rejected(limited_client):
+    """Bodies declaring a Content-Length over the limit get 413 up front."""
+    response = limited_client.post("/upload", files={"file": ("a.bin", b"x" * 2048)})
+    assert response.status_code == 413
+
+    response = limited_client.post("/upload", files={"file": ("a.bin", b"x" * 100)})
+    assert response.status_code == 200 and response.json() == {"size": 100}
+
+def test_streamed_body_is_cut_off_at_limit(limited_client):
+    """Chunked bodies without a length are counted as they arrive."""
+    def body():
+        for _ in range(8):
+            yield b"x" * 512
+
+    response = limited_client.post(
+        "/upload", content=body(), headers={"content-type": "multipart/form-data; boundary=b"}
+    )
+    assert response.status_code == 413
@@ -0,0 +1,39 @@
+import json
+
+from app.utils.video_probe import VideoProbe
+from app.utils.throughput_profile import ThroughputProfile
+from app.utils.job_routing import check_admission
+from tests.conftest import write_video
+
+def test_read_metadata(tmp_path):
+    """Frame count, rate and size are read from the container."""
+    video_path = tmp_path / "clip.mp4"
+    write_video(video_path)
+    meta = VideoProbe.read_metadata(str(video_path))
+    assert meta["frame_count"] == 12
+    assert meta["width"] == 320 and meta["height"] == 240
+    assert abs(meta["fps"] - 24) < 0.1
+    assert abs(meta["duration"] - 0.5) < 0.05
+
+def test_estimate_uses_calibrated_profile(tmp_path):
+    """Runtime estimates scale with the saved host profile."""
+    profile_path = tmp_path / "profile.json"
+    profile = ThroughputProfile(str(profile_path))
+    probe = {"frame_count": 100, "width": 1000, "height": 1000, "avg_faces": 1.0}
+    default_estimate = profile.estimate_seconds(probe)
+
+    profile_path.write_text(json.dumps({
+        "detect_ms_per_mp": 10.0, "swap_ms_per_face": 5.0, "encode_ms_per_mp": 1.0,
+        "encode_passes": 2, "calibrated": True
+    }))
+    assert profile.estimate_seconds(probe) == 100 * (10.0 + 5.0 + 2.0) / 1000
+    assert profile.estimate_seconds(probe) < default_estimate
+
+def test_check_admission_limits():
+    """Overlong, oversized and too-expensive jobs are rejected."""
+    probe = {"frame_count": 300, "width": 1280, "height": 720, "duration": 10.0}
+    assert check_admission(probe, 30.0) is None
+    assert "long" in check_admission({**probe, "duration": 10 ** 6}, 30.0)
+    assert "resolution" in check_admission({**probe, "width": 10 ** 5}, 30.0)
+    assert "Estimated" in check_admission(probe, 10.0 ** 9)
+    assert check_admission({**probe, "frame_count": 0}, 0.0) is not None
@@ -89,8 +89,8 @@ const VideoDeepfake: React.FC<VideoDeepfakeProps> = ({ onSwitchMode }) => {
       // Get task ID from response
       if (response.data && response.data.task_id) {
         setTaskId(response.data.task_id);
-        // Start polling for task status
-        pollTaskStatus(response.data.task_id);
+        // Subscribe to pushed task status updates
+        watchTaskStatus(response.data.task_id);
       } else {
         throw new Error('Invalid response from server');
       }
@@ -101,33 +101,66 @@ const VideoDeepfake: React.FC<VideoDeepfakeProps> = ({ onSwitchMode }) => {
     }
   };
 
+  // Apply a task status update; returns true once the task has finished
+  const handleTaskStatus = (status: TaskStatusResponse): boolean => {
+    if (status.status === 'completed') {
+      setIsProcessing(false);
+      setProcessingProgress(100);
+
+      // Set processed video URL for preview
+      if (status.result && status.result.streaming_url) {
+        setProcessedVideo(`${API_BASE_URL}${status.result.streaming_url}`);
+      }
+
+      // Set download URL
+      if (status.result && status.result.download_url) {
+        setDownloadUrl(`${API_BASE_URL}${status.result.download_url}`);
+      }
+
+      setCurrentStep(4);
+      return true;
+    } else if (status.status === 'processing') {
+      setProcessingProgress(status.progress || 0);
+    } else if (status.status === 'failed') {
+      setIsProcessing(false);
+      setError(status.error || 'Processing failed');
+      return true;
+    }
+    return false;
+  };
+
+  // Receive progress as Server-Sent Events, falling back to polling
+  const watchTaskStatus = (taskId: string) => {
+    if (typeof EventSource === 'undefined') {
+      pollTaskStatus(taskId);
+      return;
+    }
+
+    const source = new EventSource(`${API_BASE_URL}/status/${taskId}/events`);
+    let finished = false;
+
+    source.onmessage = (event) => {
+      if (handleTaskStatus(JSON.parse(event.data) as TaskStatusResponse)) {
+        finished = true;
+        source.close();
+      }
+    };
+
+    source.onerror = () => {
+      source.close();
+      if (!finished) {
+        pollTaskStatus(taskId);
+      }
+    };
+  };
+
   const pollTaskStatus = (taskId: string) => {
     const interval = setInterval(async () => {
       try {
         const response = await axios.get<TaskStatusResponse>(`${API_BASE_URL}/status/${taskId}`);
 
-        if (response.data.status === 'completed') {
-          clearInterval(interval);
-          setIsProcessing(false);
-          setProcessingProgress(100);
-
-          // Set processed video URL for preview
-          if (response.data.result && response.data.result.streaming_url) {
-            setProcessedVideo(`${API_BASE_URL}${response.data.result.streaming_url}`);
-          }
-
-          // Set download URL
-          if (response.data.result && response.data.result.download_url) {
-            setDownloadUrl(`${API_BASE_URL}${response.data.result.download_url}`);
-          }
-
-          setCurrentStep(4);
-        } else if (response.data.status === 'processing') {
-          setProcessingProgress(response.data.progress || 0);
-        } else if (response.data.status === 'failed') {
+        if (handleTaskStatus(response.data)) {
           clearInterval(interval);
-          setIsProcessing(false);
-          setError(response.data.error || 'Processing failed');
         }
       } catch (err) {
         console.error('Error checking task status:', err);